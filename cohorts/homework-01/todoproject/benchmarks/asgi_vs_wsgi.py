@@ -0,0 +1,165 @@
+"""
+WSGI/sync vs. ASGI/async benchmark for the TODO views.
+
+    python -m benchmarks.asgi_vs_wsgi [--clients 32] [--seconds 10]
+
+Seeds one database, then serves it twice from the same code: the sync views
+under gunicorn (WSGI) and the async views (TODOS_ASYNC_VIEWS=1) under
+uvicorn (ASGI). Each run drives the same request mix from concurrent
+keep-alive clients and reports requests/sec and latency percentiles. Both
+servers must be installed (``pip install gunicorn uvicorn``).
+
+Each client loops over the requests picked with ``--mix``: the list page,
+an API cursor page, an API detail read and a row toggle (``X-Fragment:
+row``). Toggles invalidate the rendered list, so mixing both measures list
+re-renders; leave one out to isolate the other.
+"""
+
+import argparse
+import http.client
+import multiprocessing
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .common import BASE_DIR, environment, summarize, write_json
+from .sqlite_concurrency import prepare
+
+SERVERS = {
+    "wsgi-sync": (
+        {"TODOS_ASYNC_VIEWS": "0"},
+        ["gunicorn", "todoproject.wsgi:application", "--workers", "{workers}",
+         "--threads", "{threads}", "--bind", "127.0.0.1:{port}"],
+    ),
+    "asgi-async": (
+        {"TODOS_ASYNC_VIEWS": "1"},
+        ["uvicorn", "todoproject.asgi:application", "--workers", "{workers}",
+         "--port", "{port}", "--no-access-log"],
+    ),
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+REQUESTS = {
+    "list": lambda pk: ("/", {}),
+    "api": lambda pk: ("/api/todos/?limit=50", {}),
+    "detail": lambda pk: (f"/api/todos/{pk}/", {}),
+    "toggle": lambda pk: (f"/{pk}/toggle/", {"X-Fragment": "row"}),
+}
+
+
+def client(port, seconds, rows, mix, seed, results):
+    rng = random.Random(seed)
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        for name in mix:
+            path, headers = REQUESTS[name](rng.randint(1, rows))
+            started = time.perf_counter()
+            try:
+                connection.request("GET", path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+                ok = response.status < 400
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - started)
+            else:
+                errors += 1
+    results.put((latencies, errors))
+
+
+def run_server(name, env, args):
+    server_env, command = SERVERS[name]
+    port = free_port()
+    command = [part.format(workers=args.workers, threads=args.threads, port=port) for part in command]
+    server = subprocess.Popen(
+        command, cwd=BASE_DIR, env={**os.environ, **env, **server_env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(port)
+        ctx = multiprocessing.get_context("spawn")
+        results = ctx.Queue()
+        clients = [
+            ctx.Process(target=client, args=(port, args.seconds, args.rows, args.mix, seed, results))
+            for seed in range(args.clients)
+        ]
+        for worker in clients:
+            worker.start()
+        latencies, errors = [], 0
+        for _ in clients:
+            client_latencies, client_errors = results.get()
+            latencies += client_latencies
+            errors += client_errors
+        for worker in clients:
+            worker.join()
+    finally:
+        server.terminate()
+        server.wait()
+    return {
+        "requests_per_sec": len(latencies) / args.seconds,
+        "errors": errors,
+        "latency": summarize(latencies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--clients", type=int, default=32, help="concurrent client processes")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rows", type=int, default=5000, help="rows seeded before the runs")
+    parser.add_argument("--workers", type=int, default=2, help="server worker processes")
+    parser.add_argument("--threads", type=int, default=8, help="threads per gunicorn worker")
+    parser.add_argument("--mix", nargs="+", choices=list(REQUESTS), default=list(REQUESTS))
+    parser.add_argument("--servers", nargs="+", choices=sorted(SERVERS), default=list(SERVERS))
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {"environment": environment(), "args": vars(args), "servers": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {"DJANGO_DB_PROFILE": "production", "DJANGO_DB_NAME": str(Path(tmp) / "bench.sqlite3")}
+        setup = multiprocessing.get_context("spawn").Process(target=prepare, args=(env, args.rows))
+        setup.start()
+        setup.join()
+        if setup.exitcode:
+            sys.exit("seeding the benchmark database failed")
+
+        print(f"{'server':<12}{'req/s':>10}{'errors':>8}{'p50':>10}{'p90':>10}{'p99':>10}")
+        for name in args.servers:
+            result = results["servers"][name] = run_server(name, env, args)
+            latency = result["latency"]
+            print(
+                f"{name:<12}{result['requests_per_sec']:>10.0f}{result['errors']:>8}"
+                f"{latency['p50_ms']:>8.2f}ms{latency['p90_ms']:>8.2f}ms{latency['p99_ms']:>8.2f}ms"
+            )
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Helpers shared by the benchmark scripts in this package.
+
+Run the benchmarks from the project directory as modules, e.g.
+``python -m benchmarks.sqlite_concurrency``.
+"""
+
+import json
+import os
+import platform
+import subprocess
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+def setup_django(**environ):
+    """
+    Configure Django for a benchmark process. ``environ`` is applied before
+    settings are imported, so it can select database profiles and the like.
+    """
+    os.environ.update({key: str(value) for key, value in environ.items()})
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todoproject.settings")
+    import django
+
+    django.setup()
+
+
+def create_tables():
+    """
+    Create the database tables in a configured benchmark process. The todos
+    migrations are generated per checkout and not committed, so its tables
+    come straight from the models, like a test database without migrations.
+    """
+    from django.core.management import call_command
+    from django.test.utils import override_settings
+
+    with override_settings(MIGRATION_MODULES={"todos": None}):
+        call_command("migrate", run_syncdb=True, verbosity=0)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples):
+    """
+    Latency summary in milliseconds for a list of durations in seconds.
+    """
+    return {
+        "count": len(samples),
+        "p50_ms": percentile(samples, 50) * 1000,
+        "p90_ms": percentile(samples, 90) * 1000,
+        "p99_ms": percentile(samples, 99) * 1000,
+        "max_ms": max(samples, default=0.0) * 1000,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def write_json(path, results):
+    Path(path).write_text(json.dumps(results, indent=2, default=str) + "\n")
@@ -0,0 +1,211 @@
+"""
+Endpoint benchmark suite for the TODO app.
+
+    python -m benchmarks.endpoints [--rows 100000] [--json results.json] [--compare old.json]
+
+Seeds a fresh database with ``seed_todos`` (or reuses ``--database``), then
+requests each endpoint ``--iterations`` times and reports latency
+percentiles, SQL queries per request and memory: the peak Python allocation
+of one request (tracemalloc) and the process's max RSS afterwards.
+
+Requests go through Django's test client in this process by default. With
+``--server http://host:port --database <its SQLite file>`` they go to a
+running server instead; query counts then come from its Server-Timing
+header (run it with DEBUG or ``SERVER_TIMING=1``), and memory and the
+staff-only admin pages are not measured.
+
+Write results with ``--json`` and pass an earlier file to ``--compare`` to
+print the change per endpoint, e.g. across two commits.
+"""
+
+import argparse
+import http.client
+import json
+import re
+import resource
+import tempfile
+import time
+import tracemalloc
+from io import StringIO
+from pathlib import Path
+from urllib.parse import urlencode, urlsplit
+
+from .common import create_tables, environment, setup_django, summarize, write_json
+
+QUERIES_RE = re.compile(r'desc="(\d+) queries"')
+
+
+def endpoints(pks):
+    """
+    ``(name, method, path, data, headers, staff)`` per endpoint; ``pks``
+    yields TODO ids to spread reads and toggles over the table.
+    """
+    return [
+        ("list", "GET", lambda: "/", None, {}, False),
+        ("list-revalidate", "GET", lambda: "/", None, {"If-None-Match": "*"}, False),
+        ("create", "POST", lambda: "/create/", {"title": "Benchmark TODO"}, {}, False),
+        ("toggle", "GET", lambda: f"/{next(pks)}/toggle/", None, {}, False),
+        ("toggle-fragment", "GET", lambda: f"/{next(pks)}/toggle/", None, {"X-Fragment": "row"}, False),
+        ("api-list", "GET", lambda: "/api/todos/?limit=50", None, {}, False),
+        ("api-detail", "GET", lambda: f"/api/todos/{next(pks)}/", None, {}, False),
+        ("summary", "GET", lambda: "/summary/", None, {}, False),
+        ("admin-changelist", "GET", lambda: "/admin/todos/todo/", None, {}, True),
+        ("admin-filtered", "GET", lambda: "/admin/todos/todo/?resolved__exact=0&p=2", None, {}, True),
+    ]
+
+
+class LocalClient:
+    """
+    Requests through the test client, counting queries on every connection.
+    """
+
+    memory = True
+
+    def __init__(self):
+        from django.contrib.auth.models import User
+        from django.test import Client
+        from todoproject.instrumentation import install
+
+        install()
+        self.anonymous = Client(SERVER_NAME="localhost")
+        self.staff = Client(SERVER_NAME="localhost")
+        user, _ = User.objects.get_or_create(
+            username="benchmark", defaults={"is_staff": True, "is_superuser": True}
+        )
+        self.staff.force_login(user)
+
+    def request(self, method, path, data, headers, staff):
+        from todoproject.instrumentation import Recorder
+
+        client = self.staff if staff else self.anonymous
+        with Recorder() as recorder:
+            response = client.generic(
+                method, path, data=_encode(data),
+                content_type="application/x-www-form-urlencoded", headers=headers,
+            )
+        return response.status_code, recorder.queries
+
+
+def _encode(data):
+    return urlencode(data) if data else ""
+
+
+class ServerClient:
+    """
+    Requests to a running server over one keep-alive connection.
+    """
+
+    memory = False
+
+    def __init__(self, url):
+        parts = urlsplit(url)
+        self.connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=60)
+
+    def request(self, method, path, data, headers, staff):
+        body = _encode(data) or None
+        if body:
+            headers = {**headers, "Content-Type": "application/x-www-form-urlencoded"}
+        self.connection.request(method, path, body=body, headers=headers)
+        response = self.connection.getresponse()
+        response.read()
+        match = QUERIES_RE.search(response.getheader("Server-Timing") or "")
+        return response.status, int(match.group(1)) if match else None
+
+
+def run(client, args, pks):
+    results = {}
+    for name, method, path, data, headers, staff in endpoints(pks):
+        if args.only and name not in args.only:
+            continue
+        if staff and not isinstance(client, LocalClient):
+            continue
+        latencies, queries, statuses = [], [], set()
+        for _ in range(args.warmup):
+            client.request(method, path(), data, headers, staff)
+        for _ in range(args.iterations):
+            started = time.perf_counter()
+            status, count = client.request(method, path(), data, headers, staff)
+            latencies.append(time.perf_counter() - started)
+            statuses.add(status)
+            if count is not None:
+                queries.append(count)
+        result = {
+            "latency": summarize(latencies),
+            "queries": max(queries) if queries else None,
+            "statuses": sorted(statuses),
+        }
+        if client.memory:
+            tracemalloc.start()
+            client.request(method, path(), data, headers, staff)
+            result["peak_alloc_kib"] = tracemalloc.get_traced_memory()[1] / 1024
+            tracemalloc.stop()
+            result["max_rss_mib"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        results[name] = result
+        print(
+            f"{name:<18}{result['latency']['p50_ms']:>9.2f}ms{result['latency']['p99_ms']:>9.2f}ms"
+            f"{result['queries'] if result['queries'] is not None else '-':>9}"
+            f"{result.get('peak_alloc_kib', 0):>11.0f}KiB  {','.join(map(str, result['statuses']))}"
+        )
+    return results
+
+
+def compare(results, path):
+    previous = json.loads(Path(path).read_text())
+    print(f"\nChange against {path} ({previous['environment'].get('revision')}):")
+    for name, result in results["endpoints"].items():
+        old = previous.get("endpoints", {}).get(name)
+        if old is None:
+            continue
+        p50 = result["latency"]["p50_ms"] - old["latency"]["p50_ms"]
+        p99 = result["latency"]["p99_ms"] - old["latency"]["p99_ms"]
+        queries = (result["queries"] or 0) - (old["queries"] or 0)
+        print(f"{name:<18}{p50:>+9.2f}ms{p99:>+9.2f}ms{queries:>+9}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100000, help="TODOs to seed")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--anchor", default="2025-01-01", help="seed_todos --anchor, fixed for comparable runs")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--only", nargs="+", help="endpoint names to run")
+    parser.add_argument("--database", help="existing SQLite file to use instead of seeding a new one")
+    parser.add_argument("--server", help="benchmark a running server at this URL instead of in-process")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--compare", help="earlier --json output to compare against")
+    args = parser.parse_args()
+    if args.server and not args.database:
+        parser.error("--server needs --database: the server's SQLite file, to pick TODO ids from")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database = args.database or str(Path(tmp) / "bench.sqlite3")
+        setup_django(DJANGO_DB_PROFILE="production", DJANGO_DB_NAME=database, SLOW_REQUEST_MS=10**9)
+        from django.core.management import call_command
+        from todos.models import TODO
+
+        if not args.database:
+            create_tables()
+            call_command(
+                "seed_todos", f"--rows={args.rows}", f"--seed={args.seed}",
+                f"--anchor={args.anchor}", "--fast", stdout=StringIO(),
+            )
+        ids = list(TODO.objects.order_by("?").values_list("pk", flat=True)[:1000])
+        pks = iter(ids * (10**6 // max(len(ids), 1) + 1))
+
+        client = ServerClient(args.server) if args.server else LocalClient()
+        print(f"{'endpoint':<18}{'p50':>11}{'p99':>11}{'queries':>9}{'peak alloc':>14}  status")
+        results = {
+            "environment": environment(),
+            "args": vars(args),
+            "rows": TODO.objects.count(),
+            "endpoints": run(client, args, pks),
+        }
+    if args.json:
+        write_json(args.json, results)
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Per-user latency as the TODO table grows.
+
+    python -m benchmarks.owner_scaling [--sizes 10000 100000 1000000] [--user-rows 500]
+
+Seeds ``--user-rows`` TODOs for one signed-in user, then grows the table to
+each of ``--sizes`` with other users' TODOs (``seed_todos --owners``) and,
+at every size, requests that user's pages ``--iterations`` times. With the
+owner-first indexes the latencies and query counts should stay flat from
+the smallest size to the largest; the ``plan`` column shows the index the
+list query runs on.
+
+The fragment cache is invalidated before every list request, so each one
+renders from the database instead of being served from the cache.
+"""
+
+import argparse
+import re
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+
+from .common import create_tables, environment, setup_django, summarize, write_json
+
+USERNAME = "benchmark"
+
+PLAN_INDEX_RE = re.compile(r"USING (?:COVERING )?INDEX (\w+)")
+
+
+def pages(toggle_pks):
+    return [
+        ("list", "/", {}),
+        ("list-revalidate", "/", {"If-None-Match": "*"}),
+        ("api-list", "/api/todos/?limit=50", {}),
+        ("summary", "/summary/", {}),
+        ("toggle", lambda: f"/{next(toggle_pks)}/toggle/", {"X-Fragment": "row"}),
+    ]
+
+
+def measure(client, args, toggle_pks):
+    from todoproject.instrumentation import Recorder
+    from todos import cache
+
+    results = {}
+    for name, path, headers in pages(toggle_pks):
+        latencies, queries = [], 0
+        for iteration in range(args.warmup + args.iterations):
+            if name == "list":
+                cache.bump_version()
+            url = path() if callable(path) else path
+            started = time.perf_counter()
+            with Recorder() as recorder:
+                response = client.get(url, headers=headers)
+            elapsed = time.perf_counter() - started
+            if response.status_code >= 400:
+                raise RuntimeError(f"{url} returned {response.status_code}")
+            if iteration >= args.warmup:
+                latencies.append(elapsed)
+                queries = max(queries, recorder.queries)
+        results[name] = {"latency": summarize(latencies), "queries": queries}
+    return results
+
+
+def plan(user):
+    from todos.models import TODO
+
+    indexes = PLAN_INDEX_RE.findall(TODO.objects.for_owner(user).explain())
+    return ",".join(indexes) or "full scan"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000], help="total TODO counts")
+    parser.add_argument("--user-rows", type=int, default=500, help="TODOs of the measured user")
+    parser.add_argument("--owners", type=int, default=1000, help="users the other TODOs are spread over")
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--warmup", type=int, default=10)
+    parser.add_argument("--anchor", default="2025-01-01", help="seed_todos --anchor, fixed for comparable runs")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    if sorted(args.sizes) != args.sizes or args.sizes[0] <= args.user_rows:
+        parser.error("--sizes must be increasing and larger than --user-rows")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(
+            DJANGO_DB_PROFILE="production", DJANGO_DB_NAME=Path(tmp) / "owners.sqlite3",
+            SLOW_REQUEST_MS=10**9,
+        )
+        from django.contrib.auth import get_user_model
+        from django.core.management import call_command
+        from django.test import Client
+        from todoproject.instrumentation import install
+        from todos.models import TODO
+
+        create_tables()
+        install()
+        call_command(
+            "seed_todos", f"--rows={args.user_rows}", f"--owner={USERNAME}", "--seed=2",
+            f"--anchor={args.anchor}", "--fast", stdout=StringIO(),
+        )
+        user = get_user_model().objects.get(username=USERNAME)
+        client = Client(SERVER_NAME="localhost")
+        client.force_login(user)
+        user_pks = list(TODO.objects.for_owner(user).values_list("pk", flat=True))
+        toggle_pks = iter(user_pks * (10**6 // len(user_pks) + 1))
+
+        results = {"environment": environment(), "args": vars(args), "sizes": {}}
+        print(f"{'rows':>9}  {'page':<17}{'p50':>11}{'p99':>11}{'queries':>9}  plan")
+        total = args.user_rows
+        for size in args.sizes:
+            call_command(
+                "seed_todos", f"--rows={size - total}", f"--owners={args.owners}", f"--seed={size}",
+                f"--anchor={args.anchor}", "--fast", stdout=StringIO(),
+            )
+            total = size
+            plan_indexes = plan(user)
+            measured = measure(client, args, toggle_pks)
+            results["sizes"][size] = {"plan": plan_indexes, "pages": measured}
+            for name, result in measured.items():
+                print(
+                    f"{size:>9}  {name:<17}{result['latency']['p50_ms']:>9.2f}ms"
+                    f"{result['latency']['p99_ms']:>9.2f}ms{result['queries']:>9}  {plan_indexes}"
+                )
+
+    smallest, largest = (results["sizes"][size]["pages"] for size in (args.sizes[0], args.sizes[-1]))
+    print(f"\np50 at {args.sizes[-1]} rows relative to {args.sizes[0]}:")
+    for name, result in largest.items():
+        ratio = result["latency"]["p50_ms"] / smallest[name]["latency"]["p50_ms"]
+        print(f"  {name:<17}{ratio:>6.2f}x")
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
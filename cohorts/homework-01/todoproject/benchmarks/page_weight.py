@@ -0,0 +1,128 @@
+"""
+Page weight of the TODO list: bytes and requests for a first and a repeat
+load, before and after the static pipeline.
+
+    python -m benchmarks.page_weight [--rows 50] [--encodings identity gzip br]
+
+Collects the static files twice into temporary ``STATIC_ROOT`` directories:
+
+* ``plain``    - ``StaticFilesStorage`` served the way ``runserver`` does
+  (``django.contrib.staticfiles.views.serve``): unhashed names, no
+  compression, no Cache-Control
+* ``pipeline`` - ``CompressedManifestStaticFilesStorage`` served by
+  ``todoproject.staticfiles.serve``
+
+and for each ``Accept-Encoding`` loads the list page and every same-origin
+asset it references. The repeat load models a browser with a warm cache:
+assets marked ``immutable`` are not requested at all, the others are
+revalidated with ``If-Modified-Since`` (a 304 still costs a round trip).
+Bytes are response bodies as sent, i.e. compressed where the server
+compressed them; the HTML page itself is the same in both setups.
+"""
+
+import argparse
+import re
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from .common import create_tables, environment, setup_django, write_json
+
+ASSET_RE = re.compile(r'(?:href|src)="([^"]+)"')
+
+STORAGES = {
+    "plain": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    "pipeline": "todoproject.staticfiles.CompressedManifestStaticFilesStorage",
+}
+
+
+def asset_paths(html, static_url):
+    """
+    Paths below ``STATIC_URL`` referenced by the page, in document order.
+    """
+    return [url[len(static_url):] for url in ASSET_RE.findall(html) if url.startswith(static_url)]
+
+
+def fetch(setup, path, headers):
+    from django.contrib.staticfiles import views as staticfiles_views
+    from django.test import RequestFactory
+    from todoproject import staticfiles
+
+    request = RequestFactory().get(f"/static/{path}", headers=headers)
+    if setup == "plain":
+        response = staticfiles_views.serve(request, path, insecure=True)
+    else:
+        response = staticfiles.serve(request, path)
+    body = b"".join(response.streaming_content) if response.streaming else response.content
+    return response, len(body)
+
+
+def load(setup, encoding):
+    from django.conf import settings
+    from django.test import Client
+
+    headers = {"Accept-Encoding": encoding}
+    page = Client(SERVER_NAME="localhost").get("/", headers=headers)
+    if page.status_code != 200:
+        raise RuntimeError(f"/ returned {page.status_code}")
+    first = {"requests": 1, "bytes": len(page.content), "assets": {}}
+    repeat = {"requests": 1, "bytes": len(page.content)}
+    for path in asset_paths(page.content.decode(), settings.STATIC_URL):
+        response, size = fetch(setup, path, headers)
+        if response.status_code != 200:
+            raise RuntimeError(f"{path} returned {response.status_code}")
+        first["requests"] += 1
+        first["bytes"] += size
+        first["assets"][path] = {
+            "bytes": size,
+            "encoding": response.get("Content-Encoding", "identity"),
+            "cache_control": response.get("Cache-Control"),
+        }
+        if "immutable" in response.get("Cache-Control", ""):
+            continue
+        _, size = fetch(setup, path, {**headers, "If-Modified-Since": response["Last-Modified"]})
+        repeat["requests"] += 1
+        repeat["bytes"] += size
+    return {"first": first, "repeat": repeat}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50, help="TODOs on the page")
+    parser.add_argument("--encodings", nargs="+", default=["identity", "gzip", "gzip, deflate, br"])
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        setup_django(DJANGO_DB_NAME=Path(tmp) / "weight.sqlite3", SLOW_REQUEST_MS=10**9)
+        from django.core.management import call_command
+        from django.test import override_settings
+
+        create_tables()
+        call_command("seed_todos", f"--rows={args.rows}", "--seed=1", "--fast", stdout=StringIO())
+
+        results = {"environment": environment(), "args": vars(args), "setups": {}}
+        print(f"{'setup':<10}{'encoding':<20}{'requests':>9}{'bytes':>9}{'repeat':>9}{'bytes':>9}")
+        for setup, backend in STORAGES.items():
+            storages = {
+                "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+                "staticfiles": {"BACKEND": backend},
+            }
+            with override_settings(
+                DEBUG=False, ALLOWED_HOSTS=["localhost"], STATIC_ROOT=Path(tmp) / setup, STORAGES=storages,
+            ):
+                call_command("collectstatic", interactive=False, verbosity=0)
+                for encoding in args.encodings:
+                    result = load(setup, encoding)
+                    results["setups"].setdefault(setup, {})[encoding] = result
+                    first, repeat = result["first"], result["repeat"]
+                    print(
+                        f"{setup:<10}{encoding:<20}{first['requests']:>9}{first['bytes']:>9}"
+                        f"{repeat['requests']:>9}{repeat['bytes']:>9}"
+                    )
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Overhead of the sampling profiler middleware.
+
+    python -m benchmarks.profiler_overhead [--requests 20000]
+
+Calls ``SamplingProfilerMiddleware`` in-process around a view that burns a
+fixed amount of CPU, and reports the mean time per request for:
+
+* ``bare``        - the view alone
+* ``not-sampled`` - through the middleware, request not selected
+* ``sampled``     - through the middleware, every request profiled
+
+The first two should be indistinguishable; the third shows what a sampled
+request pays for the sampler thread at the configured interval.
+"""
+
+import argparse
+import time
+
+from .common import environment, setup_django, write_json
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def measure(handler, request, count):
+    started = time.perf_counter()
+    for _ in range(count):
+        handler(request)
+    return (time.perf_counter() - started) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="requests per variant")
+    parser.add_argument("--view-ms", type=float, default=0.2, help="CPU time the view burns")
+    parser.add_argument("--interval-ms", type=float, default=5, help="sampling interval")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    setup_django(PROFILER_ENABLED="1", PROFILER_INTERVAL_MS=args.interval_ms)
+    from django.http import HttpResponse
+    from django.test import RequestFactory, override_settings
+    from todoproject.profiling import SamplingProfilerMiddleware, sampler
+
+    def view(request):
+        busy(args.view_ms / 1000)
+        return HttpResponse()
+
+    request = RequestFactory().get("/")
+    variants = {"bare": view}
+    with override_settings(PROFILER_SAMPLE_RATE=0):
+        variants["not-sampled"] = SamplingProfilerMiddleware(view)
+    with override_settings(PROFILER_SAMPLE_RATE=1, PROFILER_MAX_CONCURRENT=1):
+        variants["sampled"] = SamplingProfilerMiddleware(view)
+
+    results = {"environment": environment(), "args": vars(args), "variants": {}}
+    baseline = None
+    print(f"{'variant':<14}{'per request':>14}{'overhead':>12}")
+    for name, handler in variants.items():
+        measure(handler, request, min(1000, args.requests))
+        per_request = measure(handler, request, args.requests)
+        baseline = baseline or per_request
+        overhead = per_request - baseline
+        results["variants"][name] = {"per_request_us": per_request * 1e6, "overhead_us": overhead * 1e6}
+        print(f"{name:<14}{per_request * 1e6:>12.1f}us{overhead * 1e6:>10.1f}us")
+    results["stacks"] = len(sampler.stacks)
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
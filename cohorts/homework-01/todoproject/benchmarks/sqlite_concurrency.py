@@ -0,0 +1,145 @@
+"""
+Concurrency benchmark for the SQLite database profiles.
+
+    python -m benchmarks.sqlite_concurrency [--workers 8] [--seconds 10]
+
+Seeds a fresh database per profile, then runs the same read/write mix from
+several worker processes (as a multi-worker deployment would) and reports
+throughput, latency percentiles and "database is locked" errors. Profiles:
+
+* ``default``     - settings as shipped (rollback journal, BEGIN IMMEDIATE, no pragmas)
+* ``production``  - DJANGO_DB_PROFILE=production
+* ``replica``     - production plus DJANGO_DB_READ_REPLICA=1
+"""
+
+import argparse
+import multiprocessing
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from .common import create_tables, environment, setup_django, summarize, write_json
+
+PROFILES = {
+    "default": {},
+    "production": {"DJANGO_DB_PROFILE": "production"},
+    "replica": {"DJANGO_DB_PROFILE": "production", "DJANGO_DB_READ_REPLICA": "1"},
+}
+
+
+def prepare(env, rows):
+    setup_django(**env)
+    from todos.models import TODO
+
+    create_tables()
+    TODO.objects.bulk_create(
+        [TODO(title=f"Seed {i}", resolved=i % 3 == 0) for i in range(rows)],
+        batch_size=1000,
+    )
+
+
+def work(env, seconds, write_ratio, seed, results):
+    setup_django(**env)
+    from django.db import OperationalError
+    from todos.models import TODO
+
+    rng = random.Random(seed)
+    max_pk = TODO.objects.order_by("-pk").values_list("pk", flat=True).first()
+    reads, writes, errors = [], [], 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        is_write = rng.random() < write_ratio
+        started = time.perf_counter()
+        try:
+            if not is_write:
+                list(TODO.objects.all()[:50])
+            elif rng.random() < 0.5:
+                TODO.objects.create(title="Benchmark")
+            else:
+                TODO.objects.filter(pk=rng.randint(1, max_pk)).toggle_resolved()
+        except OperationalError:
+            errors += 1
+            continue
+        (writes if is_write else reads).append(time.perf_counter() - started)
+    results.put((reads, writes, errors))
+
+
+def toggle(env, pk, toggles, results):
+    """
+    Toggle one row ``toggles`` times and report the "database is locked"
+    errors. The concurrency regression test runs it from several processes.
+    """
+    setup_django(**env)
+    from django.db import OperationalError
+    from todos.models import TODO
+
+    errors = 0
+    for _ in range(toggles):
+        try:
+            TODO.objects.filter(pk=pk).toggle_resolved()
+        except OperationalError:
+            errors += 1
+    results.put(errors)
+
+
+def run_profile(name, args):
+    ctx = multiprocessing.get_context("spawn")
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**PROFILES[name], "DJANGO_DB_NAME": str(Path(tmp) / "bench.sqlite3")}
+        setup = ctx.Process(target=prepare, args=(env, args.rows))
+        setup.start()
+        setup.join()
+        if setup.exitcode:
+            sys.exit("seeding the benchmark database failed")
+
+        results = ctx.Queue()
+        workers = [
+            ctx.Process(target=work, args=(env, args.seconds, args.write_ratio, seed, results))
+            for seed in range(args.workers)
+        ]
+        for worker in workers:
+            worker.start()
+        reads, writes, errors = [], [], 0
+        for _ in workers:
+            worker_reads, worker_writes, worker_errors = results.get()
+            reads += worker_reads
+            writes += worker_writes
+            errors += worker_errors
+        for worker in workers:
+            worker.join()
+
+    return {
+        "ops_per_sec": (len(reads) + len(writes)) / args.seconds,
+        "locked_errors": errors,
+        "reads": summarize(reads),
+        "writes": summarize(writes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--rows", type=int, default=20000, help="rows seeded before the run")
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    parser.add_argument("--profiles", nargs="+", choices=sorted(PROFILES), default=list(PROFILES))
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    results = {"environment": environment(), "args": vars(args), "profiles": {}}
+    print(f"{'profile':<12}{'ops/s':>10}{'locked':>8}{'read p50':>10}{'read p99':>10}{'write p50':>11}{'write p99':>11}")
+    for name in args.profiles:
+        result = results["profiles"][name] = run_profile(name, args)
+        print(
+            f"{name:<12}{result['ops_per_sec']:>10.0f}{result['locked_errors']:>8}"
+            f"{result['reads']['p50_ms']:>9.2f}ms{result['reads']['p99_ms']:>8.2f}ms"
+            f"{result['writes']['p50_ms']:>9.2f}ms{result['writes']['p99_ms']:>9.2f}ms"
+        )
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
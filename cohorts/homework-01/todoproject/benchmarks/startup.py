@@ -0,0 +1,223 @@
+"""
+Cold start benchmark: import time and time to first request.
+
+    python -m benchmarks.startup [--runs 10] [--projects todo interview]
+        [--python interview=/path/to/venv/bin/python]
+
+For each project (this TODO project, and the homework-02 coding interview
+backend next to it) and each worker profile (``full``, and ``lean`` with
+``DJANGO_WORKER_PROFILE=lean``), starts fresh interpreters that import the
+ASGI application and send it one HTTP request in-process, and reports:
+
+* ``ready``  - time from the first line of the script to the application
+  being importable and set up (``django.setup()``, URLconf not yet loaded)
+* ``first``  - the first request, which loads the URLconf, views and
+  middleware
+* ``second`` - a second, warm request, for comparison
+* ``wall``   - from spawning the process to the first response, interpreter
+  startup included
+
+Medians over ``--runs`` processes. ``--import-runs`` more under ``python
+-X importtime`` break import time down by top-level package, separately for
+startup and for the first request. Each project gets a fresh SQLite
+database with its tables created. The interview project has its own
+requirements; point ``--python`` at an interpreter that has them.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+from .common import BASE_DIR, environment, write_json
+
+PROJECTS = {
+    "todo": (BASE_DIR, "todoproject.asgi:application", "/api/todos/?limit=50"),
+    "interview": (
+        BASE_DIR.parents[1] / "homework-02" / "02-coding-interview" / "backend",
+        "coding_interview_backend.asgi:application",
+        "/api/sessions/missing/",
+    ),
+}
+
+# Creates a project's tables. The todos migrations are not committed, so the
+# TODO project builds its tables from the models (benchmarks.common).
+CREATE_TABLES = {
+    "todo": ["-c", "from benchmarks.common import create_tables, setup_django; setup_django(); create_tables()"],
+    "interview": ["manage.py", "migrate", "--verbosity=0"],
+}
+
+PROFILES = {
+    "full": {},
+    "lean": {"DJANGO_WORKER_PROFILE": "lean"},
+}
+
+MARKER = "-- first request"
+
+# Runs in the child interpreter: argv is the application and the request path
+CHILD = f"""
+import asyncio, importlib, json, os, sys, time
+started = time.perf_counter()
+module, attr = sys.argv[1].split(":")
+application = getattr(importlib.import_module(module), attr)
+ready = time.perf_counter()
+path, _, query = sys.argv[2].partition("?")
+
+async def request():
+    sent, done = [], asyncio.Event()
+    messages = iter([{{"type": "http.request", "body": b"", "more_body": False}}])
+    async def receive():
+        # The request, then a disconnect once the response is complete
+        message = next(messages, None)
+        if message is None:
+            await done.wait()
+            message = {{"type": "http.disconnect"}}
+        return message
+    async def send(message):
+        sent.append(message)
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+    await application({{
+        "type": "http", "asgi": {{"version": "3.0"}}, "http_version": "1.1",
+        "method": "GET", "scheme": "http", "path": path, "raw_path": path.encode(),
+        "query_string": query.encode(), "root_path": "",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 50000), "server": ("localhost", 80),
+    }}, receive, send)
+    return sent[0]["status"]
+
+os.write(2, b"{MARKER}\\n")
+status = asyncio.run(request())
+first = time.perf_counter()
+asyncio.run(request())
+second = time.perf_counter()
+print(json.dumps({{
+    "status": status,
+    "ready_ms": (ready - started) * 1000,
+    "first_ms": (first - ready) * 1000,
+    "second_ms": (second - first) * 1000,
+}}), flush=True)
+"""
+
+
+def child_env(database, profile):
+    env = {key: value for key, value in os.environ.items() if key != "DJANGO_SETTINGS_MODULE"}
+    env.update(PROFILES[profile], DJANGO_DB_NAME=str(database), SLOW_REQUEST_MS=str(10**9))
+    return env
+
+
+def create_tables(python, name, directory, database):
+    subprocess.run(
+        [python, *CREATE_TABLES[name]], cwd=directory, env=child_env(database, "full"), check=True,
+    )
+
+
+def cold_start(python, directory, app, path, env):
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [python, "-c", CHILD, app, path], cwd=directory, env=env,
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    line = process.stdout.readline()
+    wall = time.perf_counter() - started
+    process.communicate()
+    if process.returncode:
+        raise RuntimeError(f"{app} exited with status {process.returncode}")
+    result = json.loads(line)
+    result["wall_ms"] = wall * 1000
+    return result
+
+
+def import_times(python, directory, app, path, env, runs):
+    """
+    Median self import time in ms per top-level package over ``runs``
+    processes, for startup and for the first request.
+    """
+    samples = [import_time(python, directory, app, path, env) for _ in range(runs)]
+    return {
+        phase: Counter({
+            package: statistics.median(sample[phase][package] for sample in samples)
+            for package in set().union(*(sample[phase] for sample in samples))
+        })
+        for phase in samples[0]
+    }
+
+
+def import_time(python, directory, app, path, env):
+    process = subprocess.run(
+        [python, "-X", "importtime", "-c", CHILD, app, path],
+        cwd=directory, env=env, capture_output=True, text=True, check=True,
+    )
+    phases = {"startup": Counter(), "first_request": Counter()}
+    phase = phases["startup"]
+    for line in process.stderr.splitlines():
+        if line == MARKER:
+            phase = phases["first_request"]
+            continue
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, module = line[len("import time:"):].split("|")
+        phase[module.strip().split(".")[0]] += int(self_us) / 1000
+    return phases
+
+
+def report(name, profile, runs, imports, top):
+    medians = {
+        key: statistics.median(run[key] for run in runs)
+        for key in ("ready_ms", "first_ms", "second_ms", "wall_ms")
+    }
+    print(
+        f"{name:<11}{profile:<6}{medians['ready_ms']:>9.1f}ms{medians['first_ms']:>9.1f}ms"
+        f"{medians['second_ms']:>9.1f}ms{medians['wall_ms']:>9.1f}ms"
+        f"{sum(imports['startup'].values()):>9.1f}ms{sum(imports['first_request'].values()):>9.1f}ms"
+    )
+    for phase, packages in imports.items():
+        listed = ", ".join(f"{package} {ms:.0f}" for package, ms in packages.most_common(top))
+        print(f"{'':<17}{phase} imports (ms): {listed}")
+    return {
+        **medians,
+        "statuses": sorted({run["status"] for run in runs}),
+        "imports_ms": {phase: dict(packages.most_common()) for phase, packages in imports.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10, help="cold starts per project and profile")
+    parser.add_argument("--projects", nargs="+", choices=PROJECTS, default=list(PROJECTS))
+    parser.add_argument("--profiles", nargs="+", choices=PROFILES, default=list(PROFILES))
+    parser.add_argument(
+        "--python", action="append", default=[], metavar="PROJECT=PATH",
+        help="interpreter for a project (default: this one)",
+    )
+    parser.add_argument("--import-runs", type=int, default=3, help="-X importtime runs per project and profile")
+    parser.add_argument("--top", type=int, default=8, help="packages listed per import phase")
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+    pythons = dict(option.split("=", 1) for option in args.python)
+
+    results = {"environment": environment(), "args": vars(args), "projects": {}}
+    print(f"{'project':<11}{'':<6}{'ready':>11}{'first':>11}{'second':>11}{'wall':>11}{'imports':>11}{'+ first':>11}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in args.projects:
+            directory, app, path = PROJECTS[name]
+            python = pythons.get(name, sys.executable)
+            database = Path(tmp) / f"{name}.sqlite3"
+            create_tables(python, name, directory, database)
+            for profile in args.profiles:
+                env = child_env(database, profile)
+                runs = [cold_start(python, directory, app, path, env) for _ in range(args.runs)]
+                imports = import_times(python, directory, app, path, env, args.import_runs)
+                results["projects"].setdefault(name, {})[profile] = report(name, profile, runs, imports, args.top)
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
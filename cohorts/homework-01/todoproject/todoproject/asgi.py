@@ -2,6 +2,7 @@
 ASGI config for todoproject project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+With channels installed it also serves the live TODO list WebSocket.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
@@ -12,5 +13,45 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "todoproject.settings")
+# Pages connected to this worker's sockets can hear live pushes
+os.environ.setdefault("TODOS_LIVE_PUSH", "1")
 
-application = get_asgi_application()
+# Set up Django before anything imports models
+django_asgi_app = get_asgi_application()
+
+
+def websocket_application():
+    from channels.auth import AuthMiddlewareStack
+    from channels.routing import URLRouter
+    from channels.security.websocket import AllowedHostsOriginValidator
+    from todos.routing import websocket_urlpatterns
+
+    return AllowedHostsOriginValidator(AuthMiddlewareStack(URLRouter(websocket_urlpatterns)))
+
+
+class LazyApplication:
+    """
+    Build an ASGI application on its first connection. The WebSocket stack
+    pulls in consumers and the channels auth middleware, which a worker only
+    serving HTTP never needs, so it stays out of startup.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.application = None
+
+    async def __call__(self, scope, receive, send):
+        if self.application is None:
+            self.application = self.factory()
+        return await self.application(scope, receive, send)
+
+
+try:
+    from channels.routing import ProtocolTypeRouter
+except ImportError:
+    application = django_asgi_app
+else:
+    application = ProtocolTypeRouter({
+        "http": django_asgi_app,
+        "websocket": LazyApplication(websocket_application),
+    })
@@ -0,0 +1,194 @@
+"""
+Per-request SQL and timing instrumentation.
+
+``RequestTimingMiddleware`` records the SQL query count and the time spent
+in the database, in template rendering and in the view for every request,
+and reports them in a ``Server-Timing`` header that browser dev tools show
+next to the request:
+
+    Server-Timing: db;dur=3.1;desc="4 queries", tpl;dur=1.2, view;dur=6.0, total;dur=7.4
+
+Requests slower than ``SLOW_REQUEST_MS`` are logged as warnings on this
+module's logger. Template time includes any queries run while rendering.
+Put the middleware first in ``MIDDLEWARE`` so ``total`` covers the others.
+
+``query_budget`` uses the same counters to fail a test whose views run more
+queries than it declares.
+
+Settings:
+
+* ``SERVER_TIMING`` - emit the header (default: ``DEBUG``)
+* ``SLOW_REQUEST_MS`` - slow request threshold in ms (default: 500, None disables)
+"""
+
+import logging
+import time
+from contextlib import ContextDecorator
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+# Every recorder currently interested in this request/task's queries
+_recorders = ContextVar("instrumentation_recorders", default=())
+_rendering = ContextVar("instrumentation_rendering", default=False)
+
+
+class Recorder:
+    def __init__(self, keep_sql=False):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.sql = [] if keep_sql else None
+
+    def __enter__(self):
+        self._token = _recorders.set((*_recorders.get(), self))
+        return self
+
+    def __exit__(self, *exc_info):
+        _recorders.reset(self._token)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorders = _recorders.get()
+    if not recorders:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        for recorder in recorders:
+            recorder.queries += 1
+            recorder.db_time += elapsed
+            if recorder.sql is not None:
+                recorder.sql.append(sql)
+
+
+def _wrap_connection(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+_original_render = Template.render
+
+
+def _timed_render(self, context):
+    recorders = _recorders.get()
+    if not recorders or _rendering.get():
+        # Nested templates ({% include %}, {% extends %}) count towards the
+        # outermost render only
+        return _original_render(self, context)
+    token = _rendering.set(True)
+    started = time.perf_counter()
+    try:
+        return _original_render(self, context)
+    finally:
+        _rendering.reset(token)
+        elapsed = time.perf_counter() - started
+        for recorder in recorders:
+            recorder.template_time += elapsed
+
+
+def install():
+    """
+    Hook query and template timing into Django. Safe to call repeatedly.
+    """
+    connection_created.connect(_wrap_connection, dispatch_uid="instrumentation")
+    # Connections opened before the signal was connected (test databases,
+    # the management command that started the server) need wrapping too.
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection)
+    Template.render = _timed_render
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.header = getattr(settings, "SERVER_TIMING", settings.DEBUG)
+        self.slow_ms = getattr(settings, "SLOW_REQUEST_MS", 500)
+        install()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with Recorder() as recorder:
+            request._timing_recorder = recorder
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with Recorder() as recorder:
+            request._timing_recorder = recorder
+            response = await self.get_response(request)
+        return self.finish(request, response, recorder, started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing_view_started = time.perf_counter()
+
+    def finish(self, request, response, recorder, started):
+        now = time.perf_counter()
+        total_ms = (now - started) * 1000
+        view_started = getattr(request, "_timing_view_started", None)
+        view_ms = (now - view_started) * 1000 if view_started is not None else None
+        if self.header:
+            metrics = [
+                f'db;dur={recorder.db_time * 1000:.1f};desc="{recorder.queries} queries"',
+                f"tpl;dur={recorder.template_time * 1000:.1f}",
+            ]
+            if view_ms is not None:
+                metrics.append(f"view;dur={view_ms:.1f}")
+            metrics.append(f"total;dur={total_ms:.1f}")
+            response.headers["Server-Timing"] = ", ".join(metrics)
+        if self.slow_ms is not None and total_ms >= self.slow_ms:
+            logger.warning(
+                "Slow request: %s %s took %.0fms (%d queries, %.0fms db, %.0fms templates)",
+                request.method, request.path, total_ms, recorder.queries,
+                recorder.db_time * 1000, recorder.template_time * 1000,
+                extra={"status_code": response.status_code, "request": request},
+            )
+        return response
+
+
+class query_budget(ContextDecorator):
+    """
+    Fail if the enclosed code runs more than ``max_queries`` SQL queries, on
+    any database, and list the queries it ran. For tests:
+
+        with query_budget(3):
+            self.client.get(url)
+
+    or as a decorator on a test method.
+    """
+
+    def __init__(self, max_queries):
+        self.max_queries = max_queries
+
+    def __enter__(self):
+        install()
+        self.recorder = Recorder(keep_sql=True).__enter__()
+        return self.recorder
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.recorder.__exit__(exc_type, exc_value, traceback)
+        if exc_type is None and self.recorder.queries > self.max_queries:
+            queries = "\n".join(
+                f"{number}. {sql}" for number, sql in enumerate(self.recorder.sql, start=1)
+            )
+            raise AssertionError(
+                f"{self.recorder.queries} queries run, budget is {self.max_queries}:\n{queries}"
+            )
+        return False
@@ -0,0 +1,279 @@
+"""
+Opt-in sampling profiler for requests and WebSocket consumers.
+
+With ``PROFILER_ENABLED`` set, ``SamplingProfilerMiddleware`` profiles every
+``PROFILER_SAMPLE_RATE``-th request, plus any request from a staff user that
+carries an ``X-Profile: 1`` header. While a request is profiled, a
+background thread snapshots the stack of the thread serving it every
+``PROFILER_INTERVAL_MS``, and the stacks are aggregated in memory, per
+process. ``ProfiledConsumerMixin`` does the same for channels consumer
+handlers.
+
+Async requests and consumers share the event loop thread, so its samples
+only count while the profiled task is the one running; an async request
+also samples the thread its sync code (sync views and middleware) runs on,
+which is private to the request. Work handed to other threads, such as
+``database_sync_to_async`` in consumers, is not sampled.
+
+``stacks_view`` serves the aggregate in collapsed-stack format (one
+``frame;frame;frame count`` line per stack), which flamegraph.pl, speedscope
+and most flame graph tools read directly; POSTing to it clears the data.
+
+Overhead is bounded: requests that are not sampled cost one counter
+increment and a header lookup (``python -m benchmarks.profiler_overhead``
+measures it), at most ``PROFILER_MAX_CONCURRENT`` requests are profiled at
+once, and at most ``PROFILER_MAX_STACKS`` distinct stacks are kept.
+"""
+
+import asyncio
+import itertools
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed, PermissionDenied
+from django.http import HttpResponse
+from django.views.decorators.http import require_http_methods
+
+MAX_DEPTH = 128
+OVERFLOW = "[other stacks]"
+
+
+def get_setting(name, default):
+    return getattr(settings, f"PROFILER_{name}", default)
+
+
+class Sampler:
+    """
+    Stack aggregation shared by everything profiled in this process.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        # thread id -> (counter, task) of the profiles sampling it; a task
+        # limits the samples to those taken while that task is running
+        self.targets = {}
+        self.running = 0
+        self.stacks = Counter()
+        self.profiles = 0
+        self.thread = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self.run, name="sampling-profiler", daemon=True)
+            self.thread.start()
+
+    def run(self):
+        while True:
+            self.wakeup.wait()
+            interval = get_setting("INTERVAL_MS", 5) / 1000
+            with self.lock:
+                thread_ids = list(self.targets)
+                if not thread_ids:
+                    self.wakeup.clear()
+                    continue
+            frames = sys._current_frames()
+            stacks = {thread_id: collapse(frames[thread_id]) for thread_id in thread_ids if thread_id in frames}
+            del frames
+            # merge() iterates the counters under the lock when a profile ends
+            with self.lock:
+                for thread_id, stack in stacks.items():
+                    for counter, task in self.targets.get(thread_id, ()):
+                        if task is None or asyncio.current_task(task.get_loop()) is task:
+                            counter[stack] += 1
+            time.sleep(interval)
+
+    @contextmanager
+    def profile(self, label, thread_ids=(), task=None):
+        """
+        Sample the calling thread, and ``thread_ids``, for the duration of
+        the block and file the stacks under ``label``. With ``task``, the
+        calling thread is only sampled while that task runs on it. The label
+        may be changed through the yielded dict until the block ends.
+        """
+        targets = [(threading.get_ident(), task), *((thread_id, None) for thread_id in thread_ids)]
+        counter = Counter()
+        info = {"label": label}
+        with self.lock:
+            for thread_id, thread_task in targets:
+                self.targets.setdefault(thread_id, []).append((counter, thread_task))
+            self.running += 1
+        self.start()
+        self.wakeup.set()
+        try:
+            yield info
+        finally:
+            with self.lock:
+                for thread_id, _ in targets:
+                    entries = [entry for entry in self.targets[thread_id] if entry[0] is not counter]
+                    if entries:
+                        self.targets[thread_id] = entries
+                    else:
+                        del self.targets[thread_id]
+                self.running -= 1
+                self.merge(info["label"], counter)
+
+    def merge(self, label, counter):
+        max_stacks = get_setting("MAX_STACKS", 10000)
+        self.profiles += 1
+        for stack, count in counter.items():
+            key = f"{label};{stack}"
+            if key not in self.stacks and len(self.stacks) >= max_stacks:
+                key = f"{label};{OVERFLOW}"
+            self.stacks[key] += count
+
+    def collapsed(self):
+        with self.lock:
+            return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def reset(self):
+        with self.lock:
+            self.stacks.clear()
+            self.profiles = 0
+
+    def active(self):
+        with self.lock:
+            return self.running
+
+
+sampler = Sampler()
+
+
+def collapse(frame):
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", "?")
+        names.append(f"{module}:{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfilerMiddleware:
+    """
+    Profile sampled requests. Place it after ``AuthenticationMiddleware``
+    so header-triggered profiling can check ``request.user.is_staff``.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_setting("ENABLED", False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.rate = get_setting("SAMPLE_RATE", 0)
+        self.max_concurrent = get_setting("MAX_CONCURRENT", 4)
+        self.counter = itertools.count(1)
+
+    def should_profile(self, request):
+        if request.headers.get("X-Profile") == "1":
+            user = getattr(request, "user", None)
+            selected = user is not None and user.is_staff
+        else:
+            selected = bool(self.rate) and next(self.counter) % self.rate == 0
+        return selected and sampler.active() < self.max_concurrent
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if not self.should_profile(request):
+            return self.get_response(request)
+        with sampler.profile(f"{request.method} {request.path}") as info:
+            response = self.get_response(request)
+            info["label"] = label_for(request)
+        response.headers["X-Profiled"] = "1"
+        return response
+
+    async def __acall__(self, request):
+        # request.user is lazy and may need the database; the header is rare
+        if request.headers.get("X-Profile") == "1":
+            selected = await sync_to_async(self.should_profile)(request)
+        else:
+            selected = self.should_profile(request)
+        if not selected:
+            return await self.get_response(request)
+        # Under ASGI each request runs its sync code on a thread of its own
+        sync_thread = await sync_to_async(threading.get_ident)()
+        label = f"{request.method} {request.path}"
+        with sampler.profile(label, [sync_thread], asyncio.current_task()) as info:
+            response = await self.get_response(request)
+            info["label"] = label_for(request)
+        response.headers["X-Profiled"] = "1"
+        return response
+
+
+def label_for(request):
+    # The route keeps ids out of the label, so stacks for /5/ and /6/ merge
+    match = getattr(request, "resolver_match", None)
+    if match is not None and match.route:
+        return f"{request.method} {match.route}"
+    return f"{request.method} {request.path}"
+
+
+class ProfiledConsumerMixin:
+    """
+    Profile every ``PROFILER_SAMPLE_RATE``-th message a channels consumer
+    handles, labelled ``<Consumer> <message type>``. Put it before the
+    consumer base class.
+    """
+
+    _profile_counter = itertools.count(1)
+
+    async def dispatch(self, message):
+        rate = get_setting("SAMPLE_RATE", 0)
+        if (
+            not get_setting("ENABLED", False)
+            or not rate
+            or next(self._profile_counter) % rate
+            or sampler.active() >= get_setting("MAX_CONCURRENT", 4)
+        ):
+            return await super().dispatch(message)
+        label = f"{type(self).__name__} {message['type']}"
+        with sampler.profile(label, task=asyncio.current_task()):
+            return await super().dispatch(message)
+
+
+def staff_required(view):
+    """
+    ``staff_member_required`` without importing the admin where it is not
+    installed (lean workers): others are sent to the admin login when there
+    is one, and get a 403 otherwise.
+    """
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.user.is_active and request.user.is_staff:
+            return view(request, *args, **kwargs)
+        if not apps.is_installed("django.contrib.admin"):
+            raise PermissionDenied
+        from django.contrib.admin.views.decorators import staff_member_required
+
+        return staff_member_required(view)(request, *args, **kwargs)
+
+    return wrapper
+
+
+@staff_required
+@require_http_methods(["GET", "POST"])
+def stacks_view(request):
+    """
+    GET downloads the collapsed stacks collected by this process; POST clears them.
+    """
+    if request.method == "POST":
+        sampler.reset()
+        return HttpResponse(status=204)
+    response = HttpResponse(sampler.collapsed(), content_type="text/plain; charset=utf-8")
+    response["Content-Disposition"] = 'attachment; filename="stacks.collapsed.txt"'
+    response["X-Profiles"] = str(sampler.profiles)
+    return response
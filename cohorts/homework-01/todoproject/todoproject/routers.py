@@ -0,0 +1,22 @@
+from django.db import connections
+
+
+class ReadReplicaRouter:
+    """
+    Send reads to the read-only "replica" connection, except inside a
+    transaction on "default", where they must see that transaction's writes.
+    """
+
+    def db_for_read(self, model, **hints):
+        if connections["default"].in_atomic_block:
+            return "default"
+        return "replica"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -41,11 +42,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "todoproject.instrumentation.RequestTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "todoproject.profiling.SamplingProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -69,17 +72,162 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "todoproject.wsgi.application"
 
+# Worker profile (DJANGO_WORKER_PROFILE): "full" (default) or "lean". Lean
+# workers leave out the admin, whose autodiscovery imports every admin
+# module with the auth forms and checks they pull in, and serve no /admin/
+# URLs; run them for the TODO pages, API and WebSocket, and keep at least one
+# full worker for the admin. Measure with python -m benchmarks.startup.
+
+WORKER_PROFILE = os.environ.get("DJANGO_WORKER_PROFILE", "full")
+
+if WORKER_PROFILE == "lean":
+    INSTALLED_APPS.remove("django.contrib.admin")
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# TODO writes read the rows' summary state before updating them in one
+# transaction. Under SQLite's default deferred transactions, a concurrent
+# writer then cannot upgrade its read lock and fails at once with "database
+# is locked"; BEGIN IMMEDIATE takes the write lock up front, so it waits for
+# the busy timeout instead.
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": os.environ.get("DJANGO_DB_NAME", BASE_DIR / "db.sqlite3"),
+        "OPTIONS": {
+            "transaction_mode": "IMMEDIATE",
+        },
     }
 }
 
+# SQLite production profile (DJANGO_DB_PROFILE=production): WAL so readers
+# never block the writer, a longer busy timeout, bigger page cache and mmap
+# reads, and connections kept open across requests. DJANGO_DB_READ_REPLICA=1
+# also routes reads outside transactions to a separate read-only connection.
+
+SQLITE_READ_PRAGMAS = (
+    "PRAGMA cache_size = -65536;"
+    "PRAGMA mmap_size = 268435456;"
+    "PRAGMA temp_store = MEMORY;"
+)
+
+SQLITE_PRODUCTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL;"
+    "PRAGMA synchronous = NORMAL;"
+    + SQLITE_READ_PRAGMAS
+)
+
+if os.environ.get("DJANGO_DB_PROFILE") == "production":
+    DATABASES["default"].update({
+        "CONN_MAX_AGE": None,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "timeout": 20,
+            "transaction_mode": "IMMEDIATE",
+            "init_command": SQLITE_PRODUCTION_PRAGMAS,
+        },
+    })
+    if os.environ.get("DJANGO_DB_READ_REPLICA"):
+        DATABASES["replica"] = {
+            **DATABASES["default"],
+            "NAME": f"file:{DATABASES['default']['NAME']}?mode=ro",
+            "OPTIONS": {
+                "timeout": 20,
+                "init_command": SQLITE_READ_PRAGMAS + "PRAGMA query_only = ON;",
+            },
+            "TEST": {"MIRROR": "default"},
+        }
+        DATABASE_ROUTERS = ["todoproject.routers.ReadReplicaRouter"]
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# Rendered TODO fragments live in the "todos" cache. Local memory is the
+# default; point TODOS_CACHE_BACKEND/TODOS_CACHE_LOCATION at a file-based or
+# shared backend (e.g. django.core.cache.backends.redis.RedisCache) so every
+# worker process sees the same version counter and fragments.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "todos": {
+        "BACKEND": os.environ.get(
+            "TODOS_CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.environ.get("TODOS_CACHE_LOCATION", "todos"),
+    },
+}
+
+TODOS_CACHE_ALIAS = "todos"
+
+TODOS_CACHE_TIMEOUT = int(os.environ.get("TODOS_CACHE_TIMEOUT", 300))
+
+
+# Live updates (optional)
+# https://channels.readthedocs.io/en/latest/topics/channel_layers.html
+#
+# With channels installed, list pages served over ASGI receive TODO changes
+# over a WebSocket. The in-memory layer only reaches pages served by the same
+# process; set TODOS_CHANNEL_REDIS_URL (needs channels-redis) for several.
+
+try:
+    import channels  # noqa: F401
+except ImportError:
+    pass
+else:
+    ASGI_APPLICATION = "todoproject.asgi.application"
+    if os.environ.get("TODOS_CHANNEL_REDIS_URL"):
+        CHANNEL_LAYERS = {
+            "default": {
+                "BACKEND": "channels_redis.core.RedisChannelLayer",
+                "CONFIG": {"hosts": [os.environ["TODOS_CHANNEL_REDIS_URL"]]},
+            },
+        }
+    else:
+        CHANNEL_LAYERS = {
+            "default": {"BACKEND": "channels.layers.InMemoryChannelLayer"},
+        }
+
+# Live push costs every TODO write extra queries, a row render and a channel
+# layer send, so it is only on where a socket can hear it: in ASGI workers
+# (todoproject/asgi.py defaults it on) and wherever a shared Redis layer
+# carries events from WSGI workers to the socket ones. TODOS_LIVE_PUSH=0|1
+# overrides either way.
+TODOS_LIVE_PUSH = "CHANNEL_LAYERS" in globals() and os.environ.get(
+    "TODOS_LIVE_PUSH", "1" if os.environ.get("TODOS_CHANNEL_REDIS_URL") else "0"
+) == "1"
+
+
+# Serve the TODO list, toggle and API read paths from async views (see
+# todos/async_views.py). Only worth it under ASGI.
+TODOS_ASYNC_VIEWS = os.environ.get("TODOS_ASYNC_VIEWS", "") == "1"
+
+
+# Request instrumentation (todoproject/instrumentation.py): Server-Timing headers
+# with query count, DB, template and view time, and a warning on the
+# "todoproject.instrumentation" logger for requests slower than SLOW_REQUEST_MS.
+
+# The header tells any client how long each request spent in the database,
+# so it is on by default only while DEBUG is.
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "1" if DEBUG else "0") == "1"
+
+SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", 500))
+
+# Sampling profiler (todoproject/profiling.py), off unless PROFILER_ENABLED=1.
+# Profiles every PROFILER_SAMPLE_RATE-th request (0: only staff requests
+# sent with "X-Profile: 1"); staff download the stacks from /profiler/stacks/.
+
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "") == "1"
+
+PROFILER_SAMPLE_RATE = int(os.environ.get("PROFILER_SAMPLE_RATE", 0))
+
+PROFILER_INTERVAL_MS = float(os.environ.get("PROFILER_INTERVAL_MS", 5))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -117,6 +265,21 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 
+# Asset pipeline (todoproject/staticfiles.py): collectstatic writes
+# content-hashed copies plus .br/.gz variants to STATIC_ROOT, and the app
+# serves them itself (immutable caching, encoding picked by Accept-Encoding)
+# unless STATIC_SERVE=0 because a web server or CDN handles STATIC_URL.
+# python -m benchmarks.page_weight measures the bytes a page load costs.
+
+STATIC_ROOT = os.environ.get("STATIC_ROOT", BASE_DIR / "staticfiles")
+
+STATIC_SERVE = os.environ.get("STATIC_SERVE", "1") == "1"
+
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "todoproject.staticfiles.CompressedManifestStaticFilesStorage"},
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
@@ -0,0 +1,170 @@
+"""
+Static asset pipeline: content-hashed names, precompressed variants and a
+view that serves them.
+
+``CompressedManifestStaticFilesStorage`` is ``ManifestStaticFilesStorage``
+(``todos/list.<hash>.js`` names recorded in ``staticfiles.json``) that also
+writes ``.br`` and ``.gz`` siblings of every compressible file during
+``collectstatic``, so nothing is compressed per request. Brotli needs the
+optional ``brotli`` package; without it only gzip variants are written.
+
+``serve`` answers ``STATIC_URL`` requests from ``STATIC_ROOT`` for
+deployments without a web server or CDN in front: it picks the smallest
+variant the client's ``Accept-Encoding`` allows, and marks content-hashed
+files ``immutable`` for a year so browsers stop revalidating them.
+Unhashed names get a short max-age instead.
+
+Settings:
+
+* ``STATIC_COMPRESS_MIN_SIZE`` - smallest file worth compressing, in bytes
+  (default: 256)
+"""
+
+import gzip
+import mimetypes
+import posixpath
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles import views as staticfiles_views
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.files.base import ContentFile
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+from django.views.static import was_modified_since
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = {".css", ".js", ".mjs", ".json", ".map", ".svg", ".txt", ".html", ".xml", ".ico"}
+
+# Preferred first; each is (Content-Encoding, file suffix)
+ENCODINGS = [("br", ".br"), ("gzip", ".gz")]
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+SHORT_LIVED = "public, max-age=300"
+
+
+def compress(content):
+    """
+    ``{suffix: bytes}`` of the compressed variants of ``content``.
+    """
+    # mtime=0 keeps the output identical for identical input
+    variants = {".gz": gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = brotli.compress(content, quality=11)
+    return variants
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        min_size = getattr(settings, "STATIC_COMPRESS_MIN_SIZE", 256)
+        # Compress what the manifest points at (and the unhashed copies,
+        # for templates rendered without the manifest)
+        names = {name for pair in self.hashed_files.items() for name in pair}
+        for name in sorted(names):
+            if posixpath.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS or not self.exists(name):
+                continue
+            with self.open(name) as original:
+                content = original.read()
+            if len(content) < min_size:
+                continue
+            for suffix, compressed in compress(content).items():
+                # Worthless variants are skipped; serve() falls back to the original
+                if len(compressed) >= len(content):
+                    continue
+                if self.exists(name + suffix):
+                    self.delete(name + suffix)
+                self._save(name + suffix, ContentFile(compressed))
+                yield name + suffix, name + suffix, True
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not collected (development, tests): the plain name still
+            # resolves through the finders
+            return name
+
+
+def accepted_encodings(header):
+    """
+    Content codings ``Accept-Encoding`` allows, ignoring preference order:
+    every variant on offer is smaller than the original anyway.
+    """
+    accepted, wildcard = set(), False
+    for part in header.split(","):
+        coding, _, params = part.strip().partition(";")
+        coding = coding.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        if coding == "*":
+            wildcard = q > 0
+        elif q > 0:
+            accepted.add(coding)
+    if wildcard:
+        accepted.update(coding for coding, _ in ENCODINGS)
+    return accepted
+
+
+@require_safe
+def serve(request, path):
+    """
+    Serve ``path`` from ``STATIC_ROOT``, precompressed where possible. In
+    DEBUG, files not collected yet are served from the finders instead.
+    """
+    root = settings.STATIC_ROOT
+    # safe_join raises SuspiciousFileOperation (a 400) for paths outside root
+    fullpath = Path(safe_join(root, path)) if root else None
+    if fullpath is None or not fullpath.is_file():
+        if settings.DEBUG and finders.find(path):
+            return staticfiles_views.serve(request, path, insecure=True)
+        raise Http404(f"{path} not found")
+
+    stat = fullpath.stat()
+    headers = {
+        "Cache-Control": IMMUTABLE if is_hashed(path) else SHORT_LIVED,
+        "Vary": "Accept-Encoding",
+    }
+    if not was_modified_since(request.headers.get("If-Modified-Since"), stat.st_mtime):
+        return HttpResponseNotModified(headers=headers)
+
+    content_type, _ = mimetypes.guess_type(fullpath.name)
+    accepted = accepted_encodings(request.headers.get("Accept-Encoding", ""))
+    served, encoding = fullpath, None
+    for coding, suffix in ENCODINGS:
+        variant = fullpath.with_name(fullpath.name + suffix)
+        if coding in accepted and variant.is_file():
+            served, encoding = variant, coding
+            break
+    response = FileResponse(
+        served.open("rb"), content_type=content_type or "application/octet-stream", filename=fullpath.name,
+        headers=headers,
+    )
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    return response
+
+
+def is_hashed(path):
+    """
+    Whether ``path`` is a content-hashed name from the manifest, i.e. one
+    whose content can never change.
+    """
+    hashed_files = getattr(staticfiles_storage, "hashed_files", None) or {}
+    return path in hashed_files.values()
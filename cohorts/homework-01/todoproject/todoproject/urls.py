@@ -15,10 +15,25 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from django.contrib import admin
-from django.urls import path, include
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.urls import path, include, re_path
+from todoproject import staticfiles
+from todoproject.profiling import stacks_view
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
+    path("profiler/stacks/", stacks_view, name="profiler_stacks"),
     path('', include('todos.urls')),
 ]
+
+if settings.STATIC_SERVE:
+    static_prefix = re.escape(settings.STATIC_URL.lstrip("/"))
+    urlpatterns.insert(0, re_path(rf"^{static_prefix}(?P<path>.*)$", staticfiles.serve, name="static"))
+
+# Lean workers (DJANGO_WORKER_PROFILE=lean) run without the admin
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path("admin/", admin.site.urls))
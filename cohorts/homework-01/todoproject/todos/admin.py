@@ -1,8 +1,68 @@
 from django.contrib import admin
-from .models import TODO
+from django.db.models import F, Sum
+from django.utils import timezone
+from .models import TODO, ArchivedTODO, TODOSummary
+from .paginator import LargeTablePaginator
+
+
+class LargeTableAdminMixin:
+    """
+    Changelist settings for tables too big to count on every page load:
+    counts come from ``get_total_count()`` or a per-version cache, pages are
+    fetched by keyset where possible, and no second "N total" COUNT is run.
+    """
+    paginator = LargeTablePaginator
+    show_full_result_count = False
+
+    def get_total_count(self):
+        """
+        Exact row count of the unfiltered table if it is known cheaply, else None.
+        """
+        return None
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        return self.paginator(
+            queryset, per_page, orphans, allow_empty_first_page, total_count=self.get_total_count
+        )
+
 
 @admin.register(TODO)
-class TODOAdmin(admin.ModelAdmin):
-    list_display = ['title', 'due_date', 'resolved', 'created_at']
+class TODOAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ['title', 'owner', 'due_date', 'resolved', 'created_at']
     list_filter = ['resolved', 'due_date']
     search_fields = ['title', 'description']
+    # A select of every user would not scale with the user table
+    raw_id_fields = ['owner']
+    # owner is nullable, so the default select_related() would skip it
+    list_select_related = ['owner']
+    actions = ['mark_resolved', 'mark_unresolved']
+
+    def get_total_count(self):
+        # One summary row per owner: O(owners), not COUNT(*) over the table
+        totals = TODOSummary.objects.aggregate(open=Sum('open_count'), resolved=Sum('resolved_count'))
+        return None if totals['open'] is None else totals['open'] + totals['resolved']
+
+    def bumped(self):
+        # What save() would have changed too: open edit forms must conflict
+        # and list ETags (keyed on updated_at) must change.
+        return {'version': F('version') + 1, 'updated_at': timezone.now()}
+
+    @admin.action(description='Mark selected TODOs as resolved')
+    def mark_resolved(self, request, queryset):
+        # One UPDATE for the whole selection instead of a save() per row
+        updated = queryset.update(resolved=True, **self.bumped())
+        self.message_user(request, f'{updated} TODO(s) marked as resolved.')
+
+    @admin.action(description='Mark selected TODOs as unresolved')
+    def mark_unresolved(self, request, queryset):
+        updated = queryset.update(resolved=False, **self.bumped())
+        self.message_user(request, f'{updated} TODO(s) marked as unresolved.')
+
+
+@admin.register(ArchivedTODO)
+class ArchivedTODOAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ['title', 'owner', 'due_date', 'created_at', 'archived_at']
+    list_filter = ['due_date']
+    search_fields = ['title', 'description']
+    raw_id_fields = ['owner']
+    list_select_related = ['owner']
@@ -0,0 +1,210 @@
+"""
+JSON API for TODOs.
+
+Writes go through ``TODOForm`` so the API and the HTML views share one set
+of validation rules. Listing uses keyset (cursor) pagination on
+``(created_at, id)`` and the export streams NDJSON straight off a server-side
+iterator (an async one under ASGI), so neither gets slower or hungrier as the table grows. Every
+endpoint works on the requesting user's TODOs only (``TODO.objects.for_owner``).
+
+The API authenticates with the session cookie, so writes are CSRF protected
+like the HTML forms: send the ``csrftoken`` cookie's value (set by the form
+pages, e.g. ``/create/``) in an ``X-CSRFToken`` header, with a JSON body
+(``Content-Type: application/json``).
+
+Without a signed-in user, requests work on the unowned TODOs. That is
+deliberate: a single-user install has no accounts and keeps every TODO
+unowned. Installs with accounts should give every TODO an owner
+(``import_todos --owner``, or the admin), since the unowned ones stay open to
+anyone who can reach the site.
+"""
+
+import base64
+import binascii
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Q
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.dateparse import parse_datetime
+from django.views.decorators.http import require_http_methods
+
+from .forms import TODOEditForm, TODOForm
+from .models import TODO, owner_of
+
+FIELDS = ['id', 'title', 'description', 'due_date', 'resolved', 'created_at', 'updated_at', 'version']
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+EXPORT_CHUNK_SIZE = 2000
+
+
+class BadRequest(Exception):
+    status = 400
+
+
+class UnsupportedMediaType(BadRequest):
+    status = 415
+
+
+def serialize(todo):
+    return {field: getattr(todo, field) for field in FIELDS}
+
+
+def encode_cursor(todo):
+    payload = json.dumps([todo.created_at.isoformat(), todo.pk])
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        created_at = parse_datetime(created_at)
+    except (binascii.Error, ValueError, TypeError):
+        raise BadRequest('Invalid cursor')
+    if created_at is None or not isinstance(pk, int):
+        raise BadRequest('Invalid cursor')
+    return created_at, pk
+
+
+def parse_limit(value):
+    if value is None:
+        return DEFAULT_LIMIT
+    try:
+        limit = int(value)
+    except ValueError:
+        raise BadRequest('Invalid limit')
+    return max(1, min(limit, MAX_LIMIT))
+
+
+def parse_body(request):
+    if request.content_type != 'application/json':
+        raise UnsupportedMediaType('Expected Content-Type: application/json')
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        raise BadRequest('Invalid JSON')
+    if not isinstance(data, dict):
+        raise BadRequest('Expected a JSON object')
+    return data
+
+
+def form_data(todo, payload):
+    """
+    Merge a (possibly partial) payload over the TODO's current values so
+    ``TODOForm`` can validate the result as a whole.
+    """
+    data = {}
+    if todo is not None:
+        data = {
+            'title': todo.title,
+            'description': todo.description,
+            'due_date': todo.due_date.isoformat() if todo.due_date else '',
+        }
+    for field in [*TODOForm.Meta.fields, 'version']:
+        if field in payload:
+            data[field] = '' if payload[field] is None else payload[field]
+    return data
+
+
+def save(request, todo=None):
+    payload = parse_body(request)
+    resolved = payload.get('resolved')
+    if resolved is not None and not isinstance(resolved, bool):
+        return JsonResponse({'errors': {'resolved': ['Must be a boolean.']}}, status=400)
+    form_class = TODOForm if todo is None else TODOEditForm
+    form = form_class(form_data(todo, payload), instance=todo)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    if todo is None:
+        todo = form.save(commit=False)
+        todo.owner = owner_of(request.user)
+        if resolved is not None:
+            todo.resolved = resolved
+        todo.save()
+        return JsonResponse(serialize(todo), status=201)
+    extra = {} if resolved is None else {'resolved': resolved}
+    if not form.save_if_unchanged(**extra):
+        return JsonResponse({'error': 'TODO was modified by another request'}, status=409)
+    todo.refresh_from_db()
+    return JsonResponse(serialize(todo))
+
+
+def list_todos(request):
+    limit = parse_limit(request.GET.get('limit'))
+    queryset = TODO.objects.for_owner(request.user).order_by('-created_at', '-pk')
+    cursor = request.GET.get('cursor')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        )
+    todos = list(queryset[:limit + 1])
+    next_url = None
+    if len(todos) > limit:
+        todos = todos[:limit]
+        next_url = '{}?limit={}&cursor={}'.format(
+            reverse('todos:api_list'), limit, encode_cursor(todos[-1])
+        )
+    return JsonResponse({'results': [serialize(todo) for todo in todos], 'next': next_url})
+
+
+@require_http_methods(["GET", "POST"])
+def todo_collection(request):
+    """
+    GET lists TODOs newest first, one cursor page at a time; POST creates one.
+    """
+    try:
+        if request.method == 'POST':
+            return save(request)
+        return list_todos(request)
+    except BadRequest as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+
+
+@require_http_methods(["GET", "PATCH", "DELETE"])
+def todo_detail(request, pk):
+    """
+    Retrieve, partially update or delete a single TODO.
+    """
+    todo = TODO.objects.for_owner(request.user).filter(pk=pk).first()
+    if todo is None:
+        return JsonResponse({'error': 'TODO not found'}, status=404)
+    try:
+        if request.method == 'PATCH':
+            return save(request, todo)
+    except BadRequest as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    if request.method == 'DELETE':
+        todo.delete()
+        return HttpResponse(status=204)
+    return JsonResponse(serialize(todo))
+
+
+def export_line(row):
+    return json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+async def aexport_lines(rows):
+    async for row in rows.aiterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield export_line(row)
+
+
+@require_http_methods(["GET"])
+def todo_export(request):
+    """
+    Stream every TODO of the requesting user as one JSON document per line.
+    """
+    # values(), not values_list(): the values_list iterable runs its query as
+    # soon as it is iterated, which aiterator() does on the event loop
+    rows = TODO.objects.for_owner(request.user).order_by('pk').values(*FIELDS)
+    if isinstance(request, ASGIRequest):
+        # ASGIHandler would buffer a sync iterator whole (sync_to_async(list))
+        # before sending a byte; an async one streams chunk by chunk.
+        lines = aexport_lines(rows)
+    else:
+        lines = (export_line(row) for row in rows.iterator(chunk_size=EXPORT_CHUNK_SIZE))
+    response = StreamingHttpResponse(lines, content_type='application/x-ndjson')
+    response['Content-Disposition'] = 'attachment; filename="todos.ndjson"'
+    return response
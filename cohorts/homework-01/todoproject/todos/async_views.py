@@ -0,0 +1,133 @@
+"""
+Async versions of the TODO read and toggle paths, for ASGI deployments.
+
+They mirror ``views.todo_list``, ``views.todo_toggle`` and the API list and
+detail endpoints, but read through the async ORM so a request does not hold
+a worker thread while it waits on the database. ``urls.py`` serves them in
+place of the sync views when ``TODOS_ASYNC_VIEWS`` is set. Writes that need
+``TODOForm`` (API create/update/delete) still run the sync code in one hop.
+"""
+
+from asgiref.sync import sync_to_async
+from django.contrib import messages
+from django.db.models import Q
+from django.http import Http404, HttpResponse, JsonResponse
+from django.shortcuts import redirect
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import require_http_methods
+from django.views.decorators.vary import vary_on_headers
+
+from . import api, cache, freshness, views
+from .models import TODO, ArchivedTODO, owner_of
+
+LIST_CHUNK_SIZE = 500
+
+
+async def _flash_messages(request):
+    # Message storage falls back to the session, which only has a sync API
+    return await sync_to_async(list)(messages.get_messages(request))
+
+
+@cache_control(no_cache=True)
+async def todo_list(request):
+    flashed = await _flash_messages(request)
+    etag = last_modified = None
+    if not flashed:
+        etag = quote_etag(await freshness.alist_etag(request))
+        last_modified = (await freshness.alist_state(request))[-1]
+        response = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+        if response is not None:
+            return response
+
+    include_archived = request.GET.get('include_archived') == '1'
+    owner = owner_of(await request.auser())
+
+    async def render_items():
+        todos = TODO.objects.for_owner(owner)
+        context = {
+            'todos': [todo async for todo in todos.aiterator(chunk_size=LIST_CHUNK_SIZE)],
+            'include_archived': include_archived,
+        }
+        if include_archived:
+            archived = ArchivedTODO.objects.filter(owner=owner)[:views.ARCHIVED_LIMIT]
+            context['archived'] = [todo async for todo in archived]
+        return render_to_string('todos/list_items.html', context)
+
+    items = await cache.aget_fragment(views.list_fragment_name(owner, include_archived), render_items)
+    # Passing the already-read messages keeps the template off the session
+    response = HttpResponse(render_to_string('todos/list.html', {
+        'include_archived': include_archived, 'items': items, 'messages': flashed,
+    }, request))
+    if etag:
+        response.headers['ETag'] = etag
+    if last_modified:
+        response.headers['Last-Modified'] = http_date(last_modified.timestamp())
+    return response
+
+
+@vary_on_headers(*views.FRAGMENT_HEADERS)
+async def todo_toggle(request, pk):
+    todos = TODO.objects.for_owner(await request.auser()).filter(pk=pk)
+    if not await todos.atoggle_resolved():
+        raise Http404('No TODO matches the given query.')
+    format = views.fragment_format(request)
+    if format:
+        try:
+            todo = await todos.aget()
+        except TODO.DoesNotExist:
+            raise Http404('No TODO matches the given query.')
+        return views.fragment_response(request, format, 'replace', pk, todo)
+    return redirect('todos:list')
+
+
+async def list_todos(request):
+    limit = api.parse_limit(request.GET.get('limit'))
+    queryset = TODO.objects.for_owner(await request.auser()).order_by('-created_at', '-pk')
+    cursor = request.GET.get('cursor')
+    if cursor:
+        created_at, pk = api.decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+        )
+    todos = [todo async for todo in queryset[:limit + 1].aiterator()]
+    next_url = None
+    if len(todos) > limit:
+        todos = todos[:limit]
+        next_url = '{}?limit={}&cursor={}'.format(
+            reverse('todos:api_list'), limit, api.encode_cursor(todos[-1])
+        )
+    return JsonResponse({'results': [api.serialize(todo) for todo in todos], 'next': next_url})
+
+
+@require_http_methods(["GET", "POST"])
+async def api_todo_collection(request):
+    """
+    Async ``api.todo_collection``: GET lists, POST creates.
+    """
+    if request.method == 'POST':
+        return await sync_to_async(api.todo_collection)(request)
+    try:
+        return await list_todos(request)
+    except api.BadRequest as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+
+
+@require_http_methods(["GET", "PATCH", "DELETE"])
+async def api_todo_detail(request, pk):
+    """
+    Async ``api.todo_detail``: GET reads, PATCH and DELETE run the sync view.
+    """
+    if request.method != 'GET':
+        return await sync_to_async(api.todo_detail)(request, pk)
+    todo = await TODO.objects.for_owner(await request.auser()).filter(pk=pk).afirst()
+    if todo is None:
+        return JsonResponse({'error': 'TODO not found'}, status=404)
+    return JsonResponse(api.serialize(todo))
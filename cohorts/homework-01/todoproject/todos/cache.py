@@ -0,0 +1,139 @@
+"""
+Versioned fragment cache for rendered TODO markup.
+
+Every cached fragment key embeds the current TODO table version.  Saving or
+deleting a TODO bumps the version (see ``todos/signals.py``); writes that
+bypass model signals (``update()``, ``bulk_create()``) call ``invalidate()``
+themselves.  Invalidation is a single ``incr`` and old fragments simply stop
+being addressed and age out of the backend.
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.safestring import mark_safe
+
+VERSION_KEY = 'todos:version'
+HITS_KEY = 'todos:stats:hits'
+MISSES_KEY = 'todos:stats:misses'
+
+
+def get_cache():
+    return caches[getattr(settings, 'TODOS_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'TODOS_CACHE_TIMEOUT', 300)
+
+
+def _seed():
+    # Seeding from the clock means an evicted counter never restarts at a
+    # value whose fragments may still be sitting in the cache.
+    return time.time_ns()
+
+
+def current_version():
+    cache = get_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, _seed(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+async def acurrent_version():
+    cache = get_cache()
+    version = await cache.aget(VERSION_KEY)
+    if version is None:
+        await cache.aadd(VERSION_KEY, _seed(), None)
+        version = await cache.aget(VERSION_KEY)
+    return version
+
+
+def bump_version():
+    cache = get_cache()
+    try:
+        return cache.incr(VERSION_KEY)
+    except ValueError:
+        version = _seed()
+        cache.set(VERSION_KEY, version, None)
+        return version
+
+
+def invalidate():
+    # Bump immediately so this transaction never reads its own stale markup,
+    # and again on commit so nothing another request rendered from the
+    # pre-commit rows survives under the new version.
+    bump_version()
+    transaction.on_commit(bump_version)
+
+
+def _count(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+async def _acount(key):
+    cache = get_cache()
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, None)
+        await cache.aincr(key)
+
+
+def get_fragment(name, render):
+    """
+    Return the cached markup for ``name`` at the current table version,
+    calling ``render()`` to produce and store it on a miss.
+    """
+    cache = get_cache()
+    key = f'todos:fragment:{name}:{current_version()}'
+    html = cache.get(key)
+    if html is not None:
+        _count(HITS_KEY)
+        return mark_safe(html)
+    _count(MISSES_KEY)
+    html = render()
+    cache.set(key, str(html), get_timeout())
+    return mark_safe(html)
+
+
+async def aget_fragment(name, render):
+    """
+    ``get_fragment()`` for async views, where ``render()`` is a coroutine.
+    """
+    cache = get_cache()
+    key = f'todos:fragment:{name}:{await acurrent_version()}'
+    html = await cache.aget(key)
+    if html is not None:
+        await _acount(HITS_KEY)
+        return mark_safe(html)
+    await _acount(MISSES_KEY)
+    html = await render()
+    await cache.aset(key, str(html), get_timeout())
+    return mark_safe(html)
+
+
+def get_stats():
+    cache = get_cache()
+    hits = cache.get(HITS_KEY, 0)
+    misses = cache.get(MISSES_KEY, 0)
+    lookups = hits + misses
+    return {
+        'backend': f'{type(cache).__module__}.{type(cache).__name__}',
+        'version': current_version(),
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / lookups if lookups else 0.0,
+    }
+
+
+def reset_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,24 @@
+from django.core.checks import Tags, Warning, register
+from django.db import DEFAULT_DB_ALIAS
+
+
+@register(Tags.database)
+def check_todo_indexes(app_configs, databases=None, **kwargs):
+    """
+    Warn about TODO indexes an interrupted ``import_todos --fast`` left
+    dropped. Runs with ``migrate`` and ``check --database``.
+    """
+    from .management.commands.import_todos import missing_indexes
+    from .models import TODO
+
+    if not databases or DEFAULT_DB_ALIAS not in databases:
+        return []
+    return [
+        Warning(
+            f'TODO index {index.name} is missing from the database.',
+            hint='Run "manage.py restore_todo_indexes".',
+            obj=TODO,
+            id='todos.W001',
+        )
+        for index in missing_indexes()
+    ]
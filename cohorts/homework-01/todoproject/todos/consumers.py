@@ -0,0 +1,67 @@
+import asyncio
+import json
+
+from channels.generic.websocket import AsyncWebsocketConsumer
+from todoproject.profiling import ProfiledConsumerMixin
+
+from . import live
+from .models import owner_of
+
+# How long changes are collected before going out as one message
+COALESCE_SECONDS = 0.1
+
+
+class TODOListConsumer(ProfiledConsumerMixin, AsyncWebsocketConsumer):
+    """
+    Pushes changes to the connected user's TODOs (the unowned ones for
+    anonymous connections) to an open list page. Changes arriving within
+    ``COALESCE_SECONDS`` of each other go out together, with only the
+    latest change per row.
+    """
+
+    async def connect(self):
+        self.pending = {}
+        self.reload = False
+        self.flush_task = None
+        owner = owner_of(self.scope.get('user'))
+        self.live_groups = [live.GROUP, live.owner_group(owner and owner.pk)]
+        for group in self.live_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, close_code):
+        if self.flush_task is not None:
+            self.flush_task.cancel()
+        for group in self.live_groups:
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def todos_changes(self, event):
+        for change in event['events']:
+            self.coalesce(change)
+        if len(self.pending) > live.MAX_EVENTS:
+            self.reload = True
+            self.pending = {}
+        if self.flush_task is None:
+            self.flush_task = asyncio.ensure_future(self.flush_later())
+
+    def coalesce(self, change):
+        if change['op'] == 'reload':
+            self.reload = True
+            return
+        previous = self.pending.get(change['id'])
+        if previous is not None and previous['op'] == 'add':
+            if change['op'] == 'remove':
+                # Created and deleted within the window: the page never saw it
+                del self.pending[change['id']]
+                return
+            change = {**change, 'op': 'add'}
+        self.pending[change['id']] = change
+
+    async def flush_later(self):
+        await asyncio.sleep(COALESCE_SECONDS)
+        events = [{'op': 'reload'}] if self.reload else list(self.pending.values())
+        self.pending = {}
+        self.reload = False
+        self.flush_task = None
+        if events:
+            await self.send(text_data=json.dumps({'type': 'changes', 'events': events}))
@@ -10,3 +10,30 @@ class TODOForm(forms.ModelForm):
             'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
             'due_date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
         }
+
+
+class TODOEditForm(TODOForm):
+    """
+    TODOForm carrying the version the user started editing from, so a save
+    can refuse to overwrite changes made in the meantime.
+    """
+    version = forms.IntegerField(required=False, widget=forms.HiddenInput)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['version'].initial = self.instance.version
+
+    def save_if_unchanged(self, **extra):
+        """
+        Write the edit unless the TODO moved past the submitted version.
+        Returns False on a conflict. Without a version this is a plain save.
+        """
+        version = self.cleaned_data.get('version')
+        if version is None:
+            for name, value in extra.items():
+                setattr(self.instance, name, value)
+            self.instance.save()
+            return True
+        fields = {name: getattr(self.instance, name) for name in self._meta.fields}
+        fields.update(extra)
+        return bool(TODO.objects.filter(pk=self.instance.pk).update_if_version(version, **fields))
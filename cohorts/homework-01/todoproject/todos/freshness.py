@@ -0,0 +1,94 @@
+"""
+Validators for conditional GETs on TODO pages.
+
+ETags and Last-Modified dates are derived from a cheap aggregate over the
+requesting owner's TODOs (newest ``updated_at`` and row count) plus the
+``TableVersion`` row that deletes bump, so a 304 can be answered without
+rendering anything.
+"""
+
+import hashlib
+
+from django.contrib import messages
+from django.db.models import Count, Max
+
+from .models import TODO, TableVersion, owner_of
+
+
+def _has_pending_messages(request):
+    # Flash messages are part of the page but not of the validators, so a
+    # response carrying one must never be answered with a 304.
+    return bool(len(messages.get_messages(request)))
+
+
+def _etag(*parts):
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def list_state(request):
+    state = getattr(request, '_todos_list_state', None)
+    if state is None:
+        owner = owner_of(request.user)
+        aggregate = TODO.objects.for_owner(owner).aggregate(latest=Max('updated_at'), count=Count('pk'))
+        version, changed_at = TableVersion.get(TODO._meta.db_table)
+        last_modified = max(filter(None, [aggregate['latest'], changed_at]), default=None)
+        state = (owner and owner.pk, aggregate['count'], version, last_modified)
+        request._todos_list_state = state
+    return state
+
+
+async def alist_state(request):
+    state = getattr(request, '_todos_list_state', None)
+    if state is None:
+        owner = owner_of(await request.auser())
+        aggregate = await TODO.objects.for_owner(owner).aaggregate(
+            latest=Max('updated_at'), count=Count('pk')
+        )
+        version, changed_at = await TableVersion.objects.filter(
+            table=TODO._meta.db_table
+        ).values_list('version', 'changed_at').afirst() or (0, None)
+        last_modified = max(filter(None, [aggregate['latest'], changed_at]), default=None)
+        state = (owner and owner.pk, aggregate['count'], version, last_modified)
+        request._todos_list_state = state
+    return state
+
+
+async def alist_etag(request):
+    # The owner is part of the state: two users' empty lists must not match
+    return _etag(*await alist_state(request), sorted(request.GET.lists()))
+
+
+def list_etag(request, *args, **kwargs):
+    if _has_pending_messages(request):
+        return None
+    return _etag(*list_state(request), sorted(request.GET.lists()))
+
+
+def list_last_modified(request, *args, **kwargs):
+    if _has_pending_messages(request):
+        return None
+    return list_state(request)[-1]
+
+
+def todo_updated_at(request, pk):
+    updated_at = getattr(request, '_todos_updated_at', None)
+    if updated_at is None:
+        updated_at = (
+            TODO.objects.for_owner(request.user).filter(pk=pk)
+            .values_list('updated_at', flat=True).first()
+        )
+        request._todos_updated_at = updated_at
+    return updated_at
+
+
+def todo_etag(request, pk):
+    if _has_pending_messages(request):
+        return None
+    updated_at = todo_updated_at(request, pk)
+    return _etag(pk, updated_at) if updated_at else None
+
+
+def todo_last_modified(request, pk):
+    if _has_pending_messages(request):
+        return None
+    return todo_updated_at(request, pk)
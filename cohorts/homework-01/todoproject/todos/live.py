@@ -0,0 +1,122 @@
+"""
+Live push of TODO changes to open list pages.
+
+Writes describe the rows they changed as ``add``/``replace``/``remove``
+events (the JSON patches of ``views.fragment_response`` plus the rendered
+row) and send them, once their transaction commits, to the channel-layer
+group of each row's owner (``owner_group()``), so a page only hears about
+its user's TODOs. Reloads go to every page through the ``todos`` group.
+``consumers.TODOListConsumer`` coalesces events per page.
+
+Publishing only happens with ``TODOS_LIVE_PUSH`` on (see settings): without
+it, or without channels installed, writes skip every step of it, including
+the queries.
+"""
+
+import json
+import logging
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.template.loader import render_to_string
+
+try:
+    from channels.layers import get_channel_layer
+except ImportError:
+    get_channel_layer = None
+
+GROUP = 'todos'
+# A write touching more rows than this asks pages to reload instead
+MAX_EVENTS = 200
+
+logger = logging.getLogger(__name__)
+
+
+def owner_group(owner_id):
+    return f'{GROUP}.{"unowned" if owner_id is None else owner_id}'
+
+
+def get_layer():
+    if get_channel_layer is None or not getattr(settings, 'TODOS_LIVE_PUSH', False):
+        return None
+    return get_channel_layer()
+
+
+def row_event(op, todo):
+    from .api import serialize
+    return {
+        'op': op,
+        'id': todo.pk,
+        # Round-tripped so dates survive serializing channel layers
+        'todo': json.loads(json.dumps(serialize(todo), cls=DjangoJSONEncoder)),
+        'html': render_to_string('todos/row.html', {'todo': todo}),
+    }
+
+
+def _publish(build):
+    """
+    Send the ``{group: events}`` that ``build()`` returns after commit.
+    """
+    layer = get_layer()
+    if layer is None:
+        return
+
+    def send():
+        try:
+            for group, events in build().items():
+                async_to_sync(layer.group_send)(group, {'type': 'todos.changes', 'events': events})
+        except Exception:
+            # A missed push only leaves pages stale; never fail the write
+            logger.exception('Could not publish TODO changes')
+
+    transaction.on_commit(send)
+
+
+def _reload():
+    return {GROUP: [{'op': 'reload'}]}
+
+
+def _by_owner(todos, event):
+    groups = defaultdict(list)
+    for todo in todos:
+        groups[owner_group(todo.owner_id)].append(event(todo))
+    return groups
+
+
+def publish_rows(op, todos):
+    todos = list(todos)
+    if len(todos) > MAX_EVENTS or any(todo.pk is None for todo in todos):
+        _publish(_reload)
+    elif todos:
+        _publish(lambda: _by_owner(todos, lambda todo: row_event(op, todo)))
+
+
+def publish_removed(todos):
+    # Built now: deleted instances lose their pk before the commit
+    groups = _by_owner(todos, lambda todo: {'op': 'remove', 'id': todo.pk})
+    _publish(lambda: groups)
+
+
+def capture(queryset):
+    """
+    The pks a write to ``queryset`` is about to change, for
+    ``publish_changed()``; None when live push is off.
+    """
+    if get_layer() is None:
+        return None
+    return list(queryset.order_by().values_list('pk', flat=True)[:MAX_EVENTS + 1])
+
+
+def publish_changed(pks):
+    if pks is None:
+        return
+    if len(pks) > MAX_EVENTS:
+        _publish(_reload)
+    elif pks:
+        from .models import TODO
+        _publish(lambda: _by_owner(
+            TODO.objects.filter(pk__in=pks), lambda todo: row_event('replace', todo)
+        ))
@@ -0,0 +1,77 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from todos import cache, live
+from todos.models import TODO, ArchivedTODO, TableVersion, TODOSummary, summary_state
+
+
+class Command(BaseCommand):
+    help = (
+        'Move resolved TODOs untouched for longer than a threshold into the '
+        'archive table, one short transaction per batch'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--older-than', type=int, default=90, metavar='DAYS',
+            help='Archive resolved TODOs last updated more than DAYS ago (default: 90)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='TODOs moved per transaction (default: 500)',
+        )
+        parser.add_argument(
+            '--pause', type=float, default=0.0, metavar='SECONDS',
+            help='Sleep between batches to leave room for live traffic',
+        )
+        parser.add_argument(
+            '--max-batches', type=int,
+            help='Stop after this many batches; rerun to continue where it left off',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        cutoff = timezone.now() - timedelta(days=options['older_than'])
+        started = time.perf_counter()
+        moved = batches = 0
+        while options['max_batches'] is None or batches < options['max_batches']:
+            count = self.archive_batch(cutoff, options['batch_size'])
+            if not count:
+                break
+            moved += count
+            batches += 1
+            self.stdout.write(f'Batch {batches}: archived {count} TODOs ({moved} total)')
+            if options['pause']:
+                time.sleep(options['pause'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {moved} TODOs in {batches} batches ({time.perf_counter() - started:.1f}s)'
+        ))
+
+    def archive_batch(self, cutoff, batch_size):
+        """
+        Copy one batch into the archive and delete it from the hot table in a
+        single transaction, so an interrupted run never loses or duplicates a
+        TODO and simply resumes with the next batch.
+
+        delete() would send post_delete per row, and each signal updates the
+        summary, bumps the table version and invalidates the cache inside
+        this transaction. One DELETE plus one round of that upkeep for the
+        whole batch keeps the write lock short.
+        """
+        eligible = TODO.objects.filter(resolved=True, updated_at__lt=cutoff)
+        with transaction.atomic():
+            todos = list(eligible.select_for_update().order_by('updated_at', 'pk')[:batch_size])
+            if not todos:
+                return 0
+            ArchivedTODO.objects.bulk_create([ArchivedTODO.from_todo(todo) for todo in todos])
+            eligible.filter(pk__in=[todo.pk for todo in todos])._raw_delete(TODO.objects.db)
+            TODOSummary.apply((*summary_state(todo), -1) for todo in todos)
+            TableVersion.bump(TODO._meta.db_table)
+            cache.invalidate()
+            live.publish_removed(todos)
+        return len(todos)
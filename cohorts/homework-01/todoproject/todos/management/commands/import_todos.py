@@ -0,0 +1,241 @@
+import csv
+import json
+import sys
+import time
+from contextlib import contextmanager
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from todos.forms import TODOForm
+from todos.models import TODO
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'', '0', 'false', 'no', 'n', 'f'}
+
+
+def read_csv(stream):
+    yield from csv.DictReader(stream)
+
+
+def read_ndjson(stream):
+    for line in stream:
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            row = {'__error__': f'Invalid JSON: {e}'}
+        yield row if isinstance(row, dict) else {'__error__': 'Expected a JSON object'}
+
+
+READERS = {'csv': read_csv, 'ndjson': read_ndjson}
+
+
+def parse_resolved(value):
+    if isinstance(value, bool):
+        return value
+    value = str(value if value is not None else '').strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError('Must be a boolean.')
+
+
+class RowValidator:
+    """
+    Validate rows with TODOForm, so imported TODOs follow the same rules as
+    the ones created through the views and the API.
+    """
+
+    def __init__(self, owner=None):
+        self.owner = owner
+
+    def __call__(self, row):
+        """
+        Return ``(todo, errors)`` for one input row.
+        """
+        if '__error__' in row:
+            return None, {'__all__': [row['__error__']]}
+        form = TODOForm(
+            data={field: '' if row.get(field) is None else row[field] for field in TODOForm.Meta.fields},
+            instance=TODO(owner=self.owner),
+        )
+        errors = {}
+        try:
+            resolved = parse_resolved(row.get('resolved'))
+        except ValueError as e:
+            errors['resolved'] = [str(e)]
+        if not form.is_valid():
+            errors.update(form.errors)
+        if errors:
+            return None, errors
+        todo = form.save(commit=False)
+        todo.resolved = resolved
+        return todo, None
+
+
+class Command(BaseCommand):
+    help = 'Stream TODOs from a CSV or NDJSON file into the database in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Input file, or - for stdin')
+        parser.add_argument(
+            '--format', choices=sorted(READERS),
+            help='Input format (default: guessed from the file extension)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Rows per INSERT statement (default: 1000)',
+        )
+        parser.add_argument(
+            '--transaction-size', type=int, default=20000,
+            help='Rows committed per transaction (default: 20000)',
+        )
+        parser.add_argument(
+            '--rejects',
+            help='Where to write rejected rows as NDJSON (default: <path>.rejects.ndjson)',
+        )
+        parser.add_argument(
+            '--owner',
+            help='Username of the user the imported TODOs belong to (default: no owner)',
+        )
+        parser.add_argument(
+            '--fast', action='store_true',
+            help='Apply SQLite-only speedups: larger page cache, in-memory temp '
+                 'store and, into an empty table, index maintenance deferred until '
+                 'the end of the import',
+        )
+
+    def handle(self, *args, **options):
+        path, format, rejects = options['path'], options['format'], options['rejects']
+        batch_size, transaction_size = options['batch_size'], options['transaction_size']
+        if batch_size < 1 or transaction_size < 1:
+            raise CommandError('--batch-size and --transaction-size must be positive')
+        if format is None:
+            format = 'csv' if path.endswith('.csv') else 'ndjson'
+        if rejects is None:
+            rejects = 'rejects.ndjson' if path == '-' else f'{path}.rejects.ndjson'
+        if path != '-' and not Path(path).exists():
+            raise CommandError(f'{path} does not exist')
+        owner = None
+        if options['owner']:
+            User = get_user_model()
+            try:
+                owner = User.objects.get_by_natural_key(options['owner'])
+            except User.DoesNotExist:
+                raise CommandError(f'No user named {options["owner"]}')
+
+        stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        started = time.perf_counter()
+        imported = rejected = 0
+        try:
+            with open(rejects, 'w', encoding='utf-8') as rejects_file, self.speedups(options['fast']):
+                validate = RowValidator(owner)
+                rows = enumerate(READERS[format](stream), start=1)
+                while True:
+                    chunk = list(islice(rows, transaction_size))
+                    if not chunk:
+                        break
+                    todos = []
+                    for number, row in chunk:
+                        todo, errors = validate(row)
+                        if errors:
+                            rejected += 1
+                            rejects_file.write(json.dumps({'line': number, 'row': row, 'errors': errors}) + '\n')
+                        else:
+                            todos.append(todo)
+                    with transaction.atomic():
+                        TODO.objects.bulk_create(todos, batch_size=batch_size)
+                    imported += len(todos)
+                    self.report(imported, rejected, started)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {imported} TODOs ({rejected} rejected) in {elapsed:.1f}s '
+            f'({imported / elapsed if elapsed else 0:.0f} rows/sec)'
+        ))
+        if rejected:
+            self.stdout.write(f'Rejected rows written to {rejects}')
+        else:
+            Path(rejects).unlink()
+
+    def report(self, imported, rejected, started):
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f'{imported} imported, {rejected} rejected, '
+            f'{imported / elapsed if elapsed else 0:.0f} rows/sec'
+        )
+
+    @contextmanager
+    def speedups(self, enabled):
+        if not enabled or connection.vendor != 'sqlite':
+            if enabled:
+                self.stderr.write('--fast only applies to SQLite; ignoring')
+            yield
+            return
+        with sqlite_speedups():
+            yield
+
+
+def missing_indexes():
+    """
+    ``TODO._meta.indexes`` missing from the database, as an interrupted
+    ``--fast`` load leaves them.
+    """
+    table = TODO._meta.db_table
+    with connection.cursor() as cursor:
+        if table not in connection.introspection.table_names(cursor):
+            return []
+        existing = connection.introspection.get_constraints(cursor, table)
+    return [index for index in TODO._meta.indexes if index.name not in existing]
+
+
+def restore_indexes():
+    """
+    Recreate the missing TODO indexes and return them.
+    """
+    indexes = missing_indexes()
+    if indexes:
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(TODO, index)
+    return indexes
+
+
+@contextmanager
+def sqlite_speedups():
+    """
+    SQLite settings for bulk loads into the TODO table: a larger page cache,
+    in-memory temp storage and, when the table starts out empty, secondary
+    indexes built once at the end.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute('PRAGMA cache_size = -262144')
+        cursor.execute('PRAGMA temp_store = MEMORY')
+    # Repair what an earlier load killed midway left dropped
+    restore_indexes()
+    # Building each secondary index once over the finished table is much
+    # cheaper than updating it row by row. That is only worth leaving the
+    # table unindexed for when nobody is reading it yet: on a populated
+    # table, every owner-scoped query would scan it until the load ends.
+    indexes = list(TODO._meta.indexes)
+    if not indexes or TODO.objects.exists():
+        yield
+        return
+    with connection.schema_editor() as editor:
+        for index in indexes:
+            editor.remove_index(TODO, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as editor:
+            for index in indexes:
+                editor.add_index(TODO, index)
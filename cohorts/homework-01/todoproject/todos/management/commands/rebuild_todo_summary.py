@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from todos import summary
+
+
+class Command(BaseCommand):
+    help = 'Recount the TODO summary totals and due-date buckets from the TODO table'
+
+    def handle(self, *args, **options):
+        buckets = summary.rebuild()
+        totals = summary.get_summary()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt summary: {totals['open']} open, {totals['resolved']} resolved, "
+            f"{buckets} due dates"
+        ))
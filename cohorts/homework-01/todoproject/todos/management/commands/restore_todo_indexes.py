@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from .import_todos import restore_indexes
+
+
+class Command(BaseCommand):
+    help = 'Recreate TODO indexes missing from the database, e.g. after an interrupted import_todos --fast'
+
+    def handle(self, *args, **options):
+        indexes = restore_indexes()
+        if indexes:
+            self.stdout.write(self.style.SUCCESS(
+                f"Restored {len(indexes)} indexes: {', '.join(index.name for index in indexes)}"
+            ))
+        else:
+            self.stdout.write('No TODO indexes missing')
@@ -0,0 +1,209 @@
+import random
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, time as dt_time, timedelta
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from todos import cache, summary
+from todos.models import TODO, TableVersion
+from .import_todos import sqlite_speedups
+
+VERBS = ['Review', 'Fix', 'Write', 'Update', 'Plan', 'Call', 'Email', 'Refactor', 'Test', 'Book', 'Pay', 'Clean']
+OBJECTS = [
+    'quarterly report', 'login bug', 'release notes', 'dependencies', 'team offsite', 'dentist',
+    'landlord', 'billing module', 'search index', 'flight', 'electricity bill', 'garage',
+    'onboarding docs', 'API docs', 'backup job', 'expense claim',
+]
+SENTENCES = [
+    'Check with the team first.', 'Blocked on feedback.', 'Low priority.',
+    'See the thread from last week.', 'Needs a second pair of eyes.', 'Do it before Friday.',
+    'Split into smaller tasks if it grows.', 'Ask for the latest numbers.',
+]
+
+
+def generate(rows, seed, anchor, days, owners=()):
+    """
+    Yield ``rows`` unsaved TODOs, identical for the same arguments.
+
+    Creation times lean towards the recent end of the ``days`` window, 40%
+    of TODOs have no due date and the rest fall due one to a few weeks after
+    creation, and the older a TODO is the likelier it is resolved, with
+    ``updated_at`` set to when it was resolved. With ``owners``, TODOs are
+    spread over them unevenly, the first owners getting the most.
+    """
+    rng = random.Random(seed)
+    # A stream of its own, so owners don't change the TODOs a seed produces
+    owner_rng = random.Random(f'{seed}:owners')
+    end = timezone.make_aware(datetime.combine(anchor, dt_time()))
+    window = days * 86400
+    for _ in range(rows):
+        # Squaring skews towards zero, i.e. towards recently created TODOs
+        age = window * rng.random() ** 2
+        created_at = end - timedelta(seconds=age)
+        due_date = None
+        if rng.random() >= 0.4:
+            due_date = created_at.date() + timedelta(days=int(rng.expovariate(1 / 14)))
+        age_days = age / 86400
+        resolved = rng.random() < (0.9 if age_days > 90 else 0.6 if age_days > 14 else 0.2)
+        updated_at = created_at
+        if resolved:
+            updated_at = created_at + timedelta(seconds=rng.uniform(0, age))
+        description = ''
+        if rng.random() >= 0.3:
+            description = ' '.join(rng.sample(SENTENCES, rng.randint(1, 3)))
+        owner = None
+        if owners:
+            owner = owners[int(len(owners) * owner_rng.random() ** 2)]
+        yield TODO(
+            owner=owner,
+            title=f'{rng.choice(VERBS)} {rng.choice(OBJECTS)} #{rng.randint(1, 9999)}',
+            description=description,
+            due_date=due_date,
+            resolved=resolved,
+            created_at=created_at,
+            updated_at=updated_at,
+        )
+
+
+def get_owners(usernames):
+    """
+    The users with ``usernames``, in that order, creating missing ones
+    without a usable password.
+    """
+    User = get_user_model()
+    existing = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    password = make_password(None)
+    User.objects.bulk_create(
+        [User(username=username, password=password) for username in usernames if username not in existing],
+        batch_size=1000,
+    )
+    users = User.objects.in_bulk(usernames, field_name='username')
+    return [users[username] for username in usernames]
+
+
+def insert(todos, batch_size):
+    """
+    Insert ``todos`` keeping their generated ``updated_at``.
+
+    ``updated_at`` is auto_now, so bulk_create stamps it with the current
+    time; the generated values are written back by a second statement
+    rather than by switching auto_now off on the field every thread shares.
+    """
+    history = [todo.updated_at for todo in todos]
+    TODO.objects.bulk_create(todos, batch_size=batch_size)
+    field = TODO._meta.get_field('updated_at')
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'UPDATE {quote(TODO._meta.db_table)} SET {quote(field.column)} = %s '
+            f'WHERE {quote(TODO._meta.pk.column)} = %s',
+            [(field.get_db_prep_value(value, connection), todo.pk) for todo, value in zip(todos, history)],
+        )
+
+
+class Command(BaseCommand):
+    help = 'Seed a reproducible synthetic TODO dataset for load tests and benchmarks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--rows', type=int, default=10000,
+            help='Number of TODOs to create (default: 10000)',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=1,
+            help='Random seed; the same seed, rows and anchor give the same data (default: 1)',
+        )
+        parser.add_argument(
+            '--anchor', type=date.fromisoformat,
+            help='Date the dataset is generated backwards from, YYYY-MM-DD (default: today)',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='How far back creation dates go (default: 365)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Rows per INSERT statement (default: 2000)',
+        )
+        parser.add_argument(
+            '--transaction-size', type=int, default=100000,
+            help='Rows committed per transaction (default: 100000)',
+        )
+        owners = parser.add_mutually_exclusive_group()
+        owners.add_argument(
+            '--owner',
+            help='Username that owns every TODO, created if missing (default: no owner)',
+        )
+        owners.add_argument(
+            '--owners', type=int,
+            help='Spread the TODOs over this many users, seed-user-1 to seed-user-N, created if missing',
+        )
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Delete all existing TODOs first',
+        )
+        parser.add_argument(
+            '--fast', action='store_true',
+            help='Apply the SQLite speedups of import_todos --fast',
+        )
+
+    def handle(self, *args, **options):
+        rows, batch_size, transaction_size = options['rows'], options['batch_size'], options['transaction_size']
+        if rows < 1 or batch_size < 1 or transaction_size < 1 or options['days'] < 1:
+            raise CommandError('--rows, --days, --batch-size and --transaction-size must be positive')
+        if options['owners'] is not None and options['owners'] < 1:
+            raise CommandError('--owners must be positive')
+        anchor = options['anchor'] or timezone.localdate()
+        if options['clear']:
+            self.clear()
+        usernames = []
+        if options['owner']:
+            usernames = [options['owner']]
+        elif options['owners']:
+            usernames = [f'seed-user-{number}' for number in range(1, options['owners'] + 1)]
+        owners = get_owners(usernames) if usernames else ()
+
+        started = time.perf_counter()
+        created = 0
+        todos = generate(rows, options['seed'], anchor, options['days'], owners)
+        with self.speedups(options['fast']):
+            while chunk := list(islice(todos, transaction_size)):
+                with transaction.atomic():
+                    insert(chunk, batch_size)
+                created += len(chunk)
+                elapsed = time.perf_counter() - started
+                self.stdout.write(f'{created}/{rows} TODOs, {created / elapsed:.0f} rows/sec')
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {created} TODOs (seed {options["seed"]}, anchor {anchor}) in {elapsed:.1f}s'
+        ))
+
+    def clear(self):
+        # delete() would load every row to send its post_delete signal; one
+        # DELETE statement plus redoing what those signals maintain is what
+        # makes clearing millions of rows feasible.
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {connection.ops.quote_name(TODO._meta.db_table)}')
+            deleted = cursor.rowcount
+            summary.rebuild()
+            TableVersion.bump(TODO._meta.db_table)
+        cache.invalidate()
+        self.stdout.write(f'Deleted {deleted} existing TODOs')
+
+    @contextmanager
+    def speedups(self, enabled):
+        if enabled and connection.vendor != 'sqlite':
+            self.stderr.write('--fast only applies to SQLite; ignoring')
+            enabled = False
+        if not enabled:
+            yield
+            return
+        with sqlite_speedups():
+            yield
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:00
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TableVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('table', models.CharField(max_length=100, unique=True)),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('changed_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ArchivedTODO',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('original_id', models.BigIntegerField()),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('due_date', models.DateField(blank=True, null=True)),
+                ('resolved', models.BooleanField(default=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('owner', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='archived_todos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'archived TODO',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['-created_at'], name='archivedtodo_created_idx'), models.Index(fields=['due_date'], name='archivedtodo_due_date_idx'), models.Index(fields=['owner', '-created_at'], name='archivedtodo_owner_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='DueDateSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_date', models.DateField()),
+                ('open_count', models.BigIntegerField(default=0)),
+                ('resolved_count', models.BigIntegerField(default=0)),
+                ('owner', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['due_date'],
+                'indexes': [models.Index(fields=['owner', 'due_date'], name='duedatesummary_owner_idx')],
+                'constraints': [models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('owner', models.Value(0)), models.F('due_date'), name='duedatesummary_owner_due_date_uniq')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TODO',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('description', models.TextField(blank=True)),
+                ('due_date', models.DateField(blank=True, null=True)),
+                ('resolved', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('version', models.PositiveIntegerField(default=0, editable=False)),
+                ('owner', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='todos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['resolved', 'updated_at'], name='todo_resolved_updated_idx'), models.Index(fields=['-created_at', '-id'], name='todo_created_idx'), models.Index(fields=['resolved', '-created_at'], name='todo_resolved_created_idx'), models.Index(fields=['due_date'], name='todo_due_date_idx'), models.Index(fields=['owner', 'resolved', '-created_at'], name='todo_owner_resolved_idx'), models.Index(fields=['owner', 'due_date'], name='todo_owner_due_date_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TODOSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('open_count', models.BigIntegerField(default=0)),
+                ('resolved_count', models.BigIntegerField(default=0)),
+                ('owner', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'TODO summary',
+                'constraints': [models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('owner', models.Value(0)), name='todosummary_owner_uniq')],
+            },
+        ),
+    ]
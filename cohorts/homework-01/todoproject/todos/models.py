@@ -1,16 +1,346 @@
-from django.db import models
+from collections import Counter, defaultdict
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Case, Count, F, Value, When
+from django.db.models.functions import Coalesce
 from django.utils import timezone
+from . import cache, live
+
+# What the summary tables count a TODO by, as update() kwargs and as attnames
+SUMMARY_FIELDS = {'owner', 'owner_id', 'resolved', 'due_date'}
+SUMMARY_STATE = ('owner_id', 'resolved', 'due_date')
+
+
+def owner_of(user):
+    """
+    The owner a request works as: its user once signed in, else None, which
+    stands for the TODOs nobody owns (all of them in a single-user install).
+    """
+    return user if user is not None and user.is_authenticated else None
+
+
+def summary_state(todo):
+    """
+    What the summary tables count ``todo`` as: ``(owner_id, resolved, due_date)``.
+    """
+    return tuple(getattr(todo, attname) for attname in SUMMARY_STATE)
+
+
+def _updated_owner_id(kwargs, owner_id):
+    if 'owner' in kwargs:
+        return getattr(kwargs['owner'], 'pk', kwargs['owner'])
+    return kwargs.get('owner_id', owner_id)
+
+
+class TODOQuerySet(models.QuerySet):
+    def for_owner(self, user):
+        """
+        The TODOs of ``user`` (see ``owner_of()``). Every per-user read
+        starts here so it stays on the owner-first indexes.
+        """
+        return self.filter(owner=owner_of(user))
+
+    def update(self, **kwargs):
+        """
+        ``QuerySet.update()`` that keeps ``TODOSummary`` in step and
+        invalidates rendered TODOs, since neither hears about it otherwise.
+        """
+        tracked = SUMMARY_FIELDS & kwargs.keys()
+        if any(hasattr(kwargs[field], 'resolve_expression') for field in tracked):
+            raise TypeError(
+                'TODO.objects.update() needs plain values for owner/resolved/due_date '
+                'to maintain the summary; use toggle_resolved() to flip resolved.'
+            )
+        pks = live.capture(self)
+        if tracked:
+            updated = self._update_tracked(
+                lambda owner_id, resolved, due_date: (
+                    _updated_owner_id(kwargs, owner_id),
+                    kwargs.get('resolved', resolved),
+                    kwargs.get('due_date', due_date),
+                ),
+                **kwargs,
+            )
+        else:
+            updated = super().update(**kwargs)
+        if updated:
+            cache.invalidate()
+            live.publish_changed(pks)
+        return updated
+
+    update.alters_data = True
+
+    def _update_tracked(self, new_state, **kwargs):
+        # Count the affected rows per summary state before the UPDATE
+        # and move each group to its new bucket afterwards, all in one
+        # transaction. It reads before it writes, so on SQLite it needs the
+        # write lock from the start (transaction_mode IMMEDIATE in settings):
+        # a concurrent writer can't upgrade a read lock and fails instead.
+        with transaction.atomic(using=self.db):
+            groups = list(
+                self.order_by().values_list(*SUMMARY_STATE).annotate(n=Count('pk'))
+            )
+            updated = super().update(**kwargs)
+            changes = []
+            for *state, n in groups:
+                state = tuple(state)
+                new = new_state(*state)
+                if new != state:
+                    changes += [(*state, -n), (*new, n)]
+            TODOSummary.apply(changes)
+        return updated
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            TODOSummary.apply((*summary_state(todo), 1) for todo in objs)
+        if objs:
+            cache.invalidate()
+            live.publish_rows('add', objs)
+        return objs
+
+    bulk_create.alters_data = True
+
+    def toggle_resolved(self):
+        """
+        Flip ``resolved`` with a conditional UPDATE instead of a read and a
+        write back, so concurrent toggles never lose each other's writes.
+        The same transaction first counts the rows per summary state and
+        then moves them between summary buckets. Returns the row count.
+        """
+        pks = live.capture(self)
+        updated = self._update_tracked(
+            lambda owner_id, resolved, due_date: (owner_id, not resolved, due_date),
+            resolved=Case(When(resolved=True, then=Value(False)), default=Value(True)),
+            version=F('version') + 1,
+            updated_at=timezone.now(),
+        )
+        if updated:
+            cache.invalidate()
+            live.publish_changed(pks)
+        return updated
+
+    async def atoggle_resolved(self):
+        # One hop for the whole transaction: async ORM calls can't share one
+        return await sync_to_async(self.toggle_resolved)()
+
+    def update_if_version(self, version, **fields):
+        """
+        Apply ``fields`` only to rows still at ``version``. Returns the row
+        count, so 0 means someone else changed (or deleted) the row first.
+        """
+        return self.filter(version=version).update(
+            version=F('version') + 1, updated_at=timezone.now(), **fields
+        )
+
 
 class TODO(models.Model):
+    # No index of its own: the composite indexes below all lead with owner
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='todos', db_index=False,
+    )
     title = models.CharField(max_length=200)
     description = models.TextField(blank=True)
     due_date = models.DateField(null=True, blank=True)
     resolved = models.BooleanField(default=False)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
+    version = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = TODOQuerySet.as_manager()
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Drives the archival scan for old resolved TODOs
+            models.Index(fields=['resolved', 'updated_at'], name='todo_resolved_updated_idx'),
+            # Changelist ordering, its resolved/due date filters and keyset pages
+            models.Index(fields=['-created_at', '-id'], name='todo_created_idx'),
+            models.Index(fields=['resolved', '-created_at'], name='todo_resolved_created_idx'),
+            models.Index(fields=['due_date'], name='todo_due_date_idx'),
+            # Per-owner lists, counts and keyset pages, one owner's rows only
+            models.Index(fields=['owner', 'resolved', '-created_at'], name='todo_owner_resolved_idx'),
+            # Per-owner overdue counts and due date calendars
+            models.Index(fields=['owner', 'due_date'], name='todo_owner_due_date_idx'),
+        ]
 
     def __str__(self):
         return self.title
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        todo = super().from_db(db, field_names, values)
+        # Remember what the summary counted this row as, so saving it can
+        # move it between buckets without re-reading the row.
+        if set(SUMMARY_STATE) <= todo.__dict__.keys():
+            todo._summary_state = summary_state(todo)
+        return todo
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            self.version += 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version'}
+        # Atomic so the post_save summary update commits with the row itself
+        with transaction.atomic(using=kwargs.get('using')):
+            if not self._state.adding and getattr(self, '_summary_state', None) is None:
+                self._summary_state = (
+                    TODO.objects.filter(pk=self.pk).values_list(*SUMMARY_STATE).first()
+                )
+            super().save(*args, **kwargs)
+
+
+class ArchivedTODO(models.Model):
+    """
+    Cold storage for resolved TODOs moved out of the hot table by the
+    ``archive_todos`` command.
+    """
+    # Not the primary key: SQLite hands a deleted max rowid out again
+    original_id = models.BigIntegerField()
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, null=True, blank=True,
+        related_name='archived_todos', db_index=False,
+    )
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    due_date = models.DateField(null=True, blank=True)
+    resolved = models.BooleanField(default=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name = 'archived TODO'
+        indexes = [
+            models.Index(fields=['-created_at'], name='archivedtodo_created_idx'),
+            models.Index(fields=['due_date'], name='archivedtodo_due_date_idx'),
+            models.Index(fields=['owner', '-created_at'], name='archivedtodo_owner_idx'),
+        ]
+
+    def __str__(self):
+        return self.title
+
+    @classmethod
+    def from_todo(cls, todo):
+        return cls(
+            original_id=todo.pk,
+            owner_id=todo.owner_id,
+            title=todo.title,
+            description=todo.description,
+            due_date=todo.due_date,
+            resolved=todo.resolved,
+            created_at=todo.created_at,
+            updated_at=todo.updated_at,
+        )
+
+
+class TODOSummary(models.Model):
+    """
+    Open/resolved totals per owner (one row for the unowned TODOs too),
+    maintained in the same transaction as every TODO write.
+    """
+    # No constraint: the rows of a deleted user are zeroed by the deletes of
+    # its TODOs, which may run after the user row is gone
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name='+',
+    )
+    open_count = models.BigIntegerField(default=0)
+    resolved_count = models.BigIntegerField(default=0)
+
+    class Meta:
+        verbose_name_plural = 'TODO summary'
+        constraints = [
+            # One row per owner, the unowned (NULL) one included
+            models.UniqueConstraint(Coalesce('owner', Value(0)), name='todosummary_owner_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.open_count} open, {self.resolved_count} resolved'
+
+    @classmethod
+    def apply(cls, changes):
+        """
+        Add ``(owner_id, resolved, due_date, delta)`` changes to the owners'
+        totals and per-day buckets, one UPDATE per touched row.
+        """
+        totals = defaultdict(Counter)
+        buckets = defaultdict(Counter)
+        for owner_id, resolved, due_date, delta in changes:
+            column = 'resolved_count' if resolved else 'open_count'
+            totals[owner_id][column] += delta
+            if due_date is not None:
+                buckets[owner_id, due_date][column] += delta
+        for owner_id, counts in totals.items():
+            _increment(cls, {'owner_id': owner_id}, counts)
+        for (owner_id, due_date), counts in buckets.items():
+            _increment(DueDateSummary, {'owner_id': owner_id, 'due_date': due_date}, counts)
+
+
+class DueDateSummary(models.Model):
+    """
+    Open/resolved TODO counts of one owner for one due date, for calendars
+    and the overdue badge.
+    """
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING, db_constraint=False,
+        null=True, blank=True, related_name='+', db_index=False,
+    )
+    due_date = models.DateField()
+    open_count = models.BigIntegerField(default=0)
+    resolved_count = models.BigIntegerField(default=0)
+
+    class Meta:
+        ordering = ['due_date']
+        constraints = [
+            models.UniqueConstraint(
+                Coalesce('owner', Value(0)), 'due_date', name='duedatesummary_owner_due_date_uniq',
+            ),
+        ]
+        indexes = [
+            # One owner's calendar month and overdue buckets
+            models.Index(fields=['owner', 'due_date'], name='duedatesummary_owner_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.due_date}: {self.open_count} open, {self.resolved_count} resolved'
+
+
+def _increment(model, lookup, counts):
+    counts = {column: delta for column, delta in counts.items() if delta}
+    if not counts:
+        return
+    expressions = {column: F(column) + delta for column, delta in counts.items()}
+    if not model.objects.filter(**lookup).update(**expressions):
+        model.objects.get_or_create(**lookup)
+        model.objects.filter(**lookup).update(**expressions)
+
+
+class TableVersion(models.Model):
+    """
+    Change counter for a table, bumped where the table's own columns cannot
+    reveal a change (deletes leave no ``updated_at`` behind).
+    """
+    table = models.CharField(max_length=100, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f'{self.table}@{self.version}'
+
+    @classmethod
+    def bump(cls, table):
+        now = timezone.now()
+        updated = cls.objects.filter(table=table).update(
+            version=F('version') + 1, changed_at=now
+        )
+        if not updated:
+            cls.objects.get_or_create(table=table, defaults={'version': 1, 'changed_at': now})
+
+    @classmethod
+    def get(cls, table):
+        return cls.objects.filter(table=table).values_list('version', 'changed_at').first() or (0, None)
@@ -0,0 +1,110 @@
+"""
+Paginator for admin changelists over very large tables.
+
+* ``count`` comes from a caller-supplied O(1) total when the queryset is
+  unfiltered, and is otherwise a ``COUNT(*)`` cached per query and TODO
+  table version, so paging and re-rendering a filter never recount.
+* ``page(n)`` seeks past the last row of page ``n - 1`` when that page was
+  served recently (keyset pagination). Otherwise it pages over primary keys
+  first, which the ordering index can answer alone, and then loads only the
+  rows of this page.
+"""
+
+import hashlib
+
+from django.core.exceptions import EmptyResultSet, FieldDoesNotExist
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+from . import cache
+
+CACHE_TIMEOUT = 300
+
+
+class LargeTablePaginator(Paginator):
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, total_count=None):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.total_count = total_count
+
+    @cached_property
+    def query_key(self):
+        try:
+            sql = str(self.object_list.query)
+        except EmptyResultSet:
+            return None
+        digest = hashlib.md5(sql.encode()).hexdigest()
+        return f'todos:paginator:{digest}:{cache.current_version()}'
+
+    def _cached(self, suffix, compute):
+        if self.query_key is None:
+            return compute()
+        key = f'{self.query_key}:{suffix}'
+        value = cache.get_cache().get(key)
+        if value is None:
+            value = compute()
+            cache.get_cache().set(key, value, CACHE_TIMEOUT)
+        return value
+
+    @cached_property
+    def count(self):
+        if self.total_count is not None and not self.object_list.query.where:
+            total = self.total_count()
+            if total is not None:
+                return total
+        return self._cached('count', self.object_list.count)
+
+    def seek_fields(self):
+        """
+        The ordering as ``[(field, descending)]`` if every part is a plain
+        non-null column a keyset condition can compare, else None.
+        """
+        opts = self.object_list.model._meta
+        fields = []
+        for name in self.object_list.query.order_by:
+            if not isinstance(name, str):
+                return None
+            descending = name.startswith('-')
+            name = name.lstrip('-')
+            try:
+                field = opts.pk if name == 'pk' else opts.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if field.null or not field.concrete or field.is_relation:
+                return None
+            fields.append((field.attname, descending))
+        return fields or None
+
+    def seek(self, fields, boundary):
+        condition = Q()
+        equal = Q()
+        for (name, descending), value in zip(fields, boundary):
+            lookup = 'lt' if descending else 'gt'
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return self.object_list.filter(condition)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if top + self.orphans >= self.count:
+            top = self.count
+        fields = self.seek_fields()
+        boundary = None
+        if fields and number > 1 and self.query_key is not None:
+            boundary = cache.get_cache().get(f'{self.query_key}:boundary:{number - 1}')
+        if boundary is not None:
+            object_list = self.seek(fields, boundary)[:top - bottom]
+        else:
+            pks = list(self.object_list.values_list('pk', flat=True)[bottom:top])
+            object_list = self.object_list.filter(pk__in=pks)
+        rows = list(object_list)
+        if fields and rows and self.query_key is not None:
+            last = rows[-1]
+            cache.get_cache().set(
+                f'{self.query_key}:boundary:{number}',
+                tuple(getattr(last, name) for name, _ in fields),
+                CACHE_TIMEOUT,
+            )
+        return self._get_page(rows, number, self)
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, live
+from .models import TODO, TODOSummary, TableVersion, summary_state
+
+
+@receiver(post_save, sender=TODO)
+def todo_saved(sender, instance, created, **kwargs):
+    # TODO.save() runs inside a transaction, so the summary moves with the row
+    new = summary_state(instance)
+    old = None if created else getattr(instance, '_summary_state', None)
+    if old != new:
+        changes = [(*new, 1)]
+        if old is not None:
+            changes.append((*old, -1))
+        TODOSummary.apply(changes)
+    instance._summary_state = new
+    cache.invalidate()
+    live.publish_rows('add' if created else 'replace', [instance])
+
+
+@receiver(post_delete, sender=TODO)
+def todo_deleted(sender, instance, **kwargs):
+    # Deletes run inside the collector's transaction
+    state = getattr(instance, '_summary_state', None) or summary_state(instance)
+    TODOSummary.apply([(*state, -1)])
+    TableVersion.bump(TODO._meta.db_table)
+    cache.invalidate()
+    live.publish_removed([instance])
@@ -0,0 +1,39 @@
+// Swap just the clicked row instead of following the redirect and
+// re-rendering the whole list; plain navigation still works without JS.
+document.addEventListener('click', async (event) => {
+    const link = event.target.closest('a[data-fragment="row"]');
+    if (!link) return;
+    event.preventDefault();
+    const response = await fetch(link.href, {headers: {'X-Fragment': 'row'}});
+    if (!response.ok) {
+        window.location = link.href;
+        return;
+    }
+    link.closest('.list-group-item').outerHTML = await response.text();
+});
+
+// Apply changes pushed by other tabs. The page only connects when the
+// server publishes them (data-live, from TODOS_LIVE_PUSH); otherwise it
+// simply stays as rendered.
+(function listen() {
+    if (!('live' in document.currentScript.dataset)) return;
+    const scheme = window.location.protocol === 'https:' ? 'wss' : 'ws';
+    const socket = new WebSocket(`${scheme}://${window.location.host}/ws/todos/`);
+    socket.onmessage = (message) => {
+        const list = document.getElementById('todo-list');
+        for (const change of JSON.parse(message.data).events) {
+            const row = document.getElementById(`todo-${change.id}`);
+            if (change.op === 'reload' || (change.op === 'add' && !list)) {
+                window.location.reload();
+                return;
+            }
+            if (change.op === 'remove') {
+                if (row) row.remove();
+            } else if (row) {
+                row.outerHTML = change.html;
+            } else if (change.op === 'add') {
+                list.insertAdjacentHTML('afterbegin', change.html);
+            }
+        }
+    };
+})();
@@ -0,0 +1,97 @@
+"""
+Read and rebuild the incrementally maintained TODO counters.
+
+``TODOSummary`` (one row per owner) and ``DueDateSummary`` (one row per
+owner and due date) are kept up to date by every TODO write (see
+``todos/models.py`` and ``todos/signals.py``), so an owner's summary costs
+O(days) reads no matter how many TODOs exist, theirs or anyone else's.
+"""
+
+import calendar
+from collections import Counter, defaultdict
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from .models import TODO, DueDateSummary, TODOSummary, owner_of
+
+
+def month_range(month):
+    first = date(month.year, month.month, 1)
+    last = date(month.year, month.month, calendar.monthrange(month.year, month.month)[1])
+    return first, last
+
+
+def get_summary(month=None, today=None):
+    """
+    The summary over every owner's TODOs.
+    """
+    return _summary(TODOSummary.objects.all(), DueDateSummary.objects.all(), month, today)
+
+
+def get_owner_summary(user, month=None, today=None):
+    """
+    ``get_summary()`` for the TODOs of ``user`` (see ``owner_of()``).
+    """
+    owner = owner_of(user)
+    return _summary(
+        TODOSummary.objects.filter(owner=owner), DueDateSummary.objects.filter(owner=owner), month, today
+    )
+
+
+def _summary(totals, buckets, month, today):
+    today = today or timezone.localdate()
+    month = month or today
+    totals = totals.aggregate(open=Sum('open_count', default=0), resolved=Sum('resolved_count', default=0))
+    overdue = buckets.filter(due_date__lt=today).aggregate(n=Sum('open_count'))['n']
+    days = (
+        buckets.filter(due_date__range=month_range(month))
+        .order_by('due_date').values('due_date')
+        .annotate(open=Sum('open_count'), resolved=Sum('resolved_count'))
+        .exclude(open=0, resolved=0)
+    )
+    return {
+        'open': totals['open'],
+        'resolved': totals['resolved'],
+        'total': totals['open'] + totals['resolved'],
+        'overdue': overdue or 0,
+        'month': month.strftime('%Y-%m'),
+        'calendar': [
+            {'date': day['due_date'], 'open': day['open'], 'resolved': day['resolved']}
+            for day in days
+        ],
+    }
+
+
+def rebuild():
+    """
+    Recount the summary tables from scratch. Returns the number of due-date
+    buckets written.
+    """
+    totals = defaultdict(Counter)
+    buckets = defaultdict(Counter)
+    groups = (
+        TODO.objects.order_by().values_list('owner_id', 'resolved', 'due_date').annotate(n=Count('pk'))
+    )
+    with transaction.atomic():
+        for owner_id, resolved, due_date, n in groups:
+            column = 'resolved_count' if resolved else 'open_count'
+            totals[owner_id][column] += n
+            if due_date is not None:
+                buckets[owner_id, due_date][column] += n
+        TODOSummary.objects.all().delete()
+        DueDateSummary.objects.all().delete()
+        TODOSummary.objects.bulk_create(
+            [TODOSummary(owner_id=owner_id, **counts) for owner_id, counts in totals.items()],
+            batch_size=1000,
+        )
+        DueDateSummary.objects.bulk_create(
+            [
+                DueDateSummary(owner_id=owner_id, due_date=due_date, **counts)
+                for (owner_id, due_date), counts in buckets.items()
+            ],
+            batch_size=1000,
+        )
+    return len(buckets)
@@ -3,12 +3,36 @@ Tests for the TODO Application
 File: todos/tests.py
 """
 
-from django.test import TestCase, Client
+from asgiref.sync import async_to_sync
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, Client, override_settings
+from unittest import skipIf
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
+from django.db.models import Count, Q
 from django.utils import timezone
 from datetime import timedelta
-from .models import TODO
+import asyncio
+import json
+import sqlite3
+import tempfile
+import time
+from io import StringIO
+from pathlib import Path
+from todoproject.instrumentation import query_budget
+from todoproject.profiling import sampler
+from . import async_views, cache, summary
+from .models import TODO, ArchivedTODO, DueDateSummary, TODOSummary, TableVersion
 from .forms import TODOForm
+from .paginator import LargeTablePaginator
+
+try:
+    from channels.layers import get_channel_layer
+    from channels.testing import WebsocketCommunicator
+    from .consumers import TODOListConsumer
+except ImportError:
+    WebsocketCommunicator = None
 
 
 class TODOModelTest(TestCase):
@@ -109,7 +133,14 @@ class TODOViewsTest(TestCase):
         self.assertTemplateUsed(response, 'todos/list.html')
         self.assertContains(response, "Test TODO")
         self.assertIn('todos', response.context)
-    
+
+    def test_todo_list_connects_only_with_live_push(self):
+        """Test that the list script is told to open its socket only when changes are pushed"""
+        with self.settings(TODOS_LIVE_PUSH=False):
+            self.assertNotContains(self.client.get(reverse('todos:list')), 'data-live')
+        with self.settings(TODOS_LIVE_PUSH=True):
+            self.assertContains(self.client.get(reverse('todos:list')), 'data-live')
+
     def test_todo_list_empty(self):
         """Test list view with no TODOs"""
         TODO.objects.all().delete()
@@ -280,4 +311,1294 @@ class TODOURLTest(TestCase):
         """Test that toggle URL resolves correctly"""
         url = reverse('todos:toggle', args=[1])
         self.assertEqual(url, '/1/toggle/')
-        
\ No newline at end of file
+
+
+class TODOFragmentCacheTest(TestCase):
+    """Test the versioned fragment cache for the rendered list"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.todo = TODO.objects.create(title="Cached TODO")
+
+    def test_list_fragment_served_from_cache(self):
+        """Test that a second request reuses the rendered fragment"""
+        self.client.get(reverse('todos:list'))
+        response = self.client.get(reverse('todos:list'))
+        self.assertContains(response, "Cached TODO")
+        stats = cache.get_stats()
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['hits'], 1)
+
+    def test_save_bumps_version(self):
+        """Test that saving a TODO invalidates the cached fragment"""
+        self.client.get(reverse('todos:list'))
+        version = cache.current_version()
+        self.todo.title = "Renamed TODO"
+        self.todo.save()
+        self.assertNotEqual(cache.current_version(), version)
+        response = self.client.get(reverse('todos:list'))
+        self.assertContains(response, "Renamed TODO")
+        self.assertNotContains(response, "Cached TODO")
+
+    def test_delete_bumps_version(self):
+        """Test that deleting a TODO invalidates the cached fragment"""
+        self.client.get(reverse('todos:list'))
+        self.todo.delete()
+        response = self.client.get(reverse('todos:list'))
+        self.assertContains(response, "No TODOs yet")
+
+    def test_cached_list_skips_queries(self):
+        """Test that a cache hit does not re-query the TODO rows"""
+        self.client.get(reverse('todos:list'))
+        # Only the freshness aggregate and the table version lookup remain
+        with self.assertNumQueries(2):
+            self.client.get(reverse('todos:list'))
+
+    def test_evicted_version_does_not_reuse_old_fragments(self):
+        """Test that a lost version counter is reseeded to a fresh value"""
+        version = cache.current_version()
+        cache.get_cache().delete(cache.VERSION_KEY)
+        self.assertGreater(cache.current_version(), version)
+
+    async def test_async_fragment_shares_the_sync_cache(self):
+        """Test that aget_fragment caches through the async API under the same keys"""
+        renders = []
+
+        async def render():
+            renders.append(1)
+            return '<li>async</li>'
+
+        await cache.get_cache().adelete(cache.VERSION_KEY)
+        self.assertEqual(await cache.aget_fragment('async-test', render), '<li>async</li>')
+        self.assertEqual(await cache.aget_fragment('async-test', render), '<li>async</li>')
+        self.assertEqual(cache.get_fragment('async-test', lambda: 'sync'), '<li>async</li>')
+        self.assertEqual(len(renders), 1)
+        stats = cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses']), (2, 1))
+
+    def test_cache_stats_view(self):
+        """Test the hit/miss stats endpoint"""
+        from django.contrib.auth.models import User
+        self.client.get(reverse('todos:list'))
+        self.client.force_login(User.objects.create(username='staff', is_staff=True))
+        response = self.client.get(reverse('todos:cache_stats'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['misses'], 1)
+        self.assertIn('hit_ratio', data)
+        self.assertIn('version', data)
+
+    def test_cache_stats_view_is_staff_only(self):
+        """Test that anonymous and non-staff users can't read the cache stats"""
+        from django.contrib.auth.models import User
+        url = reverse('todos:cache_stats')
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(User.objects.create(username='user'))
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+
+class TODOConditionalGetTest(TestCase):
+    """Test ETag / Last-Modified handling on TODO pages"""
+
+    def setUp(self):
+        self.todo = TODO.objects.create(title="Fresh TODO")
+        self.other = TODO.objects.create(title="Other TODO")
+
+    def test_list_sets_validators(self):
+        """Test that the list page carries ETag and Last-Modified headers"""
+        response = self.client.get(reverse('todos:list'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('ETag', response)
+        self.assertIn('Last-Modified', response)
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_list_not_modified(self):
+        """Test that an unchanged list answers 304 without rendering"""
+        etag = self.client.get(reverse('todos:list'))['ETag']
+        response = self.client.get(reverse('todos:list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+    def test_list_etag_changes_on_update(self):
+        """Test that editing a TODO changes the list ETag"""
+        etag = self.client.get(reverse('todos:list'))['ETag']
+        self.todo.title = "Changed"
+        self.todo.save()
+        response = self.client.get(reverse('todos:list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_etag_changes_on_delete(self):
+        """Test that deleting a TODO changes the list ETag"""
+        response = self.client.get(reverse('todos:list'))
+        etag = response['ETag']
+        self.other.delete()
+        self.assertEqual(TableVersion.get(TODO._meta.db_table)[0], 1)
+        response = self.client.get(reverse('todos:list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_list_etag_varies_with_query_params(self):
+        """Test that filter params are part of the list ETag"""
+        etag = self.client.get(reverse('todos:list'))['ETag']
+        response = self.client.get(reverse('todos:list') + '?page=2', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_list_with_pending_message_is_not_conditional(self):
+        """Test that a page carrying a flash message is always rendered"""
+        etag = self.client.get(reverse('todos:list'))['ETag']
+        self.client.post(reverse('todos:delete', args=[self.other.pk]))
+        response = self.client.get(reverse('todos:list'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'TODO deleted successfully!')
+
+    def test_edit_not_modified(self):
+        """Test that the edit page answers 304 until the TODO changes"""
+        url = reverse('todos:edit', args=[self.todo.pk])
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.todo.resolved = True
+        self.todo.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class TODOAPITest(TestCase):
+    """Test the JSON API"""
+
+    def setUp(self):
+        self.todo = TODO.objects.create(title="API TODO", description="Via API")
+
+    def test_list(self):
+        """Test listing TODOs as JSON"""
+        response = self.client.get(reverse('todos:api_list'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['results'][0]['title'], "API TODO")
+        self.assertIsNone(data['next'])
+
+    def test_cursor_pagination(self):
+        """Test that cursors walk every TODO exactly once, newest first"""
+        for i in range(4):
+            TODO.objects.create(title=f"TODO {i}")
+        seen = []
+        url = reverse('todos:api_list') + '?limit=2'
+        while url:
+            data = self.client.get(url).json()
+            seen.extend(todo['id'] for todo in data['results'])
+            url = data['next']
+        self.assertEqual(seen, list(TODO.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)))
+
+    def test_invalid_cursor(self):
+        """Test that a malformed cursor is rejected"""
+        response = self.client.get(reverse('todos:api_list') + '?cursor=garbage')
+        self.assertEqual(response.status_code, 400)
+
+    def test_create(self):
+        """Test creating a TODO through the API"""
+        response = self.client.post(
+            reverse('todos:api_list'),
+            json.dumps({'title': 'Created', 'due_date': '2030-01-01'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json()['due_date'], '2030-01-01')
+        self.assertTrue(TODO.objects.filter(title='Created').exists())
+
+    def test_create_uses_form_validation(self):
+        """Test that the API rejects what TODOForm rejects"""
+        response = self.client.post(
+            reverse('todos:api_list'), json.dumps({'description': 'No title'}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('title', response.json()['errors'])
+
+    def test_retrieve(self):
+        """Test retrieving a single TODO"""
+        response = self.client.get(reverse('todos:api_detail', args=[self.todo.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['description'], "Via API")
+
+    def test_retrieve_404(self):
+        """Test retrieving a missing TODO"""
+        response = self.client.get(reverse('todos:api_detail', args=[9999]))
+        self.assertEqual(response.status_code, 404)
+
+    def test_partial_update(self):
+        """Test that PATCH only changes the fields it sends"""
+        response = self.client.patch(
+            reverse('todos:api_detail', args=[self.todo.pk]),
+            json.dumps({'resolved': True}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 200)
+        self.todo.refresh_from_db()
+        self.assertTrue(self.todo.resolved)
+        self.assertEqual(self.todo.title, "API TODO")
+        self.assertEqual(self.todo.description, "Via API")
+
+    def test_partial_update_rejects_bad_resolved(self):
+        """Test that resolved must be a boolean"""
+        response = self.client.patch(
+            reverse('todos:api_detail', args=[self.todo.pk]),
+            json.dumps({'resolved': 'yes'}), content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_delete(self):
+        """Test deleting a TODO through the API"""
+        response = self.client.delete(reverse('todos:api_detail', args=[self.todo.pk]))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(TODO.objects.filter(pk=self.todo.pk).exists())
+
+    def test_export_ndjson(self):
+        """Test that the export streams one JSON object per line"""
+        TODO.objects.create(title="Second")
+        response = self.client.get(reverse('todos:api_export'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ["API TODO", "Second"])
+
+    async def test_export_streams_async_under_asgi(self):
+        """Test that the export hands ASGI an async iterator instead of a buffered one"""
+        await TODO.objects.acreate(title="Second")
+        response = await self.async_client.get(reverse('todos:api_export'))
+        self.assertTrue(response.is_async)
+        lines = b''.join([chunk async for chunk in response.streaming_content]).decode().splitlines()
+        self.assertEqual([json.loads(line)['title'] for line in lines], ["API TODO", "Second"])
+
+
+class ImportTODOsCommandTest(TestCase):
+    """Test the import_todos management command"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, content):
+        path = Path(self.tmp.name) / name
+        path.write_text(content)
+        return str(path)
+
+    def test_import_csv(self):
+        """Test importing valid CSV rows in several transactions"""
+        path = self.write('todos.csv', (
+            'title,description,due_date,resolved\n'
+            'First,One,2030-01-01,false\n'
+            'Second,,,true\n'
+            'Third,Three,,\n'
+        ))
+        out = StringIO()
+        call_command('import_todos', path, '--batch-size=2', '--transaction-size=2', stdout=out)
+        self.assertEqual(TODO.objects.count(), 3)
+        self.assertTrue(TODO.objects.get(title='Second').resolved)
+        self.assertIn('rows/sec', out.getvalue())
+        self.assertFalse(Path(path + '.rejects.ndjson').exists())
+
+    def test_import_ndjson_with_rejects(self):
+        """Test that invalid rows are written to the rejects file"""
+        path = self.write('todos.ndjson', '\n'.join([
+            json.dumps({'title': 'Good', 'due_date': '2030-01-01'}),
+            json.dumps({'description': 'Missing title'}),
+            json.dumps({'title': 'Bad date', 'due_date': 'tomorrow'}),
+            json.dumps({'title': 'Bad flag', 'resolved': 'maybe'}),
+            'not json',
+        ]))
+        rejects = str(Path(self.tmp.name) / 'rejects.ndjson')
+        call_command('import_todos', path, '--rejects', rejects, stdout=StringIO())
+        self.assertEqual(list(TODO.objects.values_list('title', flat=True)), ['Good'])
+        lines = [json.loads(line) for line in Path(rejects).read_text().splitlines()]
+        self.assertEqual([line['line'] for line in lines], [2, 3, 4, 5])
+        self.assertIn('title', lines[0]['errors'])
+        self.assertIn('due_date', lines[1]['errors'])
+        self.assertIn('resolved', lines[2]['errors'])
+
+    def test_import_invalidates_rendered_list(self):
+        """Test that bulk inserts still invalidate the fragment cache"""
+        version = cache.current_version()
+        path = self.write('todos.ndjson', json.dumps({'title': 'Imported'}))
+        call_command('import_todos', path, stdout=StringIO())
+        self.assertNotEqual(cache.current_version(), version)
+
+
+class ImportTODOsFastTest(TransactionTestCase):
+    """Test the index handling of import_todos --fast"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = Path(self.tmp.name) / 'todos.ndjson'
+        self.path.write_text('{"title": "Imported"}\n')
+
+    def test_fast_keeps_indexes_of_populated_table(self):
+        """Test that --fast only drops indexes while the table is empty"""
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('import_todos', str(self.path), '--fast', stdout=StringIO())
+        self.assertIn('DROP INDEX', ' '.join(q['sql'] for q in ctx.captured_queries))
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('import_todos', str(self.path), '--fast', stdout=StringIO())
+        self.assertNotIn('DROP INDEX', ' '.join(q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(TODO.objects.count(), 2)
+
+    def test_missing_indexes_are_reported_and_restored(self):
+        """Test that an index left dropped is flagged by the checks and recreated"""
+        from django.core import checks
+        from .management.commands.import_todos import missing_indexes
+        index = TODO._meta.indexes[0]
+        with connection.schema_editor() as editor:
+            editor.remove_index(TODO, index)
+        self.assertEqual(missing_indexes(), [index])
+        warnings = checks.run_checks(databases=['default'], tags=[checks.Tags.database])
+        self.assertEqual([w.id for w in warnings], ['todos.W001'])
+        out = StringIO()
+        call_command('restore_todo_indexes', stdout=out)
+        self.assertIn(index.name, out.getvalue())
+        self.assertEqual(missing_indexes(), [])
+        self.assertEqual(checks.run_checks(databases=['default'], tags=[checks.Tags.database]), [])
+
+
+class TODOConcurrencyTest(TestCase):
+    """Test atomic toggles and optimistic concurrency on edits"""
+
+    def setUp(self):
+        self.todo = TODO.objects.create(title="Shared TODO")
+
+    def test_toggle_is_a_single_update(self):
+        """Test that toggling writes the row with one conditional UPDATE"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('todos:toggle', args=[self.todo.pk]))
+        writes = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "todos_todo"')]
+        self.assertEqual(len(writes), 1)
+        self.assertIn('CASE WHEN', writes[0])
+        self.todo.refresh_from_db()
+        self.assertTrue(self.todo.resolved)
+        self.assertEqual(self.todo.version, 1)
+
+    def test_toggle_does_not_lose_updates(self):
+        """Test that toggles from stale readers still each take effect"""
+        TODO.objects.filter(pk=self.todo.pk).toggle_resolved()
+        TODO.objects.filter(pk=self.todo.pk).toggle_resolved()
+        TODO.objects.filter(pk=self.todo.pk).toggle_resolved()
+        self.todo.refresh_from_db()
+        self.assertTrue(self.todo.resolved)
+        self.assertEqual(self.todo.version, 3)
+
+    def test_concurrent_toggles_from_processes(self):
+        """Test that toggles from several processes on the default profile all land"""
+        import multiprocessing
+        from benchmarks.sqlite_concurrency import prepare, toggle
+        ctx = multiprocessing.get_context('spawn')
+        with tempfile.TemporaryDirectory() as tmp:
+            env = {'DJANGO_DB_NAME': str(Path(tmp) / 'toggles.sqlite3')}
+            setup = ctx.Process(target=prepare, args=(env, 1))
+            setup.start()
+            setup.join()
+            self.assertEqual(setup.exitcode, 0)
+            results = ctx.Queue()
+            workers = [ctx.Process(target=toggle, args=(env, 1, 50, results)) for _ in range(4)]
+            for worker in workers:
+                worker.start()
+            errors = sum(results.get(timeout=60) for _ in workers)
+            for worker in workers:
+                worker.join()
+            db = sqlite3.connect(env['DJANGO_DB_NAME'])
+            row = db.execute('SELECT resolved, version FROM todos_todo WHERE id = 1').fetchone()
+            counts = db.execute('SELECT open_count, resolved_count FROM todos_todosummary').fetchone()
+            db.close()
+        self.assertEqual(errors, 0)
+        # The seeded row starts resolved; 200 toggles bring it back there
+        self.assertEqual(row, (1, 200))
+        self.assertEqual(counts, (0, 1))
+
+    def test_toggle_bumps_updated_at(self):
+        """Test that the single-UPDATE toggle still moves updated_at"""
+        before = self.todo.updated_at
+        TODO.objects.filter(pk=self.todo.pk).toggle_resolved()
+        self.todo.refresh_from_db()
+        self.assertGreater(self.todo.updated_at, before)
+
+    def test_save_increments_version(self):
+        """Test that regular saves advance the version"""
+        self.todo.title = "Renamed"
+        self.todo.save()
+        self.todo.refresh_from_db()
+        self.assertEqual(self.todo.version, 1)
+
+    def test_edit_form_carries_version(self):
+        """Test that the edit page embeds the current version"""
+        response = self.client.get(reverse('todos:edit', args=[self.todo.pk]))
+        self.assertContains(response, 'name="version" value="0"')
+
+    def test_edit_with_current_version(self):
+        """Test that an edit against the current version is saved"""
+        response = self.client.post(
+            reverse('todos:edit', args=[self.todo.pk]), {'title': 'Mine', 'version': 0}
+        )
+        self.assertEqual(response.status_code, 302)
+        self.todo.refresh_from_db()
+        self.assertEqual(self.todo.title, 'Mine')
+        self.assertEqual(self.todo.version, 1)
+
+    def test_edit_conflict_is_reported(self):
+        """Test that an edit from a stale version does not overwrite"""
+        TODO.objects.filter(pk=self.todo.pk).toggle_resolved()
+        response = self.client.post(
+            reverse('todos:edit', args=[self.todo.pk]), {'title': 'Stale', 'version': 0}
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertContains(response, 'changed by someone else', status_code=409)
+        self.assertContains(response, 'name="version" value="1"', status_code=409)
+        self.todo.refresh_from_db()
+        self.assertEqual(self.todo.title, 'Shared TODO')
+        self.assertTrue(self.todo.resolved)
+
+    def test_api_patch_conflict(self):
+        """Test that the API rejects a PATCH against a stale version"""
+        url = reverse('todos:api_detail', args=[self.todo.pk])
+        response = self.client.patch(url, json.dumps({'title': 'A', 'version': 0}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['version'], 1)
+        response = self.client.patch(url, json.dumps({'title': 'B', 'version': 0}), content_type='application/json')
+        self.assertEqual(response.status_code, 409)
+        self.todo.refresh_from_db()
+        self.assertEqual(self.todo.title, 'A')
+
+
+class TODOSummaryTest(TestCase):
+    """Test the incrementally maintained counters"""
+
+    def setUp(self):
+        self.today = timezone.now().date()
+        self.yesterday = self.today - timedelta(days=1)
+
+    def assertSummaryMatchesTable(self):
+        expected = summary.get_summary()
+        summary.rebuild()
+        self.assertEqual(summary.get_summary(), expected)
+
+    def bucket(self, due_date):
+        return DueDateSummary.objects.get(due_date=due_date)
+
+    def test_create_and_delete(self):
+        """Test that creates and deletes adjust totals and buckets"""
+        todo = TODO.objects.create(title="Due", due_date=self.today)
+        TODO.objects.create(title="Undated")
+        self.assertEqual(TODOSummary.objects.get().open_count, 2)
+        self.assertEqual(self.bucket(self.today).open_count, 1)
+        todo.delete()
+        self.assertEqual(TODOSummary.objects.get().open_count, 1)
+        self.assertEqual(self.bucket(self.today).open_count, 0)
+        self.assertSummaryMatchesTable()
+
+    def test_edit_moves_between_buckets(self):
+        """Test that changing the due date moves the row between days"""
+        todo = TODO.objects.create(title="Moving", due_date=self.yesterday)
+        todo = TODO.objects.get(pk=todo.pk)
+        todo.due_date = self.today
+        todo.save()
+        self.assertEqual(self.bucket(self.yesterday).open_count, 0)
+        self.assertEqual(self.bucket(self.today).open_count, 1)
+        self.assertSummaryMatchesTable()
+
+    def test_toggle(self):
+        """Test that the atomic toggle moves counts between open and resolved"""
+        todo = TODO.objects.create(title="Toggle", due_date=self.today)
+        self.client.get(reverse('todos:toggle', args=[todo.pk]))
+        totals = TODOSummary.objects.get()
+        self.assertEqual((totals.open_count, totals.resolved_count), (0, 1))
+        self.assertEqual(self.bucket(self.today).resolved_count, 1)
+        self.assertSummaryMatchesTable()
+
+    def test_versioned_edit_and_bulk_paths(self):
+        """Test that update() and bulk_create() keep the counters right"""
+        TODO.objects.bulk_create([
+            TODO(title="A", due_date=self.yesterday),
+            TODO(title="B", due_date=self.yesterday, resolved=True),
+            TODO(title="C"),
+        ])
+        todo = TODO.objects.get(title="A")
+        TODO.objects.filter(pk=todo.pk).update_if_version(todo.version, due_date=self.today)
+        TODO.objects.filter(title="C").update(resolved=True)
+        self.assertSummaryMatchesTable()
+        self.assertEqual(summary.get_summary()['resolved'], 2)
+
+    def test_update_rejects_expressions_on_counted_fields(self):
+        """Test that counted fields cannot be updated with opaque expressions"""
+        with self.assertRaises(TypeError):
+            TODO.objects.update(resolved=~Q(resolved=True))
+
+    def test_summary_view(self):
+        """Test the JSON summary with overdue and calendar counts"""
+        TODO.objects.create(title="Late", due_date=self.yesterday)
+        TODO.objects.create(title="Done late", due_date=self.yesterday, resolved=True)
+        TODO.objects.create(title="Today", due_date=self.today)
+        response = self.client.get(reverse('todos:summary'), {'month': self.today.strftime('%Y-%m')})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data['open'], data['resolved'], data['overdue']), (2, 1, 1))
+        self.assertIn({'date': self.today.isoformat(), 'open': 1, 'resolved': 0}, data['calendar'])
+
+    def test_summary_view_rejects_bad_month(self):
+        """Test that the month parameter is validated"""
+        response = self.client.get(reverse('todos:summary'), {'month': 'soon'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_rebuild_command(self):
+        """Test that the rebuild command repairs drifted counters"""
+        TODO.objects.create(title="Counted", due_date=self.today)
+        TODOSummary.objects.update(open_count=42)
+        out = StringIO()
+        call_command('rebuild_todo_summary', stdout=out)
+        self.assertEqual(TODOSummary.objects.get().open_count, 1)
+        self.assertIn('1 open', out.getvalue())
+
+
+class ArchiveTODOsCommandTest(TestCase):
+    """Test hot/cold archival of resolved TODOs"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        old = timezone.now() - timedelta(days=120)
+        for i in range(5):
+            TODO.objects.create(title=f"Old resolved {i}", resolved=True)
+        TODO.objects.filter(resolved=True).update(updated_at=old)
+        TODO.objects.create(title="Recent resolved", resolved=True)
+        TODO.objects.create(title="Old open")
+        TODO.objects.filter(title="Old open").update(updated_at=old)
+
+    def test_archives_only_old_resolved(self):
+        """Test that only resolved TODOs past the threshold are moved"""
+        call_command('archive_todos', '--older-than=90', stdout=StringIO())
+        self.assertEqual(ArchivedTODO.objects.count(), 5)
+        self.assertEqual(
+            set(TODO.objects.values_list('title', flat=True)), {"Recent resolved", "Old open"}
+        )
+        archived = ArchivedTODO.objects.get(title="Old resolved 0")
+        self.assertTrue(archived.resolved)
+        self.assertIsNotNone(archived.original_id)
+
+    def test_resumable_in_batches(self):
+        """Test that a run stopped after some batches continues on rerun"""
+        call_command('archive_todos', '--batch-size=2', '--max-batches=1', stdout=StringIO())
+        self.assertEqual(ArchivedTODO.objects.count(), 2)
+        out = StringIO()
+        call_command('archive_todos', '--batch-size=2', stdout=out)
+        self.assertEqual(ArchivedTODO.objects.count(), 5)
+        self.assertIn('Archived 3 TODOs in 2 batches', out.getvalue())
+
+    def test_archival_keeps_summary_consistent(self):
+        """Test that archived rows leave the hot-table counters"""
+        call_command('archive_todos', stdout=StringIO())
+        expected = summary.get_summary()
+        summary.rebuild()
+        self.assertEqual(summary.get_summary(), expected)
+        self.assertEqual(expected['resolved'], 1)
+
+    def test_batch_queries_do_not_grow_with_batch_size(self):
+        """Test that a batch is one set-based delete, not a delete and its upkeep per row"""
+        TODO.objects.bulk_create([TODO(title=f"Bulk {i}", resolved=True) for i in range(100)])
+        TODO.objects.filter(title__startswith="Bulk").update(updated_at=timezone.now() - timedelta(days=120))
+        with CaptureQueriesContext(connection) as ctx:
+            call_command('archive_todos', '--max-batches=1', stdout=StringIO())
+        self.assertEqual(ArchivedTODO.objects.count(), 105)
+        self.assertLess(len(ctx.captured_queries), 15)
+        deletes = [q for q in ctx.captured_queries if q['sql'].startswith('DELETE FROM "todos_todo"')]
+        self.assertEqual(len(deletes), 1)
+
+    def test_list_hides_archived_by_default(self):
+        """Test that the list reads only the hot table unless asked"""
+        call_command('archive_todos', stdout=StringIO())
+        response = self.client.get(reverse('todos:list'))
+        self.assertNotContains(response, "Old resolved 0")
+        response = self.client.get(reverse('todos:list'), {'include_archived': '1'})
+        self.assertContains(response, "Old resolved 0")
+        self.assertContains(response, "Recent resolved")
+
+
+class TODOAdminChangelistTest(TestCase):
+    """Test the large-table admin changelist"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        from django.contrib.auth.models import User
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(self.admin)
+        TODO.objects.bulk_create([TODO(title=f"Row {i}", resolved=i % 2 == 0) for i in range(250)])
+
+    def test_changelist_skips_count_queries(self):
+        """Test that the unfiltered count comes from the summary, not COUNT(*)"""
+        url = reverse('admin:todos_todo_changelist')
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, "250 todos")
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+
+    def test_changelists_join_owners(self):
+        """Test that owned rows cost no query per row for their owner column"""
+        from django.contrib.auth.models import User
+        users = User.objects.bulk_create([User(username=f'owner{i}') for i in range(20)])
+        for i, todo in enumerate(TODO.objects.all()):
+            todo.owner = users[i % len(users)]
+            todo.save(update_fields=['owner'])
+        ArchivedTODO.objects.bulk_create([
+            ArchivedTODO.from_todo(todo) for todo in TODO.objects.filter(resolved=True)[:50]
+        ])
+        for name in ('admin:todos_todo_changelist', 'admin:todos_archivedtodo_changelist'):
+            url = reverse(name)
+            self.client.get(url)
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertContains(response, 'owner1<')
+            user_queries = [q for q in ctx.captured_queries if q['sql'].startswith('SELECT') and
+                            'FROM "auth_user"' in q['sql']]
+            # The session's user only; owners come in with the rows
+            self.assertLessEqual(len(user_queries), 1, name)
+            self.assertLess(len(ctx.captured_queries), 15, name)
+
+    def test_filtered_count_is_cached(self):
+        """Test that a filtered count is computed once per table version"""
+        url = reverse('admin:todos_todo_changelist')
+        self.client.get(url, {'resolved__exact': '1'})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {'resolved__exact': '1', 'p': '2'})
+        self.assertContains(response, "125 todos")
+        self.assertFalse([q for q in ctx.captured_queries if 'COUNT(' in q['sql']])
+        TODO.objects.create(title="New", resolved=True)
+        response = self.client.get(url, {'resolved__exact': '1'})
+        self.assertContains(response, "126 todos")
+
+    def test_keyset_pages_match_offset_pages(self):
+        """Test that seeking from a cached boundary returns the same rows"""
+        queryset = TODO.objects.order_by('-created_at', '-pk')
+        expected = [todo.pk for todo in queryset]
+        paginator = LargeTablePaginator(queryset, 100)
+        pages = [[todo.pk for todo in paginator.page(n)] for n in (1, 2, 3)]
+        self.assertEqual(sum(pages, []), expected)
+        with CaptureQueriesContext(connection) as ctx:
+            second = [todo.pk for todo in LargeTablePaginator(queryset, 100).page(2)]
+        self.assertEqual(second, expected[100:200])
+        self.assertNotIn('OFFSET', ' '.join(q['sql'] for q in ctx.captured_queries))
+
+    def test_page_rows_are_fetched_once(self):
+        """Test that iterating a page does not query its rows again"""
+        paginator = LargeTablePaginator(TODO.objects.order_by('-created_at', '-pk'), 100)
+        paginator.count
+        page = paginator.page(2)
+        with self.assertNumQueries(0):
+            self.assertEqual(len(list(page)), 100)
+
+    def test_bulk_actions_are_set_based(self):
+        """Test that the resolve action is a single UPDATE that keeps the summary"""
+        pks = list(TODO.objects.filter(resolved=False).values_list('pk', flat=True)[:20])
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.post(reverse('admin:todos_todo_changelist'), {
+                'action': 'mark_resolved', '_selected_action': pks,
+            })
+        updates = [q for q in ctx.captured_queries if q['sql'].startswith('UPDATE "todos_todo"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(TODO.objects.filter(resolved=False).count(), 105)
+        self.assertEqual(summary.get_summary()['open'], 105)
+
+
+class TODOFragmentResponseTest(TestCase):
+    """Test row/JSON fragment responses for TODO actions"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.todo = TODO.objects.create(title="Fragment TODO")
+
+    def test_toggle_row_fragment(self):
+        """Test that toggling with X-Fragment returns just the row"""
+        response = self.client.get(
+            reverse('todos:toggle', args=[self.todo.pk]), headers={'X-Fragment': 'row'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'todos/row.html')
+        self.assertTemplateNotUsed(response, 'todos/list.html')
+        self.assertContains(response, f'id="todo-{self.todo.pk}"')
+        self.assertContains(response, 'Unresolve')
+        self.assertIn('X-Fragment', response['Vary'])
+
+    def test_toggle_json_patch(self):
+        """Test that toggling with Accept: application/json returns a patch"""
+        response = self.client.get(
+            reverse('todos:toggle', args=[self.todo.pk]), headers={'Accept': 'application/json'}
+        )
+        data = response.json()
+        self.assertEqual(data['op'], 'replace')
+        self.assertEqual(data['id'], self.todo.pk)
+        self.assertTrue(data['todo']['resolved'])
+
+    def test_create_fragments(self):
+        """Test that creating returns the new row, or errors as JSON"""
+        response = self.client.post(
+            reverse('todos:create'), {'title': 'Row TODO'}, headers={'HX-Request': 'true'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertContains(response, 'Row TODO', status_code=201)
+        response = self.client.post(
+            reverse('todos:create'), {'title': ''}, headers={'Accept': 'application/json'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('title', response.json()['errors'])
+
+    def test_delete_json_patch(self):
+        """Test that deleting returns a remove patch and no flash message"""
+        response = self.client.post(
+            reverse('todos:delete', args=[self.todo.pk]), headers={'Accept': 'application/json'}
+        )
+        self.assertEqual(response.json(), {'op': 'remove', 'id': self.todo.pk})
+        self.assertFalse(TODO.objects.filter(pk=self.todo.pk).exists())
+        response = self.client.get(reverse('todos:list'))
+        self.assertNotContains(response, 'deleted successfully')
+
+    def test_plain_posts_still_redirect(self):
+        """Test that browser form posts keep the redirect"""
+        response = self.client.post(
+            reverse('todos:delete', args=[self.todo.pk]),
+            headers={'Accept': 'text/html,application/xhtml+xml,*/*;q=0.8'},
+        )
+        self.assertRedirects(response, reverse('todos:list'))
+
+
+@skipIf(WebsocketCommunicator is None, 'channels is not installed')
+@override_settings(TODOS_LIVE_PUSH=True)
+class TODOLivePushTest(TestCase):
+    """Test WebSocket push of TODO changes"""
+
+    def setUp(self):
+        self.layer = get_channel_layer()
+        async_to_sync(self.layer.flush)()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)('todos.unowned', self.channel)
+
+    def receive(self):
+        return async_to_sync(self.layer.receive)(self.channel)['events']
+
+    def test_writes_publish_row_events_on_commit(self):
+        """Test that create, toggle and delete each push a row event"""
+        with self.captureOnCommitCallbacks(execute=True):
+            todo = TODO.objects.create(title="Pushed TODO")
+        [event] = self.receive()
+        self.assertEqual((event['op'], event['id']), ('add', todo.pk))
+        self.assertIn('Pushed TODO', event['html'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TODO.objects.filter(pk=todo.pk).toggle_resolved()
+        [event] = self.receive()
+        self.assertEqual(event['op'], 'replace')
+        self.assertTrue(event['todo']['resolved'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            todo.delete()
+        self.assertEqual(self.receive(), [{'op': 'remove', 'id': event['id']}])
+
+    def test_writes_skip_publishing_when_off(self):
+        """Test that without TODOS_LIVE_PUSH a write does none of the publishing work"""
+        todo = TODO.objects.create(title="Quiet TODO")
+        with self.settings(TODOS_LIVE_PUSH=False):
+            with CaptureQueriesContext(connection) as ctx, self.captureOnCommitCallbacks() as callbacks:
+                TODO.objects.filter(pk=todo.pk).toggle_resolved()
+        self.assertEqual(len(callbacks), 1)  # the cache version bump only
+        self.assertFalse([q for q in ctx.captured_queries if q['sql'].startswith('SELECT "todos_todo"."id"')])
+
+    async def test_consumer_coalesces_changes(self):
+        """Test that bursts go out as one message with the latest change per row"""
+        communicator = WebsocketCommunicator(TODOListConsumer.as_asgi(), '/ws/todos/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        for events in (
+            [{'op': 'add', 'id': 1, 'html': 'v1'}],
+            [{'op': 'replace', 'id': 1, 'html': 'v2'}, {'op': 'add', 'id': 2, 'html': 'x'}],
+            [{'op': 'remove', 'id': 2}, {'op': 'remove', 'id': 3}],
+        ):
+            await self.layer.group_send('todos', {'type': 'todos.changes', 'events': events})
+        message = json.loads(await communicator.receive_from(timeout=1))
+        self.assertEqual(message['events'], [
+            {'op': 'add', 'id': 1, 'html': 'v2'}, {'op': 'remove', 'id': 3},
+        ])
+        self.assertTrue(await communicator.receive_nothing(timeout=0.2))
+        await communicator.disconnect()
+
+
+class TODOAsyncViewsTest(TestCase):
+    """Test the async list, detail and toggle views"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        self.factory = AsyncRequestFactory()
+        self.todo = TODO.objects.create(title="Async TODO")
+
+    def get(self, *args, **kwargs):
+        # What AuthenticationMiddleware would attach: an anonymous user
+        from django.contrib.auth.models import AnonymousUser
+        request = self.factory.get(*args, **kwargs)
+        request.user = AnonymousUser()
+
+        async def auser():
+            return request.user
+
+        request.auser = auser
+        return request
+
+    async def test_list(self):
+        """Test that the async list renders TODOs and answers revalidation"""
+        response = await async_views.todo_list(self.get('/'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'Async TODO', response.content)
+        request = self.get('/', headers={'If-None-Match': response['ETag']})
+        self.assertEqual((await async_views.todo_list(request)).status_code, 304)
+
+    async def test_list_etag_matches_sync_view(self):
+        """Test that switching view flavours keeps clients' cached copies valid"""
+        response = await async_views.todo_list(self.get('/'))
+        sync_response = await self.async_client.get(reverse('todos:list'))
+        self.assertEqual(response['ETag'], sync_response['ETag'])
+
+    async def test_toggle(self):
+        """Test that the async toggle flips resolved and can return a fragment"""
+        request = self.get('/', headers={'Accept': 'application/json'})
+        response = await async_views.todo_toggle(request, self.todo.pk)
+        self.assertTrue(json.loads(response.content)['todo']['resolved'])
+        response = await async_views.todo_toggle(self.get('/'), self.todo.pk)
+        self.assertEqual(response.status_code, 302)
+        await self.todo.arefresh_from_db()
+        self.assertFalse(self.todo.resolved)
+
+    async def test_api_list_and_detail(self):
+        """Test the async API read paths"""
+        response = await async_views.api_todo_collection(self.get('/', {'limit': 10}))
+        self.assertEqual(json.loads(response.content)['results'][0]['id'], self.todo.pk)
+        response = await async_views.api_todo_detail(self.get('/'), self.todo.pk)
+        self.assertEqual(json.loads(response.content)['title'], "Async TODO")
+        response = await async_views.api_todo_detail(self.get('/'), 9999)
+        self.assertEqual(response.status_code, 404)
+
+
+class RequestTimingMiddlewareTest(TestCase):
+    """Test per-request SQL and timing instrumentation"""
+
+    def setUp(self):
+        cache.get_cache().clear()
+        TODO.objects.create(title="Timed TODO")
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_header(self):
+        """Test that responses report query count and timings"""
+        response = self.client.get(reverse('todos:list'))
+        timing = response['Server-Timing']
+        for metric in ('db;dur=', 'tpl;dur=', 'view;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('todos:api_list'))
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', response['Server-Timing'])
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_can_be_turned_off(self):
+        """Test that the header is left out unless SERVER_TIMING is set"""
+        response = self.client.get(reverse('todos:list'))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged(self):
+        """Test that requests over the threshold are logged"""
+        with self.assertLogs('todoproject.instrumentation', 'WARNING') as logs:
+            self.client.get(reverse('todos:summary'))
+        self.assertIn('Slow request: GET /summary/', logs.output[0])
+
+    def test_list_view_query_budget(self):
+        """Test that the list page stays within its query budget"""
+        with query_budget(4):
+            self.client.get(reverse('todos:list'))
+
+    def test_query_budget_fails_when_exceeded(self):
+        """Test that going over budget fails and lists the queries"""
+        with self.assertRaisesMessage(AssertionError, '2 queries run, budget is 1'):
+            with query_budget(1):
+                TODO.objects.count()
+                TODO.objects.count()
+
+
+@override_settings(PROFILER_ENABLED=True, PROFILER_INTERVAL_MS=0.5)
+class SamplingProfilerTest(TestCase):
+    """Test the opt-in sampling profiler"""
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+        sampler.reset()
+        self.staff = User.objects.create(username='staff', is_staff=True)
+        self.user = User.objects.create(username='user')
+
+    @override_settings(PROFILER_SAMPLE_RATE=2)
+    def test_profiles_one_in_n_requests(self):
+        """Test that every Nth request is profiled"""
+        responses = [self.client.get(reverse('todos:summary')) for _ in range(4)]
+        self.assertEqual([r.has_header('X-Profiled') for r in responses], [False, True, False, True])
+        self.assertEqual(sampler.profiles, 2)
+
+    def test_header_only_for_staff(self):
+        """Test that X-Profile is honoured for staff users only"""
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('todos:summary'), headers={'X-Profile': '1'})
+        self.assertFalse(response.has_header('X-Profiled'))
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('todos:summary'), headers={'X-Profile': '1'})
+        self.assertTrue(response.has_header('X-Profiled'))
+
+    def test_stacks_download(self):
+        """Test that staff can download and clear collapsed stacks"""
+        with sampler.profile('test-label'):
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+        url = reverse('profiler_stacks')
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+        self.client.force_login(self.staff)
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        line = response.content.decode().splitlines()[0]
+        self.assertTrue(line.startswith('test-label;'))
+        self.assertIn('test_stacks_download', line)
+        self.assertEqual(self.client.post(url).status_code, 204)
+        self.assertEqual(self.client.get(url).content, b'')
+
+    async def test_async_profiles_follow_their_task(self):
+        """Test that loop samples count only while the profiled task runs, and its sync thread is sampled"""
+        from asgiref.sync import sync_to_async
+        import threading
+
+        def spin_in_thread():
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        started = asyncio.Event()
+
+        async def spin_on_loop():
+            await started.wait()
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+
+        async def profiled():
+            sync_thread = await sync_to_async(threading.get_ident)()
+            with sampler.profile('async-label', [sync_thread], asyncio.current_task()):
+                started.set()
+                await asyncio.sleep(0.06)
+                await sync_to_async(spin_in_thread)()
+
+        await asyncio.gather(profiled(), spin_on_loop())
+        stacks = sampler.collapsed()
+        self.assertNotIn('spin_on_loop', stacks)
+        self.assertIn('spin_in_thread', stacks)
+
+    @skipIf(WebsocketCommunicator is None, 'channels is not installed')
+    @override_settings(PROFILER_SAMPLE_RATE=1)
+    async def test_consumer_handlers_are_profiled(self):
+        """Test that consumer messages are sampled like requests"""
+        communicator = WebsocketCommunicator(TODOListConsumer.as_asgi(), '/ws/todos/')
+        await communicator.connect()
+        await communicator.disconnect()
+        # websocket.connect and websocket.disconnect
+        self.assertEqual(sampler.profiles, 2)
+
+    @override_settings(PROFILER_ENABLED=False, PROFILER_SAMPLE_RATE=1)
+    def test_disabled_by_default(self):
+        """Test that the middleware drops out unless enabled"""
+        response = self.client.get(reverse('todos:summary'))
+        self.assertFalse(response.has_header('X-Profiled'))
+
+
+class SeedTODOsCommandTest(TestCase):
+    """Test the synthetic dataset generator"""
+
+    def seed(self, *args):
+        call_command('seed_todos', '--rows=300', '--anchor=2025-01-01', '--batch-size=100', *args, stdout=StringIO())
+        return list(TODO.objects.order_by('pk').values_list(
+            'title', 'due_date', 'resolved', 'created_at', 'updated_at'
+        ))
+
+    def test_reproducible(self):
+        """Test that the same seed and anchor give the same rows"""
+        first = self.seed('--seed=7')
+        self.assertEqual(len(first), 300)
+        self.assertEqual(self.seed('--seed=7', '--clear'), first)
+        self.assertNotEqual(self.seed('--seed=8', '--clear'), first)
+
+    def test_realistic_history(self):
+        """Test the due date/resolved mix and keeping generated updated_at"""
+        self.seed()
+        todos = TODO.objects.all()
+        self.assertTrue(todos.filter(due_date__isnull=True).exists())
+        self.assertTrue(todos.filter(resolved=True).exists())
+        self.assertTrue(todos.filter(resolved=False).exists())
+        # auto_now must not have stamped today's date over the history
+        self.assertFalse(todos.filter(updated_at__year__gt=2025).exists())
+        totals = summary.get_summary()
+        self.assertEqual(totals['open'] + totals['resolved'], 300)
+
+    def test_owners(self):
+        """Test that --owners spreads the rows over generated users, unevenly"""
+        rows = self.seed('--seed=7')
+        self.assertEqual(self.seed('--seed=7', '--clear', '--owners=5'), rows)
+        counts = dict(TODO.objects.values_list('owner__username').annotate(n=Count('pk')))
+        self.assertNotIn(None, counts)
+        self.assertGreater(counts['seed-user-1'], counts['seed-user-5'])
+
+
+class LeanWorkerTest(TestCase):
+    """Test what lean workers (DJANGO_WORKER_PROFILE=lean) rely on"""
+
+    @skipIf(WebsocketCommunicator is None, 'channels is not installed')
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    async def test_websocket_stack_built_on_first_connection(self):
+        """Test that the ASGI app builds the WebSocket stack lazily"""
+        from todoproject.asgi import application
+
+        websocket = application.application_mapping['websocket']
+        websocket.application = None
+        communicator = WebsocketCommunicator(
+            application, '/ws/todos/', headers=[(b'origin', b'http://testserver')],
+        )
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertIsNotNone(websocket.application)
+        await communicator.disconnect()
+
+    def test_stacks_view_without_admin(self):
+        """Test that profiler stacks are refused with a 403 when the admin is not installed"""
+        from django.contrib.auth.models import User
+        user = User.objects.create(username='lean', password='unused')
+        self.client.force_login(user)
+        with self.modify_settings(INSTALLED_APPS={'remove': ['django.contrib.admin']}):
+            response = self.client.get(reverse('profiler_stacks'))
+        self.assertEqual(response.status_code, 403)
+
+
+class TODOOwnerScopingTest(TestCase):
+    """Test that every TODO page and endpoint works on the requesting user's TODOs only"""
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+        cache.get_cache().clear()
+        self.alice = User.objects.create(username='alice')
+        self.bob = User.objects.create(username='bob')
+        self.mine = TODO.objects.create(title="Alice's TODO", owner=self.alice, due_date=timezone.localdate())
+        self.theirs = TODO.objects.create(title="Bob's TODO", owner=self.bob, due_date=timezone.localdate())
+        self.unowned = TODO.objects.create(title="Nobody's TODO")
+        self.client.force_login(self.alice)
+
+    def test_list_and_api_show_own_todos(self):
+        """Test that lists, the API and the export leave other users' TODOs out"""
+        response = self.client.get(reverse('todos:list'))
+        self.assertContains(response, "Alice&#x27;s TODO")
+        self.assertNotContains(response, "Bob&#x27;s TODO")
+        self.assertNotContains(response, "Nobody&#x27;s TODO")
+        results = self.client.get(reverse('todos:api_list')).json()['results']
+        self.assertEqual([todo['id'] for todo in results], [self.mine.pk])
+        export = b''.join(self.client.get(reverse('todos:api_export')).streaming_content)
+        self.assertEqual([json.loads(line)['id'] for line in export.splitlines()], [self.mine.pk])
+
+        self.client.logout()
+        response = self.client.get(reverse('todos:list'))
+        self.assertContains(response, "Nobody&#x27;s TODO")
+        self.assertNotContains(response, "Alice&#x27;s TODO")
+
+    def test_other_users_todos_are_not_found(self):
+        """Test that editing, toggling, deleting and reading someone else's TODO is a 404"""
+        pk = self.theirs.pk
+        self.assertEqual(self.client.get(reverse('todos:edit', args=[pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('todos:toggle', args=[pk])).status_code, 404)
+        self.assertEqual(self.client.post(reverse('todos:delete', args=[pk])).status_code, 404)
+        self.assertEqual(self.client.get(reverse('todos:api_detail', args=[pk])).status_code, 404)
+        self.theirs.refresh_from_db()
+        self.assertFalse(self.theirs.resolved)
+
+    def test_create_sets_owner(self):
+        """Test that created TODOs belong to their creator"""
+        self.client.post(reverse('todos:create'), {'title': 'Created'})
+        self.client.post(reverse('todos:api_list'), {'title': 'Via API'}, content_type='application/json')
+        owners = set(TODO.objects.filter(title__in=['Created', 'Via API']).values_list('owner', flat=True))
+        self.assertEqual(owners, {self.alice.pk})
+
+    def test_summary_counts_own_todos(self):
+        """Test that the summary endpoint counts only the user's TODOs"""
+        TODO.objects.filter(pk=self.mine.pk).toggle_resolved()
+        data = self.client.get(reverse('todos:summary')).json()
+        self.assertEqual((data['open'], data['resolved'], data['total']), (0, 1, 1))
+        self.assertEqual([(day['open'], day['resolved']) for day in data['calendar']], [(0, 1)])
+
+    def test_summary_reads_maintained_tables(self):
+        """Test that per-owner summaries come from the summary tables and survive owner changes"""
+        TODO.objects.create(title='Alice again', owner=self.alice, due_date=timezone.localdate())
+        TODO.objects.filter(pk=self.theirs.pk).update(owner=self.alice)
+        TODO.objects.filter(pk=self.mine.pk).toggle_resolved()
+        with CaptureQueriesContext(connection) as queries:
+            expected = summary.get_owner_summary(self.alice)
+        self.assertFalse([q for q in queries.captured_queries if 'todos_todo"' in q['sql']])
+        self.assertEqual((expected['open'], expected['resolved']), (2, 1))
+        self.assertEqual(summary.get_owner_summary(self.bob)['total'], 0)
+        summary.rebuild()
+        self.assertEqual(summary.get_owner_summary(self.alice), expected)
+        self.assertEqual(summary.get_owner_summary(None)['total'], 1)
+
+    def test_api_writes_need_a_csrf_token(self):
+        """Test that a cross-site API write cannot act as the signed-in user"""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.alice)
+        url = reverse('todos:api_list')
+        # A cross-site form can send text/plain with a JSON-looking body, but no token
+        response = client.post(url, '{"title": "Forged"}', content_type='text/plain')
+        self.assertEqual(response.status_code, 403)
+        response = client.delete(reverse('todos:api_detail', args=[self.mine.pk]))
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(TODO.objects.filter(title='Forged').exists())
+
+        token = client.get(reverse('todos:create')).cookies['csrftoken'].value
+        response = client.post(url, '{"title": "Forged"}', content_type='text/plain', headers={'X-CSRFToken': token})
+        self.assertEqual(response.status_code, 415)
+        response = client.post(
+            url, {'title': 'Mine'}, content_type='application/json', headers={'X-CSRFToken': token}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(TODO.objects.get(title='Mine').owner, self.alice)
+
+    def test_list_etag_differs_per_user(self):
+        """Test that two users' lists never share a validator"""
+        etag = self.client.get(reverse('todos:list'))['ETag']
+        self.client.force_login(self.bob)
+        self.assertEqual(self.client.get(reverse('todos:list'), headers={'If-None-Match': etag}).status_code, 200)
+
+    def test_queries_use_owner_indexes(self):
+        """Test that per-user reads run on an owner-first index"""
+        plan = TODO.objects.for_owner(self.alice).filter(resolved=False).explain()
+        self.assertRegex(plan, r'INDEX todo_owner_')
+
+    @skipIf(WebsocketCommunicator is None, 'channels is not installed')
+    @override_settings(TODOS_LIVE_PUSH=True)
+    def test_live_events_go_to_owner_group(self):
+        """Test that live pushes reach only the owner's pages"""
+        from . import live
+        layer = get_channel_layer()
+        async_to_sync(layer.flush)()
+        channels = {}
+        for owner in (self.alice, self.bob):
+            channels[owner] = async_to_sync(layer.new_channel)()
+            async_to_sync(layer.group_add)(live.owner_group(owner.pk), channels[owner])
+        with self.captureOnCommitCallbacks(execute=True):
+            TODO.objects.filter(pk=self.mine.pk).toggle_resolved()
+        message = async_to_sync(layer.receive)(channels[self.alice])
+        self.assertEqual(message['events'][0]['id'], self.mine.pk)
+        with self.assertRaises(asyncio.TimeoutError):
+            async_to_sync(asyncio.wait_for)(layer.receive(channels[self.bob]), 0.1)
+
+
+class StaticPipelineTest(TestCase):
+    """Test the hashed, precompressed static files and the view serving them"""
+
+    def setUp(self):
+        from django.contrib.staticfiles.storage import staticfiles_storage
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings = override_settings(STATIC_ROOT=tmp.name, DEBUG=False)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        self.root = tmp.name
+        self.script = staticfiles_storage.stored_name('todos/list.js')
+
+    def test_collectstatic_writes_compressed_variants(self):
+        """Test that hashed files get gzip variants that decompress to the original"""
+        import gzip
+        import os
+        self.assertRegex(self.script, r'^todos/list\.[0-9a-f]{12}\.js$')
+        with open(os.path.join(self.root, self.script), 'rb') as original:
+            content = original.read()
+        with open(os.path.join(self.root, self.script + '.gz'), 'rb') as compressed:
+            self.assertEqual(gzip.decompress(compressed.read()), content)
+
+    def test_list_page_references_hashed_names(self):
+        """Test that the templates link to the content-hashed files"""
+        response = self.client.get(reverse('todos:list'))
+        self.assertContains(response, '/static/' + self.script)
+
+    def test_serves_accepted_encoding_with_immutable_headers(self):
+        """Test that the view picks the variant the client accepts and marks it immutable"""
+        from todoproject import staticfiles
+        url = '/static/' + self.script
+        plain = self.client.get(url, headers={'Accept-Encoding': 'identity'})
+        self.assertNotIn('Content-Encoding', plain)
+        self.assertEqual(plain['Cache-Control'], staticfiles.IMMUTABLE)
+        self.assertEqual(plain['Vary'], 'Accept-Encoding')
+        self.assertEqual(plain['Content-Type'], 'text/javascript')
+        gzipped = self.client.get(url, headers={'Accept-Encoding': 'gzip;q=1, br;q=0'})
+        self.assertEqual(gzipped['Content-Encoding'], 'gzip')
+        self.assertLess(len(b''.join(gzipped.streaming_content)), len(b''.join(plain.streaming_content)))
+        if staticfiles.brotli is not None:
+            response = self.client.get(url, headers={'Accept-Encoding': 'gzip, deflate, br'})
+            self.assertEqual(response['Content-Encoding'], 'br')
+
+    def test_unhashed_names_are_short_lived(self):
+        """Test that files requested by their unhashed name are not cached for long"""
+        from todoproject import staticfiles
+        response = self.client.get('/static/todos/list.js')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], staticfiles.SHORT_LIVED)
+
+    def test_not_modified_and_missing(self):
+        """Test conditional requests, missing files and paths outside STATIC_ROOT"""
+        url = '/static/' + self.script
+        response = self.client.get(url)
+        response = self.client.get(url, headers={'If-Modified-Since': response['Last-Modified']})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(self.client.get('/static/todos/missing.js').status_code, 404)
+        self.assertEqual(self.client.get('/static/../manage.py').status_code, 400)
+
+
+class ProductionDatabaseTest(TransactionTestCase):
+    """Test the SQLite production profile options and the read replica router"""
+
+    def test_production_options_take_effect(self):
+        """Test that the init_command pragmas and BEGIN IMMEDIATE apply to production connections"""
+        import os
+        import sqlite3
+        from django.conf import settings
+        from django.db.utils import load_backend
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_dict = {
+            **connection.settings_dict,
+            'NAME': os.path.join(tmp.name, 'production.sqlite3'),
+            'OPTIONS': {
+                'timeout': 20,
+                'transaction_mode': 'IMMEDIATE',
+                'init_command': settings.SQLITE_PRODUCTION_PRAGMAS,
+            },
+        }
+        wrapper = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, 'production')
+        self.addCleanup(wrapper.close)
+        with wrapper.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            self.assertEqual(cursor.fetchone()[0], 'wal')
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -65536)
+        wrapper._start_transaction_under_autocommit()
+        other = sqlite3.connect(settings_dict['NAME'], timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        with self.assertRaisesMessage(sqlite3.OperationalError, 'locked'):
+            other.execute('BEGIN IMMEDIATE')
+        wrapper.connection.rollback()
+
+    def test_router_reads_from_replica_outside_transactions(self):
+        """Test that reads go to the replica, except inside a transaction on default"""
+        from django.db import transaction
+        from todoproject.routers import ReadReplicaRouter
+        router = ReadReplicaRouter()
+        self.assertEqual(router.db_for_read(TODO), 'replica')
+        with transaction.atomic():
+            self.assertEqual(router.db_for_read(TODO), 'default')
+        self.assertEqual(router.db_for_write(TODO), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'todos'))
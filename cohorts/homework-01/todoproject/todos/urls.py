@@ -1,12 +1,27 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import api, async_views, views
 
 app_name = 'todos'
 
+# The read and toggle paths have async twins for ASGI deployments; under WSGI
+# each async view would need an event loop per request, so they are opt-in.
+if getattr(settings, 'TODOS_ASYNC_VIEWS', False):
+    list_view, toggle_view = async_views.todo_list, async_views.todo_toggle
+    api_list_view, api_detail_view = async_views.api_todo_collection, async_views.api_todo_detail
+else:
+    list_view, toggle_view = views.todo_list, views.todo_toggle
+    api_list_view, api_detail_view = api.todo_collection, api.todo_detail
+
 urlpatterns = [
-    path('', views.todo_list, name='list'),
+    path('', list_view, name='list'),
     path('create/', views.todo_create, name='create'),
     path('<int:pk>/edit/', views.todo_edit, name='edit'),
     path('<int:pk>/delete/', views.todo_delete, name='delete'),
-    path('<int:pk>/toggle/', views.todo_toggle, name='toggle'),
+    path('<int:pk>/toggle/', toggle_view, name='toggle'),
+    path('cache/stats/', views.todo_cache_stats, name='cache_stats'),
+    path('summary/', views.todo_summary, name='summary'),
+    path('api/todos/', api_list_view, name='api_list'),
+    path('api/todos/export/', api.todo_export, name='api_export'),
+    path('api/todos/<int:pk>/', api_detail_view, name='api_detail'),
 ]
@@ -1,45 +1,145 @@
+from datetime import datetime
+
+from django.conf import settings
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
-from .models import TODO
-from .forms import TODOForm
+from django.template.loader import render_to_string
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_headers
+from todoproject.profiling import staff_required
+from . import api, cache, freshness, summary
+from .models import TODO, ArchivedTODO, owner_of
+from .forms import TODOEditForm, TODOForm
+
+ARCHIVED_LIMIT = 100
+
+FRAGMENT_HEADERS = ('Accept', 'X-Fragment', 'HX-Request')
+
+CONFLICT_MESSAGE = (
+    'This TODO was changed by someone else while you were editing it. '
+    'Check the current version and save again to overwrite it.'
+)
+
+def fragment_format(request):
+    """
+    The fragment a script asked for instead of the usual redirect: 'row'
+    (``X-Fragment: row`` or an htmx request), 'json' (``Accept`` prefers
+    JSON), or None for plain links and form posts.
+    """
+    if request.headers.get('X-Fragment') == 'row' or request.headers.get('HX-Request') == 'true':
+        return 'row'
+    if request.get_preferred_type(['text/html', 'application/json']) == 'application/json':
+        return 'json'
+    return None
 
+def fragment_response(request, format, op, pk, todo=None, status=200):
+    """
+    Describe one changed row: its rendered HTML (empty once removed), or a
+    JSON patch ``{'op': 'add'|'replace'|'remove', 'id': ..., 'todo': ...}``.
+    """
+    if format == 'json':
+        data = {'op': op, 'id': pk}
+        if todo is not None:
+            data['todo'] = api.serialize(todo)
+        return JsonResponse(data, status=status)
+    html = render_to_string('todos/row.html', {'todo': todo}, request) if todo is not None else ''
+    return HttpResponse(html, status=status)
+
+def list_fragment_name(owner, include_archived):
+    name = 'list+archived' if include_archived else 'list'
+    return f'{name}:{owner.pk if owner else "unowned"}'
+
+@cache_control(no_cache=True)
+@condition(etag_func=freshness.list_etag, last_modified_func=freshness.list_last_modified)
 def todo_list(request):
-    todos = TODO.objects.all()
-    return render(request, 'todos/list.html', {'todos': todos})
+    owner = owner_of(request.user)
+    todos = TODO.objects.for_owner(owner)
+    include_archived = request.GET.get('include_archived') == '1'
+    context = {'todos': todos, 'include_archived': include_archived}
+    if include_archived:
+        context['archived'] = ArchivedTODO.objects.filter(owner=owner)[:ARCHIVED_LIMIT]
+    items = cache.get_fragment(
+        list_fragment_name(owner, include_archived),
+        lambda: render_to_string('todos/list_items.html', context),
+    )
+    live = getattr(settings, 'TODOS_LIVE_PUSH', False)
+    return render(request, 'todos/list.html', {**context, 'items': items, 'live': live})
+
+@staff_required
+def todo_cache_stats(request):
+    return JsonResponse(cache.get_stats())
 
+def todo_summary(request):
+    month = None
+    if request.GET.get('month'):
+        try:
+            month = datetime.strptime(request.GET['month'], '%Y-%m').date()
+        except ValueError:
+            return JsonResponse({'error': 'month must look like YYYY-MM'}, status=400)
+    return JsonResponse(summary.get_owner_summary(request.user, month=month))
+
+@vary_on_headers(*FRAGMENT_HEADERS)
 def todo_create(request):
+    format = fragment_format(request)
     if request.method == 'POST':
         form = TODOForm(request.POST)
         if form.is_valid():
-            form.save()
+            form.instance.owner = owner_of(request.user)
+            todo = form.save()
+            if format:
+                return fragment_response(request, format, 'add', todo.pk, todo, status=201)
             messages.success(request, 'TODO created successfully!')
             return redirect('todos:list')
+        if format == 'json':
+            return JsonResponse({'errors': form.errors}, status=400)
     else:
         form = TODOForm()
-    return render(request, 'todos/form.html', {'form': form, 'title': 'Create TODO'})
+    status = 400 if format and form.errors else 200
+    return render(request, 'todos/form.html', {'form': form, 'title': 'Create TODO'}, status=status)
 
+@cache_control(no_cache=True)
+@condition(etag_func=freshness.todo_etag, last_modified_func=freshness.todo_last_modified)
 def todo_edit(request, pk):
-    todo = get_object_or_404(TODO, pk=pk)
+    todos = TODO.objects.for_owner(request.user)
+    todo = get_object_or_404(todos, pk=pk)
     if request.method == 'POST':
-        form = TODOForm(request.POST, instance=todo)
+        form = TODOEditForm(request.POST, instance=todo)
         if form.is_valid():
-            form.save()
-            messages.success(request, 'TODO updated successfully!')
-            return redirect('todos:list')
+            if form.save_if_unchanged():
+                messages.success(request, 'TODO updated successfully!')
+                return redirect('todos:list')
+            # Keep what the user typed, but against the current version, so
+            # saving again is a deliberate overwrite.
+            current = get_object_or_404(todos, pk=pk)
+            data = request.POST.copy()
+            data['version'] = current.version
+            form = TODOEditForm(data, instance=current)
+            form.add_error(None, CONFLICT_MESSAGE)
+            return render(request, 'todos/form.html', {'form': form, 'title': 'Edit TODO'}, status=409)
     else:
-        form = TODOForm(instance=todo)
+        form = TODOEditForm(instance=todo)
     return render(request, 'todos/form.html', {'form': form, 'title': 'Edit TODO'})
 
+@vary_on_headers(*FRAGMENT_HEADERS)
 def todo_delete(request, pk):
-    todo = get_object_or_404(TODO, pk=pk)
+    todo = get_object_or_404(TODO.objects.for_owner(request.user), pk=pk)
     if request.method == 'POST':
         todo.delete()
+        format = fragment_format(request)
+        if format:
+            return fragment_response(request, format, 'remove', pk)
         messages.success(request, 'TODO deleted successfully!')
         return redirect('todos:list')
     return render(request, 'todos/confirm_delete.html', {'todo': todo})
 
+@vary_on_headers(*FRAGMENT_HEADERS)
 def todo_toggle(request, pk):
-    todo = get_object_or_404(TODO, pk=pk)
-    todo.resolved = not todo.resolved
-    todo.save()
+    todos = TODO.objects.for_owner(request.user).filter(pk=pk)
+    if not todos.toggle_resolved():
+        raise Http404('No TODO matches the given query.')
+    format = fragment_format(request)
+    if format:
+        return fragment_response(request, format, 'replace', pk, get_object_or_404(todos))
     return redirect('todos:list')
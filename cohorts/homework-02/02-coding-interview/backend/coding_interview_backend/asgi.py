@@ -9,17 +9,42 @@ https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 
 import os
 from django.core.asgi import get_asgi_application
-from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
-from sessions.routing import websocket_urlpatterns
+from channels.routing import ProtocolTypeRouter
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "coding_interview_backend.settings")
 
+# Set up Django before anything imports models
+django_asgi_app = get_asgi_application()
+
+
+def websocket_application():
+    from channels.auth import AuthMiddlewareStack
+    from channels.routing import URLRouter
+    from sessions.routing import websocket_urlpatterns
+
+    return AuthMiddlewareStack(URLRouter(websocket_urlpatterns))
+
+
+class LazyApplication:
+    """
+    ASGI application built by ``factory`` the first time it is called.
+
+    Importing the session consumers and channels' auth stack up front made
+    every worker pay for them at startup, including ones that never accept
+    a WebSocket.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.application = None
+
+    async def __call__(self, scope, receive, send):
+        if self.application is None:
+            self.application = self.factory()
+        return await self.application(scope, receive, send)
+
+
 application = ProtocolTypeRouter({
-    "http": get_asgi_application(),
-    "websocket": AuthMiddlewareStack(
-        URLRouter(
-            websocket_urlpatterns
-        )
-    ),
+    "http": django_asgi_app,
+    "websocket": LazyApplication(websocket_application),
 })
@@ -0,0 +1,122 @@
+"""
+Per-request SQL and timing instrumentation for the session API.
+
+``RequestTimingMiddleware`` records the SQL query count and the time spent
+in the database and in the view for every request, and reports them in a
+``Server-Timing`` header that browser dev tools show next to the request:
+
+    Server-Timing: db;dur=3.1;desc="4 queries", view;dur=6.0, total;dur=7.4
+
+Requests slower than ``SLOW_REQUEST_MS`` are logged as warnings on this
+module's logger. Put the middleware first in ``MIDDLEWARE`` so ``total``
+covers the others.
+
+Settings:
+
+* ``SERVER_TIMING`` - emit the header (default: ``DEBUG``)
+* ``SLOW_REQUEST_MS`` - slow request threshold in ms (default: 500, None disables)
+"""
+
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+logger = logging.getLogger(__name__)
+
+# The recorder of the request this task/thread is serving, if any
+_recorder = ContextVar("instrumentation_recorder", default=None)
+
+
+class Recorder:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+
+    def __enter__(self):
+        self._token = _recorder.set(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        _recorder.reset(self._token)
+
+
+def _record_query(execute, sql, params, many, context):
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        recorder.queries += 1
+        recorder.db_time += time.perf_counter() - started
+
+
+def _wrap_connection(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install():
+    """
+    Hook query timing into Django. Safe to call repeatedly.
+    """
+    connection_created.connect(_wrap_connection, dispatch_uid="instrumentation")
+    # Connections opened before the signal was connected (test databases,
+    # the management command that started the server) need wrapping too.
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection)
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.header = getattr(settings, "SERVER_TIMING", settings.DEBUG)
+        self.slow_ms = getattr(settings, "SLOW_REQUEST_MS", 500)
+        install()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with Recorder() as recorder:
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with Recorder() as recorder:
+            response = await self.get_response(request)
+        return self.finish(request, response, recorder, started)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._timing_view_started = time.perf_counter()
+
+    def finish(self, request, response, recorder, started):
+        now = time.perf_counter()
+        total_ms = (now - started) * 1000
+        view_started = getattr(request, "_timing_view_started", None)
+        if self.header:
+            metrics = [f'db;dur={recorder.db_time * 1000:.1f};desc="{recorder.queries} queries"']
+            if view_started is not None:
+                metrics.append(f"view;dur={(now - view_started) * 1000:.1f}")
+            metrics.append(f"total;dur={total_ms:.1f}")
+            response.headers["Server-Timing"] = ", ".join(metrics)
+        if self.slow_ms is not None and total_ms >= self.slow_ms:
+            logger.warning(
+                "Slow request: %s %s took %.0fms (%d queries, %.0fms db)",
+                request.method, request.path, total_ms, recorder.queries, recorder.db_time * 1000,
+                extra={"status_code": response.status_code, "request": request},
+            )
+        return response
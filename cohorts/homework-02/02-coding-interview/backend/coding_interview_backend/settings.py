@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,12 +44,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "coding_interview_backend.instrumentation.RequestTimingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "coding_interview_backend.profiling.SamplingProfilerMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -74,6 +77,22 @@ WSGI_APPLICATION = "coding_interview_backend.wsgi.application"
 
 ASGI_APPLICATION = "coding_interview_backend.asgi.application"
 
+# Worker profile (DJANGO_WORKER_PROFILE): "full" (default) or "lean". The
+# lean profile is for workers that only serve the JSON API and WebSockets:
+# no admin (and no /admin/ URLs), messages or staticfiles, so startup skips
+# admin autodiscovery and the apps' checks and template tag libraries. Keep a
+# full worker around for the admin.
+
+WORKER_PROFILE = os.environ.get("DJANGO_WORKER_PROFILE", "full")
+
+if WORKER_PROFILE == "lean":
+    for app in ("django.contrib.admin", "django.contrib.messages", "django.contrib.staticfiles"):
+        INSTALLED_APPS.remove(app)
+    MIDDLEWARE.remove("django.contrib.messages.middleware.MessageMiddleware")
+    TEMPLATES[0]["OPTIONS"]["context_processors"].remove(
+        "django.contrib.messages.context_processors.messages"
+    )
+
 
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
@@ -81,10 +100,38 @@ ASGI_APPLICATION = "coding_interview_backend.asgi.application"
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
-        "NAME": BASE_DIR / "db.sqlite3",
+        "NAME": os.environ.get("DJANGO_DB_NAME", BASE_DIR / "db.sqlite3"),
     }
 }
 
+# SQLite production profile (DJANGO_DB_PROFILE=production): WAL so readers
+# never block the writer, a busy timeout and BEGIN IMMEDIATE instead of
+# instant "database is locked" errors, bigger page cache and mmap reads, and
+# connections kept open across requests. Unlike the TODO project there is no
+# read replica: session documents live in memory, and the database only holds
+# snapshots, read once when a session is reopened.
+# The OPTIONS below need coding_interview_backend.sqlite on Django < 5.1.
+
+SQLITE_PRODUCTION_PRAGMAS = (
+    "PRAGMA journal_mode = WAL;"
+    "PRAGMA synchronous = NORMAL;"
+    "PRAGMA cache_size = -65536;"
+    "PRAGMA mmap_size = 268435456;"
+    "PRAGMA temp_store = MEMORY;"
+)
+
+if os.environ.get("DJANGO_DB_PROFILE") == "production":
+    DATABASES["default"].update({
+        "ENGINE": "coding_interview_backend.sqlite",
+        "CONN_MAX_AGE": None,
+        "CONN_HEALTH_CHECKS": True,
+        "OPTIONS": {
+            "timeout": 20,
+            "transaction_mode": "IMMEDIATE",
+            "init_command": SQLITE_PRODUCTION_PRAGMAS,
+        },
+    })
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -117,6 +164,37 @@ USE_I18N = True
 USE_TZ = True
 
 
+# Request instrumentation (coding_interview_backend/instrumentation.py):
+# Server-Timing headers with query count, DB and view time, and a warning on
+# the "coding_interview_backend.instrumentation" logger for requests slower
+# than SLOW_REQUEST_MS.
+
+# The header tells any client how long each request spent in the database,
+# so it is on by default only while DEBUG is.
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "1" if DEBUG else "0") == "1"
+
+SLOW_REQUEST_MS = int(os.environ.get("SLOW_REQUEST_MS", 500))
+
+# Session snapshots (sessions/chunks.py): each session keeps its last
+# SESSION_SNAPSHOTS_KEPT revisions. Run "manage.py prune_snapshots" (e.g.
+# daily from cron) to discard snapshots older than
+# SESSION_SNAPSHOT_MAX_AGE_DAYS, so sessions nobody reopens do not pile up.
+
+SESSION_SNAPSHOTS_KEPT = int(os.environ.get("SESSION_SNAPSHOTS_KEPT", 10))
+
+SESSION_SNAPSHOT_MAX_AGE_DAYS = int(os.environ.get("SESSION_SNAPSHOT_MAX_AGE_DAYS", 30))
+
+# Sampling profiler (coding_interview_backend/profiling.py), off unless PROFILER_ENABLED=1.
+# Profiles every PROFILER_SAMPLE_RATE-th request (0: only staff requests
+# sent with "X-Profile: 1"); staff download the stacks from /profiler/stacks/.
+
+PROFILER_ENABLED = os.environ.get("PROFILER_ENABLED", "") == "1"
+
+PROFILER_SAMPLE_RATE = int(os.environ.get("PROFILER_SAMPLE_RATE", 0))
+
+PROFILER_INTERVAL_MS = float(os.environ.get("PROFILER_INTERVAL_MS", 5))
+
+
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/6.0/howto/static-files/
 
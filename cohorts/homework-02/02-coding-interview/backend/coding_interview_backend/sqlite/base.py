@@ -0,0 +1,41 @@
+"""
+SQLite backend with the ``init_command`` and ``transaction_mode`` OPTIONS
+that Django 5.1 added, for this project's Django 4.2. On Django 5.1+ this
+is the stock backend: its get_connection_params() already consumes both
+options, so backporting them again would silently undo them.
+"""
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+if hasattr(base.DatabaseWrapper, "transaction_modes"):
+    DatabaseWrapper = base.DatabaseWrapper
+else:
+
+    class DatabaseWrapper(base.DatabaseWrapper):
+        transaction_modes = frozenset(["DEFERRED", "EXCLUSIVE", "IMMEDIATE"])
+
+        def get_connection_params(self):
+            kwargs = super().get_connection_params()
+            transaction_mode = kwargs.pop("transaction_mode", None)
+            if transaction_mode is not None and transaction_mode.upper() not in self.transaction_modes:
+                raise ImproperlyConfigured(
+                    f"settings.DATABASES[{self.alias!r}]['OPTIONS']['transaction_mode'] "
+                    f"is improperly configured to '{transaction_mode}'."
+                )
+            self.transaction_mode = transaction_mode.upper() if transaction_mode else None
+            self.init_commands = kwargs.pop("init_command", "").split(";")
+            return kwargs
+
+        def get_new_connection(self, conn_params):
+            conn = super().get_new_connection(conn_params)
+            for init_command in self.init_commands:
+                if init_command := init_command.strip():
+                    conn.execute(init_command)
+            return conn
+
+        def _start_transaction_under_autocommit(self):
+            if self.transaction_mode is None:
+                super()._start_transaction_under_autocommit()
+            else:
+                self.cursor().execute(f"BEGIN {self.transaction_mode}")
@@ -15,10 +15,17 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 
-from django.contrib import admin
+from django.apps import apps
 from django.urls import path, include
+from coding_interview_backend.profiling import stacks_view
 
 urlpatterns = [
-    path("admin/", admin.site.urls),
+    path("profiler/stacks/", stacks_view, name="profiler_stacks"),
     path("api/", include('sessions.urls')),
 ]
+
+# Lean workers (DJANGO_WORKER_PROFILE=lean) run without the admin
+if apps.is_installed("django.contrib.admin"):
+    from django.contrib import admin
+
+    urlpatterns.insert(0, path("admin/", admin.site.urls))
@@ -2,5 +2,6 @@ from django.apps import AppConfig
 
 
 class SessionsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
     name = "sessions"
     label = "coding_sessions"
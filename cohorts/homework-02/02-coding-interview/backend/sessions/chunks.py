@@ -0,0 +1,241 @@
+"""
+Content-addressed, reference-counted storage for session documents.
+
+A document is split into chunks at content-defined line boundaries: after
+at least ``MIN_CHUNK_SIZE`` bytes, a chunk ends at the first line whose
+CRC32 has its low ``BOUNDARY_BITS`` bits clear (or at ``MAX_CHUNK_SIZE``).
+Because boundaries depend on the lines themselves and not on offsets, an
+edit only changes the chunks around it; the rest of the document still
+splits into the same chunks as before.
+
+Chunks are keyed by their SHA-256 and stored once, however many documents
+reference them, with a reference count so they are dropped when the last
+document releases them. A document is then just its ``Manifest``, the
+tuple of its chunk digests. Every session starting from the welcome
+template shares that template's chunks, and a revision snapshot of a
+barely changed document only adds the chunks that changed.
+
+``ChunkStore`` keeps chunks in process memory (``documents`` holds the live
+session documents); ``DatabaseChunkStore`` keeps them in the ``Chunk``
+table, for ``Snapshot`` revisions. Both report ``stats()``: logical bytes
+(what storing every document in full would take), stored bytes, bytes
+saved and the deduplication ratio.
+
+Snapshots are bounded: a session keeps its last ``SESSION_SNAPSHOTS_KEPT``
+revisions, and ``prune()`` (the ``prune_snapshots`` command) discards those
+older than ``SESSION_SNAPSHOT_MAX_AGE_DAYS``, releasing their chunks.
+"""
+
+import hashlib
+import zlib
+from collections import Counter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Sum
+
+from .models import Chunk, Snapshot
+
+MIN_CHUNK_SIZE = 256
+MAX_CHUNK_SIZE = 4096
+# A boundary every 2**BOUNDARY_BITS lines on average, past MIN_CHUNK_SIZE
+BOUNDARY_BITS = 3
+
+WELCOME_TEMPLATE = '// Welcome to the coding interview!\n// Start coding here...\n'
+
+
+def split(data):
+    """
+    Chunks of ``data`` (bytes), cut at content-defined line boundaries.
+    """
+    chunks, start, size = [], 0, len(data)
+    mask = (1 << BOUNDARY_BITS) - 1
+    position = start
+    while position < size:
+        end = data.find(b'\n', position)
+        end = size if end == -1 else end + 1
+        if end - start > MAX_CHUNK_SIZE:
+            # Cut before this line, or inside it when it alone is too long
+            cut = position if position > start else start + MAX_CHUNK_SIZE
+            chunks.append(data[start:cut])
+            start = position = cut
+            continue
+        if end - start >= MIN_CHUNK_SIZE and not zlib.crc32(data[position:end]) & mask:
+            chunks.append(data[start:end])
+            start = end
+        position = end
+    if start < size:
+        chunks.append(data[start:])
+    return chunks
+
+
+def digest(chunk):
+    return hashlib.sha256(chunk).hexdigest()
+
+
+def summarize(logical, stored, chunks):
+    return {
+        'chunks': chunks,
+        'logical_bytes': logical,
+        'stored_bytes': stored,
+        'saved_bytes': logical - stored,
+        'ratio': logical / stored if stored else 1.0,
+    }
+
+
+class Manifest(tuple):
+    """
+    The chunk digests of one document, in order, and its size in bytes.
+    """
+
+    def __new__(cls, digests, size):
+        manifest = super().__new__(cls, digests)
+        manifest.size = size
+        return manifest
+
+
+class ChunkStore:
+    """
+    In-memory chunk store. Not thread-safe: session consumers all run on the
+    event loop thread.
+    """
+
+    def __init__(self):
+        # digest -> [chunk, references]
+        self.chunks = {}
+        self.logical_bytes = 0
+
+    def store(self, text):
+        """
+        Store ``text``, returning the ``Manifest`` to load it back with.
+        """
+        data = text.encode()
+        digests = []
+        for chunk in split(data):
+            key = digest(chunk)
+            entry = self.chunks.get(key)
+            if entry is None:
+                self.chunks[key] = [chunk, 1]
+            else:
+                entry[1] += 1
+            digests.append(key)
+        self.logical_bytes += len(data)
+        return Manifest(digests, len(data))
+
+    def load(self, manifest):
+        return b''.join(self.chunks[key][0] for key in manifest).decode()
+
+    def release(self, manifest):
+        """
+        Drop one reference to each chunk of ``manifest``, and the chunks no
+        document references any more.
+        """
+        for key in manifest:
+            entry = self.chunks[key]
+            entry[1] -= 1
+            if not entry[1]:
+                del self.chunks[key]
+        self.logical_bytes -= manifest.size
+
+    def stats(self):
+        stored = sum(len(chunk) for chunk, _ in self.chunks.values())
+        return summarize(self.logical_bytes, stored, len(self.chunks))
+
+
+class DatabaseChunkStore:
+    """
+    Chunk store on the ``Chunk`` table. Only chunks not stored yet are
+    written; known ones just get their reference count raised.
+    """
+
+    def store(self, text):
+        data = text.encode()
+        pieces = split(data)
+        digests = [digest(chunk) for chunk in pieces]
+        chunks = dict(zip(digests, pieces))
+        with transaction.atomic():
+            known = set(Chunk.objects.filter(digest__in=chunks).values_list('digest', flat=True))
+            Chunk.objects.bulk_create(
+                [Chunk(digest=key, data=chunk, size=len(chunk)) for key, chunk in chunks.items() if key not in known],
+                ignore_conflicts=True,
+            )
+            self._add_references(Counter(digests), 1)
+        return Manifest(digests, len(data))
+
+    def load(self, manifest):
+        chunks = Chunk.objects.in_bulk(set(manifest))
+        return b''.join(bytes(chunks[key].data) for key in manifest).decode()
+
+    def release(self, manifest):
+        with transaction.atomic():
+            self._add_references(Counter(manifest), -1)
+            Chunk.objects.filter(digest__in=set(manifest), references__lte=0).delete()
+
+    def _add_references(self, counts, sign):
+        # One UPDATE per distinct count, not per chunk
+        by_count = {}
+        for key, count in counts.items():
+            by_count.setdefault(count, []).append(key)
+        for count, keys in by_count.items():
+            Chunk.objects.filter(digest__in=keys).update(references=F('references') + sign * count)
+
+    def stats(self):
+        stored = Chunk.objects.aggregate(bytes=Sum('size'))['bytes'] or 0
+        logical = Snapshot.objects.aggregate(bytes=Sum('size'))['bytes'] or 0
+        return summarize(logical, stored, Chunk.objects.count())
+
+
+documents = ChunkStore()
+database = DatabaseChunkStore()
+
+
+def capture(session_id, text, language):
+    """
+    Save a revision ``Snapshot`` of a session, unless it is unchanged since
+    the last one.
+    """
+    digests = [digest(chunk) for chunk in split(text.encode())]
+    with transaction.atomic():
+        latest = Snapshot.objects.filter(session_id=session_id).first()
+        if latest is not None and latest.chunks == digests and latest.language == language:
+            return latest
+        manifest = database.store(text)
+        snapshot = Snapshot.objects.create(
+            session_id=session_id, language=language, chunks=list(manifest), size=manifest.size,
+        )
+        keep = getattr(settings, 'SESSION_SNAPSHOTS_KEPT', 10)
+        older = list(Snapshot.objects.filter(session_id=session_id)[keep:])
+        if older:
+            discard(*older)
+        return snapshot
+
+
+def restore(session_id):
+    """
+    ``(text, language)`` of the latest snapshot of a session, or None.
+    """
+    latest = Snapshot.objects.filter(session_id=session_id).first()
+    if latest is None:
+        return None
+    return database.load(latest.chunks), latest.language
+
+
+def discard(*snapshots):
+    """
+    Delete ``snapshots`` and release their chunks.
+    """
+    with transaction.atomic():
+        Snapshot.objects.filter(pk__in=[snapshot.pk for snapshot in snapshots]).delete()
+        database.release([key for snapshot in snapshots for key in snapshot.chunks])
+
+
+def prune(before, batch_size=500):
+    """
+    Discard every snapshot created before ``before``, ``batch_size`` per
+    transaction. Returns how many were discarded.
+    """
+    discarded = 0
+    while batch := list(Snapshot.objects.filter(created_at__lt=before).order_by('pk')[:batch_size]):
+        discard(*batch)
+        discarded += len(batch)
+    return discarded
@@ -2,22 +2,30 @@ import json
 import uuid
 from channels.generic.websocket import AsyncWebsocketConsumer
 from channels.db import database_sync_to_async
+from coding_interview_backend.profiling import ProfiledConsumerMixin
+from . import chunks
 
-# In-memory storage for sessions
+# In-memory storage for sessions. Documents are chunk manifests in
+# chunks.documents, so identical content is held once across sessions.
 sessions_storage = {}
 
-class SessionConsumer(AsyncWebsocketConsumer):
+class SessionConsumer(ProfiledConsumerMixin, AsyncWebsocketConsumer):
     async def connect(self):
         self.session_id = self.scope['url_route']['kwargs']['session_id']
         self.session_group_name = f'session_{self.session_id}'
 
-        # Initialize session if it doesn't exist
+        # Initialize session if it doesn't exist, from its last snapshot if any
         if self.session_id not in sessions_storage:
-            sessions_storage[self.session_id] = {
-                'code': '// Welcome to the coding interview!\n// Start coding here...\n',
-                'language': 'javascript',
-                'connected_users': []
-            }
+            code, language = await database_sync_to_async(chunks.restore)(self.session_id) or (
+                chunks.WELCOME_TEMPLATE, 'javascript'
+            )
+            # Another connection may have initialized it in the meantime
+            if self.session_id not in sessions_storage:
+                sessions_storage[self.session_id] = {
+                    'document': chunks.documents.store(code),
+                    'language': language,
+                    'connected_users': []
+                }
 
         # Add user to connected users
         sessions_storage[self.session_id]['connected_users'].append(self.channel_name)
@@ -34,7 +42,7 @@ class SessionConsumer(AsyncWebsocketConsumer):
         # Send current session state to the newly connected user
         await self.send(text_data=json.dumps({
             'type': 'init',
-            'code': sessions_storage[self.session_id]['code'],
+            'code': chunks.documents.load(sessions_storage[self.session_id]['document']),
             'language': sessions_storage[self.session_id]['language'],
             'connected_users': len(sessions_storage[self.session_id]['connected_users'])
         }))
@@ -51,17 +59,27 @@ class SessionConsumer(AsyncWebsocketConsumer):
     async def disconnect(self, close_code):
         # Remove user from connected users
         if self.session_id in sessions_storage:
-            sessions_storage[self.session_id]['connected_users'].remove(self.channel_name)
+            session = sessions_storage[self.session_id]
+            session['connected_users'].remove(self.channel_name)
 
             # Notify other users about the disconnection
             await self.channel_layer.group_send(
                 self.session_group_name,
                 {
                     'type': 'user_count_update',
-                    'connected_users': len(sessions_storage[self.session_id]['connected_users'])
+                    'connected_users': len(session['connected_users'])
                 }
             )
 
+            # Last one out: save a revision and free the document's chunks
+            if not session['connected_users']:
+                await database_sync_to_async(chunks.capture)(
+                    self.session_id, chunks.documents.load(session['document']), session['language']
+                )
+                if not session['connected_users'] and sessions_storage.get(self.session_id) is session:
+                    del sessions_storage[self.session_id]
+                    chunks.documents.release(session['document'])
+
         # Leave session group
         await self.channel_layer.group_discard(
             self.session_group_name,
@@ -74,16 +92,20 @@ class SessionConsumer(AsyncWebsocketConsumer):
 
         if message_type == 'update':
             # Update session state
-            sessions_storage[self.session_id]['code'] = text_data_json.get('code', '')
-            sessions_storage[self.session_id]['language'] = text_data_json.get('language', 'javascript')
+            code = text_data_json.get('code', '')
+            session = sessions_storage[self.session_id]
+            previous = session['document']
+            session['document'] = chunks.documents.store(code)
+            session['language'] = text_data_json.get('language', 'javascript')
+            chunks.documents.release(previous)
 
             # Broadcast update to all users in the session
             await self.channel_layer.group_send(
                 self.session_group_name,
                 {
                     'type': 'code_update',
-                    'code': sessions_storage[self.session_id]['code'],
-                    'language': sessions_storage[self.session_id]['language']
+                    'code': code,
+                    'language': session['language']
                 }
             )
 
@@ -0,0 +1,23 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from sessions import chunks
+
+
+class Command(BaseCommand):
+    help = 'Discard session snapshots older than a number of days and release their chunks'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=getattr(settings, 'SESSION_SNAPSHOT_MAX_AGE_DAYS', 30),
+            help='Keep snapshots younger than this (default: SESSION_SNAPSHOT_MAX_AGE_DAYS)',
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days must not be negative')
+        discarded = chunks.prune(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(f'Discarded {discarded} snapshots'))
@@ -1,3 +1,29 @@
 from django.db import models
 
-# Create your models here.
+
+class Chunk(models.Model):
+    """
+    A piece of session document content, stored once per distinct content
+    and shared by every snapshot containing it (see sessions.chunks).
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    data = models.BinaryField()
+    size = models.PositiveIntegerField()
+    references = models.PositiveIntegerField(default=0)
+
+
+class Snapshot(models.Model):
+    """
+    A saved revision of a session's document, as the digests of its chunks.
+    """
+    session_id = models.CharField(max_length=64)
+    language = models.CharField(max_length=32)
+    chunks = models.JSONField()
+    size = models.PositiveIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['session_id', '-created_at'], name='snapshot_session_idx'),
+        ]
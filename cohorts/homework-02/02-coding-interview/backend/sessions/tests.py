@@ -1,6 +1,8 @@
-from django.test import TestCase
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.urls import reverse
 import json
+import os
+import tempfile
 import uuid
 import re
 
@@ -123,3 +125,333 @@ class SessionIntegrationTests(TestCase):
         # Note: CORS headers are handled by django-corsheaders middleware
         # In a real integration test, you might want to verify the headers are present
         # but this is sufficient for basic testing
+
+    @override_settings(SERVER_TIMING=True)
+    def test_responses_carry_server_timing(self):
+        """Test that API responses report per-request query and timing metrics."""
+        url = reverse('sessions:get_session', kwargs={'session_id': 'timed'})
+        response = self.client.get(url)
+
+        # The session views never touch the database
+        self.assertIn('db;dur=0.0;desc="0 queries"', response['Server-Timing'])
+        self.assertIn('total;dur=', response['Server-Timing'])
+
+    @override_settings(SERVER_TIMING=True)
+    def test_server_timing_counts_queries(self):
+        """Test that queries run by a view are counted in its Server-Timing header."""
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('sessions:chunk_stats'))
+        self.assertIn(f'desc="{len(ctx.captured_queries)} queries"', response['Server-Timing'])
+        self.assertIn('view;dur=', response['Server-Timing'])
+
+    @override_settings(SERVER_TIMING=False)
+    def test_server_timing_can_be_turned_off(self):
+        """Test that the header is left out unless SERVER_TIMING is set."""
+        response = self.client.get(reverse('sessions:get_session', kwargs={'session_id': 'timed'}))
+        self.assertFalse(response.has_header('Server-Timing'))
+
+    @override_settings(SLOW_REQUEST_MS=0)
+    def test_slow_requests_are_logged(self):
+        """Test that requests over the threshold are logged."""
+        with self.assertLogs('coding_interview_backend.instrumentation', 'WARNING') as logs:
+            self.client.get(reverse('sessions:get_session', kwargs={'session_id': 'slow'}))
+        self.assertIn('Slow request: GET /api/sessions/slow/', logs.output[0])
+
+    async def test_websocket_connects_through_lazy_router(self):
+        """Test that the ASGI app builds its WebSocket stack on first connection."""
+        from channels.testing import WebsocketCommunicator
+        from coding_interview_backend.asgi import application
+
+        communicator = WebsocketCommunicator(application, '/ws/session/lazy/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        message = json.loads(await communicator.receive_from())
+        self.assertEqual(message['type'], 'init')
+        await communicator.disconnect()
+
+
+class ChunkStoreTests(TestCase):
+    """Tests for the content-addressed chunk store behind session documents."""
+
+    def document(self, lines=400):
+        return ''.join(f'function step{i}(value) {{ return value + {i}; }}\n' for i in range(lines))
+
+    def test_identical_documents_share_chunks(self):
+        """Test that storing the same content twice stores its chunks once."""
+        from sessions.chunks import ChunkStore
+
+        store = ChunkStore()
+        text = self.document()
+        first, second = store.store(text), store.store(text)
+        self.assertEqual(first, second)
+        self.assertEqual(store.load(second), text)
+
+        stats = store.stats()
+        self.assertEqual(stats['logical_bytes'], 2 * len(text))
+        self.assertEqual(stats['stored_bytes'], len(text))
+        self.assertEqual(stats['saved_bytes'], len(text))
+        self.assertEqual(stats['ratio'], 2.0)
+
+    def test_edit_only_changes_nearby_chunks(self):
+        """Test that an insertion leaves the chunks away from it unchanged."""
+        from sessions.chunks import ChunkStore
+
+        store = ChunkStore()
+        text = self.document()
+        lines = text.splitlines(keepends=True)
+        edited = ''.join(lines[:200] + ['// inserted line\n'] + lines[200:])
+        before, after = store.store(text), store.store(edited)
+
+        self.assertGreater(len(before), 4)
+        self.assertLessEqual(len(set(after) - set(before)), 2)
+        self.assertEqual(store.load(after), edited)
+
+    def test_long_lines_and_multibyte_text_round_trip(self):
+        """Test that chunks cut inside long lines still load back intact."""
+        from sessions.chunks import MAX_CHUNK_SIZE, ChunkStore
+
+        store = ChunkStore()
+        text = 'é' * MAX_CHUNK_SIZE + '\nshort\n'
+        manifest = store.store(text)
+        self.assertGreater(len(manifest), 1)
+        self.assertEqual(store.load(manifest), text)
+
+    def test_release_drops_unreferenced_chunks(self):
+        """Test that chunks are freed once no document references them."""
+        from sessions.chunks import ChunkStore
+
+        store = ChunkStore()
+        shared = store.store('shared\n')
+        kept = store.store('shared\n')
+        store.release(shared)
+        self.assertEqual(store.load(kept), 'shared\n')
+        store.release(kept)
+        self.assertEqual(store.stats()['chunks'], 0)
+        self.assertEqual(store.stats()['logical_bytes'], 0)
+
+    def test_snapshots_deduplicate_in_the_database(self):
+        """Test that revision snapshots only add the chunks that changed."""
+        from sessions import chunks
+        from sessions.models import Chunk, Snapshot
+
+        text = self.document()
+        first = chunks.capture('abc', text, 'javascript')
+        self.assertEqual(chunks.capture('abc', text, 'javascript'), first)
+        stored = Chunk.objects.count()
+
+        edited = text.replace('step399', 'lastStep')
+        second = chunks.capture('abc', edited, 'javascript')
+        third = chunks.capture('xyz', text, 'javascript')
+        self.assertLessEqual(Chunk.objects.count() - stored, 2)
+        self.assertEqual(chunks.restore('abc'), (edited, 'javascript'))
+        self.assertIsNone(chunks.restore('missing'))
+
+        stats = chunks.database.stats()
+        self.assertEqual(stats['logical_bytes'], 2 * len(text) + len(edited))
+        self.assertGreater(stats['ratio'], 2.5)
+
+        for snapshot in (first, second, third):
+            chunks.discard(snapshot)
+        self.assertFalse(Snapshot.objects.exists())
+        self.assertFalse(Chunk.objects.exists())
+
+    @override_settings(SESSION_SNAPSHOTS_KEPT=2)
+    def test_sessions_keep_their_last_snapshots(self):
+        """Test that capturing past the retention limit discards the oldest snapshots and their chunks."""
+        from sessions import chunks
+        from sessions.models import Chunk, Snapshot
+
+        for number in range(4):
+            chunks.capture('abc', f'revision {number}\n', 'python')
+        chunks.capture('xyz', 'other session\n', 'python')
+        kept = Snapshot.objects.filter(session_id='abc')
+        self.assertEqual([chunks.database.load(s.chunks) for s in kept], ['revision 3\n', 'revision 2\n'])
+        self.assertEqual(Snapshot.objects.filter(session_id='xyz').count(), 1)
+        self.assertEqual(Chunk.objects.count(), 3)
+        self.assertEqual(chunks.restore('abc'), ('revision 3\n', 'python'))
+
+    def test_prune_snapshots_command(self):
+        """Test that prune_snapshots discards old snapshots and releases their chunks."""
+        from datetime import timedelta
+        from io import StringIO
+        from django.core.management import call_command
+        from django.utils import timezone
+        from sessions import chunks
+        from sessions.models import Chunk, Snapshot
+
+        old = chunks.capture('old', 'shared\n', 'python')
+        chunks.capture('new', 'shared\n', 'python')
+        chunks.capture('stale', 'stale only\n', 'python')
+        Snapshot.objects.exclude(session_id='new').update(created_at=timezone.now() - timedelta(days=40))
+        out = StringIO()
+        call_command('prune_snapshots', '--days=30', stdout=out)
+        self.assertIn('Discarded 2 snapshots', out.getvalue())
+        self.assertEqual(list(Snapshot.objects.values_list('session_id', flat=True)), ['new'])
+        self.assertEqual(list(Chunk.objects.values_list('references', flat=True)), [1])
+        self.assertIsNone(chunks.restore(old.session_id))
+
+    def test_chunk_stats_endpoint(self):
+        """Test that GET /api/chunks/ reports memory and database deduplication."""
+        response = self.client.get(reverse('sessions:chunk_stats'))
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        for store in ('memory', 'database'):
+            self.assertEqual(
+                set(data[store]), {'chunks', 'logical_bytes', 'stored_bytes', 'saved_bytes', 'ratio'}
+            )
+
+    async def test_sessions_share_the_welcome_template_and_resume(self):
+        """Test that new sessions share one copy of the template and reopen from their snapshot."""
+        from channels.testing import WebsocketCommunicator
+        from coding_interview_backend.asgi import application
+        from sessions import chunks
+
+        async def open_session(session_id):
+            communicator = WebsocketCommunicator(application, f'/ws/session/{session_id}/')
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            return communicator, json.loads(await communicator.receive_from())
+
+        before = chunks.documents.stats()
+        first, init = await open_session('shareda')
+        second, _ = await open_session('sharedb')
+        self.assertEqual(init['code'], chunks.WELCOME_TEMPLATE)
+        stats = chunks.documents.stats()
+        self.assertLessEqual(stats['stored_bytes'] - before['stored_bytes'], len(chunks.WELCOME_TEMPLATE))
+        self.assertEqual(stats['logical_bytes'] - before['logical_bytes'], 2 * len(chunks.WELCOME_TEMPLATE))
+
+        await first.send_to(text_data=json.dumps({'type': 'update', 'code': 'print(1)\n', 'language': 'python'}))
+        message = json.loads(await first.receive_from())
+        while message['type'] == 'user_count':
+            message = json.loads(await first.receive_from())
+        self.assertEqual(message['code'], 'print(1)\n')
+        await first.disconnect()
+        await second.disconnect()
+
+        resumed, init = await open_session('shareda')
+        self.assertEqual((init['code'], init['language']), ('print(1)\n', 'python'))
+        await resumed.disconnect()
+
+
+class ProductionDatabaseTests(TransactionTestCase):
+    """Tests for the SQLite production profile."""
+
+    def connect(self, options):
+        from django.db import connection
+        from django.db.utils import load_backend
+        from django.conf import settings
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        settings_dict = {
+            **connection.settings_dict,
+            'ENGINE': 'coding_interview_backend.sqlite',
+            'NAME': os.path.join(tmp.name, 'production.sqlite3'),
+            'OPTIONS': options,
+        }
+        wrapper = load_backend(settings_dict['ENGINE']).DatabaseWrapper(settings_dict, 'production')
+        self.addCleanup(wrapper.close)
+        return wrapper
+
+    def pragma(self, wrapper, name):
+        with wrapper.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_production_pragmas_take_effect(self):
+        """Test that init_command pragmas are applied to new connections."""
+        from django.conf import settings
+
+        wrapper = self.connect({
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': settings.SQLITE_PRODUCTION_PRAGMAS,
+        })
+        self.assertEqual(self.pragma(wrapper, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(wrapper, 'synchronous'), 1)
+        self.assertEqual(self.pragma(wrapper, 'cache_size'), -65536)
+        self.assertEqual(self.pragma(wrapper, 'temp_store'), 2)
+        self.assertEqual(wrapper.transaction_mode, 'IMMEDIATE')
+
+    def test_transactions_begin_immediate(self):
+        """Test that transactions take the write lock when they start, not at the first write."""
+        import sqlite3
+
+        wrapper = self.connect({'transaction_mode': 'IMMEDIATE'})
+        wrapper.ensure_connection()
+        wrapper._start_transaction_under_autocommit()
+        other = sqlite3.connect(wrapper.settings_dict['NAME'], timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        with self.assertRaisesMessage(sqlite3.OperationalError, 'locked'):
+            other.execute('BEGIN IMMEDIATE')
+        wrapper.connection.rollback()
+
+    def test_default_transaction_mode_is_deferred(self):
+        """Test that without transaction_mode, transactions do not lock until they write."""
+        import sqlite3
+
+        wrapper = self.connect({})
+        wrapper.ensure_connection()
+        wrapper._start_transaction_under_autocommit()
+        other = sqlite3.connect(wrapper.settings_dict['NAME'], timeout=0, isolation_level=None)
+        self.addCleanup(other.close)
+        other.execute('BEGIN IMMEDIATE')
+        other.execute('ROLLBACK')
+        wrapper.connection.rollback()
+
+
+@override_settings(PROFILER_ENABLED=True, PROFILER_INTERVAL_MS=0.5)
+class SamplingProfilerTests(TestCase):
+    """Tests for the opt-in sampling profiler."""
+
+    def setUp(self):
+        from django.contrib.auth.models import User
+        from coding_interview_backend.profiling import sampler
+
+        self.sampler = sampler
+        sampler.reset()
+        self.staff = User.objects.create(username='staff', is_staff=True)
+
+    @override_settings(PROFILER_SAMPLE_RATE=2)
+    def test_profiles_one_in_n_requests(self):
+        """Test that every Nth API request is profiled, labelled by its route."""
+        url = reverse('sessions:get_session', kwargs={'session_id': 'profiled'})
+        responses = [self.client.get(url) for _ in range(4)]
+        self.assertEqual([r.has_header('X-Profiled') for r in responses], [False, True, False, True])
+        self.assertEqual(self.sampler.profiles, 2)
+
+    @override_settings(PROFILER_SAMPLE_RATE=1)
+    async def test_consumer_messages_are_profiled(self):
+        """Test that SessionConsumer messages are sampled like requests."""
+        from channels.testing import WebsocketCommunicator
+        from coding_interview_backend.asgi import application
+
+        communicator = WebsocketCommunicator(application, '/ws/session/profiled/')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        await communicator.receive_from()
+        await communicator.disconnect()
+        # websocket.connect and websocket.disconnect, plus any user count
+        # broadcast the consumer handled in between
+        self.assertGreaterEqual(self.sampler.profiles, 2)
+
+    def test_stacks_download(self):
+        """Test that staff can download and clear the collapsed stacks."""
+        import time
+
+        with self.sampler.profile('test-label'):
+            deadline = time.perf_counter() + 0.05
+            while time.perf_counter() < deadline:
+                pass
+        url = reverse('profiler_stacks')
+        self.client.force_login(self.staff)
+        response = self.client.get(url)
+        self.assertEqual(response['Content-Type'], 'text/plain; charset=utf-8')
+        line = response.content.decode().splitlines()[0]
+        self.assertTrue(line.startswith('test-label;'))
+        self.assertIn('test_stacks_download', line)
+        self.assertEqual(self.client.post(url).status_code, 204)
+        self.assertEqual(self.client.get(url).content, b'')
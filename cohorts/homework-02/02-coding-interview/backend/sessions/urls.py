@@ -4,6 +4,7 @@ from . import views
 app_name = 'sessions'
 
 urlpatterns = [
+    path('chunks/', views.chunk_stats, name='chunk_stats'),
     path('sessions/', views.create_session, name='create_session'),
     path('sessions/<str:session_id>/', views.get_session, name='get_session'),
 ]
\ No newline at end of file
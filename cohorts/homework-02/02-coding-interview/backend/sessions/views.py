@@ -4,6 +4,8 @@ from django.views.decorators.http import require_http_methods
 import json
 import uuid
 
+from . import chunks
+
 @csrf_exempt
 @require_http_methods(["POST"])
 def create_session(request):
@@ -47,3 +49,14 @@ def get_session(request, session_id):
             {'error': 'Session not found'},
             status=404
         )
+
+@require_http_methods(["GET"])
+def chunk_stats(request):
+    """
+    Deduplication of session documents: live ones in this process's memory,
+    and revision snapshots in the database
+    """
+    return JsonResponse({
+        'memory': chunks.documents.stats(),
+        'database': chunks.database.stats(),
+    })